@@ -0,0 +1,43 @@
+"""Index sightings/witness_confirmations timestamps for admin dashboard queries
+
+Revision ID: admin_dashboard_indexes
+Revises: drop_reporter_username
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'admin_dashboard_indexes'
+down_revision = 'drop_reporter_username'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Add created_at/confirmed_at/status indexes without locking writes"""
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        # Recent/all sightings lists (ORDER BY created_at DESC LIMIT n) and today/week counts
+        op.execute("""
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_sightings_created_at
+            ON sightings (created_at DESC)
+        """)
+        op.execute("""
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_witness_confirmations_confirmed_at
+            ON witness_confirmations (confirmed_at)
+        """)
+        # Pending/verified dashboard counts
+        op.execute("""
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_sightings_status
+            ON sightings (status)
+            WHERE status IN ('pending', 'verified')
+        """)
+
+
+def downgrade():
+    """Drop admin dashboard indexes"""
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_sightings_status")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_witness_confirmations_confirmed_at")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_sightings_created_at")
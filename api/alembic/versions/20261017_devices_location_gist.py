@@ -0,0 +1,45 @@
+"""Add indexed geography location to devices for proximity alerts
+
+Revision ID: devices_location_gist
+Revises: witness_confirmations_cascade
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'devices_location_gist'
+down_revision = 'witness_confirmations_cascade'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Add devices.location derived from lat/lon with a GiST index for ST_DWithin"""
+    op.execute("CREATE EXTENSION IF NOT EXISTS postgis")
+
+    # Generated from lat/lon so existing device registration writes need no changes
+    op.execute("""
+        ALTER TABLE devices
+        ADD COLUMN IF NOT EXISTS location geography(Point, 4326)
+        GENERATED ALWAYS AS (
+            CASE WHEN lat IS NOT NULL AND lon IS NOT NULL
+                 THEN ST_SetSRID(ST_MakePoint(lon, lat), 4326)::geography
+            END
+        ) STORED
+    """)
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        op.execute("""
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_devices_location
+            ON devices USING GIST (location)
+            WHERE is_active = true AND push_enabled = true AND push_token IS NOT NULL
+        """)
+
+
+def downgrade():
+    """Drop devices.location and its index"""
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_devices_location")
+    op.execute("ALTER TABLE devices DROP COLUMN IF EXISTS location")
@@ -0,0 +1,38 @@
+"""Drop denormalized sightings.reporter_username in favor of join on read
+
+Revision ID: drop_reporter_username
+Revises: device_id_column
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'drop_reporter_username'
+down_revision = 'device_id_column'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Drop reporter_username column; readers join users on reporter_id instead"""
+    # Index the join key so resolving usernames on read stays cheap
+    with op.get_context().autocommit_block():
+        op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_sightings_reporter_id ON sightings (reporter_id)")
+
+    # Username changes no longer need to rewrite every sighting row
+    op.execute("ALTER TABLE sightings DROP COLUMN IF EXISTS reporter_username")
+
+
+def downgrade():
+    """Restore and backfill the reporter_username column"""
+    op.add_column('sightings', sa.Column('reporter_username', sa.String(50), nullable=True))
+    op.execute("""
+        UPDATE sightings s
+        SET reporter_username = u.username
+        FROM users u
+        WHERE u.id::text = s.reporter_id
+    """)
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_sightings_reporter_id")
@@ -0,0 +1,38 @@
+"""NOTIFY new_sighting on sightings insert for the enrichment worker
+
+Revision ID: notify_new_sighting
+Revises: devices_location_gist
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'notify_new_sighting'
+down_revision = 'devices_location_gist'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Fire pg_notify('new_sighting', id) after each sightings insert"""
+    op.execute("""
+        CREATE OR REPLACE FUNCTION notify_new_sighting() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify('new_sighting', NEW.id::text);
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("DROP TRIGGER IF EXISTS trg_sightings_notify_new ON sightings")
+    op.execute("""
+        CREATE TRIGGER trg_sightings_notify_new
+        AFTER INSERT ON sightings
+        FOR EACH ROW EXECUTE FUNCTION notify_new_sighting()
+    """)
+
+
+def downgrade():
+    """Drop the new sighting notification trigger"""
+    op.execute("DROP TRIGGER IF EXISTS trg_sightings_notify_new ON sightings")
+    op.execute("DROP FUNCTION IF EXISTS notify_new_sighting()")
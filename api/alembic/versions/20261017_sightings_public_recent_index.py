@@ -0,0 +1,34 @@
+"""Partial created_at index for recent public alerts
+
+Revision ID: sightings_public_recent_idx
+Revises: witness_confirmations_unique
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'sightings_public_recent_idx'
+down_revision = 'witness_confirmations_unique'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Index public sightings by created_at for WHERE is_public ORDER BY created_at DESC LIMIT n"""
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        # No INCLUDE of the jsonb columns: btree tuples are capped at ~2.7kB,
+        # so large media_info/enrichment_data rows would fail to insert
+        op.execute("""
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_sightings_public_recent
+            ON sightings (created_at DESC)
+            WHERE is_public = true
+        """)
+    op.execute("ANALYZE sightings")
+
+
+def downgrade():
+    """Drop the recent public sightings index"""
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_sightings_public_recent")
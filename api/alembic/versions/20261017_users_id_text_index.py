@@ -0,0 +1,31 @@
+"""Index users.id as text for the sightings reporter join
+
+Revision ID: users_id_text_idx
+Revises: witness_confirmations_sighting_idx
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'users_id_text_idx'
+down_revision = 'witness_confirmations_sighting_idx'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Add an expression index matching `s.reporter_id = u.id::text`"""
+    # sightings.reporter_id is still text and holds legacy device ids, so it
+    # cannot be cast to uuid; index the users side of the join instead
+    with op.get_context().autocommit_block():
+        op.execute("""
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_users_id_text
+            ON users ((id::text)) INCLUDE (username)
+        """)
+
+
+def downgrade():
+    """Drop the users id text index"""
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_users_id_text")
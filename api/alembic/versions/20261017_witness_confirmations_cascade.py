@@ -0,0 +1,43 @@
+"""Cascade witness_confirmations deletes from sightings
+
+Revision ID: witness_confirmations_cascade
+Revises: admin_dashboard_indexes
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'witness_confirmations_cascade'
+down_revision = 'admin_dashboard_indexes'
+branch_labels = None
+depends_on = None
+
+FK_NAME = 'witness_confirmations_sighting_id_fkey'
+
+
+def upgrade():
+    """Recreate the sighting_id foreign key with ON DELETE CASCADE"""
+    # Confirmations left behind by earlier deletes would fail validation
+    op.execute("""
+        DELETE FROM witness_confirmations wc
+        WHERE NOT EXISTS (SELECT 1 FROM sightings s WHERE s.id = wc.sighting_id)
+    """)
+    op.execute(f"ALTER TABLE witness_confirmations DROP CONSTRAINT IF EXISTS {FK_NAME}")
+    # NOT VALID + VALIDATE avoids holding an exclusive lock during the full-table check
+    op.execute(f"""
+        ALTER TABLE witness_confirmations
+        ADD CONSTRAINT {FK_NAME} FOREIGN KEY (sighting_id)
+        REFERENCES sightings (id) ON DELETE CASCADE NOT VALID
+    """)
+    op.execute(f"ALTER TABLE witness_confirmations VALIDATE CONSTRAINT {FK_NAME}")
+
+
+def downgrade():
+    """Restore the plain sighting_id foreign key"""
+    op.execute(f"ALTER TABLE witness_confirmations DROP CONSTRAINT IF EXISTS {FK_NAME}")
+    op.execute(f"""
+        ALTER TABLE witness_confirmations
+        ADD CONSTRAINT {FK_NAME} FOREIGN KEY (sighting_id)
+        REFERENCES sightings (id)
+    """)
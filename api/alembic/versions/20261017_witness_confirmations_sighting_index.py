@@ -0,0 +1,30 @@
+"""Index witness_confirmations by sighting and confirmation time
+
+Revision ID: witness_confirmations_sighting_idx
+Revises: sightings_public_recent_idx
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'witness_confirmations_sighting_idx'
+down_revision = 'sightings_public_recent_idx'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Add (sighting_id, confirmed_at) for the ordered witness aggregation list"""
+    # Declared on the model but never created by a migration
+    with op.get_context().autocommit_block():
+        op.execute("""
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_witness_confirmations_sighting
+            ON witness_confirmations (sighting_id, confirmed_at)
+        """)
+
+
+def downgrade():
+    """Drop the witness_confirmations sighting index"""
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_witness_confirmations_sighting")
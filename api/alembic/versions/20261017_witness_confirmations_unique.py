@@ -0,0 +1,39 @@
+"""Unique witness confirmation per device and sighting
+
+Revision ID: witness_confirmations_unique
+Revises: notify_new_sighting
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'witness_confirmations_unique'
+down_revision = 'notify_new_sighting'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Add the unique (sighting_id, device_id) index used by confirm_witness ON CONFLICT"""
+    # Keep the earliest confirmation from any duplicates left by the old check-then-insert
+    op.execute("""
+        DELETE FROM witness_confirmations wc
+        USING witness_confirmations keep
+        WHERE wc.sighting_id = keep.sighting_id
+          AND wc.device_id = keep.device_id
+          AND (wc.confirmed_at, wc.id) > (keep.confirmed_at, keep.id)
+    """)
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        op.execute("""
+            CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS uq_witness_confirmations_sighting_device
+            ON witness_confirmations (sighting_id, device_id)
+        """)
+
+
+def downgrade():
+    """Drop the unique confirmation index"""
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS uq_witness_confirmations_sighting_device")
@@ -43,6 +43,14 @@ class Settings(BaseSettings):
     database_pool_size: int = Field(default=20, env="DATABASE_POOL_SIZE")
     database_max_overflow: int = Field(default=10, env="DATABASE_MAX_OVERFLOW")
     database_pool_timeout: int = Field(default=30, env="DATABASE_POOL_TIMEOUT")
+    database_host: str = Field(default="localhost", env="DATABASE_HOST")
+    database_port: int = Field(default=5432, env="DATABASE_PORT")
+    # Set when DATABASE_PORT points at PgBouncer (transaction pooling mode),
+    # which cannot keep server-side prepared statements between transactions
+    database_pgbouncer: bool = Field(default=False, env="DATABASE_PGBOUNCER")
+    # Direct PostgreSQL DSN for session-level features PgBouncer's transaction
+    # mode can't carry (LISTEN/NOTIFY); falls back to DATABASE_URL when unset
+    database_direct_url: Optional[str] = Field(default=None, env="DATABASE_DIRECT_URL")
     
     # === Redis Configuration ===
     redis_url: str = Field(env="REDIS_URL")
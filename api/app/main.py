@@ -1,5 +1,5 @@
 from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Request
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from app.middleware.request_middleware import RequestTimeoutMiddleware, ErrorHandlingMiddleware
@@ -8,7 +8,7 @@ from app.routers import plane_match, media_serve, devices, emails, photo_analysi
 from app.routers import admin_simple as admin
 from app.services.media_service import get_media_service
 from app.services.alerts_service import AlertsService
-from app.schemas.media import guess_media_type_from_filename
+from app.schemas.media import guess_media_type_from_filename, describe_hash_backend
 import asyncpg
 import asyncio
 import json
@@ -89,6 +89,7 @@ app = FastAPI(
     debug=settings.debug,
     docs_url="/docs" if settings.debug else None,
     redoc_url="/redoc" if settings.debug else None,
+    default_response_class=ORJSONResponse,
 )
 
 # Request handling middleware (order matters - first added, last executed)
@@ -106,6 +107,9 @@ app.add_middleware(
 
 # Database connection - now using proper service
 from app.services.database_service import database_service
+from app.services.cache_service import cache_service
+from app.services.email_service_brevo import close_email_service as close_brevo_email_service
+from app.services.email_service_postfix import close_smtp_connections
 
 # Media storage configuration
 MEDIA_DIR = Path("media")
@@ -118,18 +122,28 @@ MEDIA_DIR.mkdir(exist_ok=True)
 async def startup_event():
     settings.log_configuration()
     
+    # Make misconfigured (non SHA-NI / non-OpenSSL) hashing builds visible
+    hash_backend = describe_hash_backend()
+    print(f"Hash backend: {hash_backend}")
+    if not hash_backend["sha256_openssl"] or hash_backend["cpu_sha_ni"] is False:
+        logger.warning("SHA-256 is not hardware accelerated on this host (%s)", hash_backend)
+    
 
     try:
         # Initialize database service with production settings
         await database_service.initialize_pool(
-            host="localhost",
-            port=5432,
+            host=settings.database_host,
+            port=settings.database_port,
             user="ufobeep_user",
             password="ufopostpass",
             database="ufobeep_db",
-            min_size=2,
-            max_size=20,
-            command_timeout=60
+            min_size=10,
+            max_size=50,
+            command_timeout=10,
+            # PgBouncer transaction pooling is incompatible with prepared statement caching
+            statement_cache_size=0 if settings.database_pgbouncer else 1024,
+            max_cached_statement_lifetime=0,
+            max_inactive_connection_lifetime=300.0
         )
         print("Database connection pool created successfully")
         
@@ -209,6 +223,17 @@ async def startup_event():
             """)
             
 
+            await conn.execute("""
+                CREATE TABLE IF NOT EXISTS user_devices (
+                    device_id TEXT PRIMARY KEY,
+                    user_id UUID NOT NULL REFERENCES users(id),
+                    device_info JSONB,
+                    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+                    last_seen_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+                )
+            """)
+            
+
             try:
                 await conn.execute("""
                     CREATE TYPE device_platform AS ENUM ('ios', 'android', 'web')
@@ -281,6 +306,9 @@ async def startup_event():
 @app.on_event("shutdown")
 async def shutdown_event():
     await database_service.close()
+    await cache_service.close()
+    await close_brevo_email_service()
+    await close_smtp_connections()
 
 @app.get("/healthz")
 async def healthz():
@@ -299,6 +327,14 @@ async def healthz():
     
     return health_data
 
+@app.get("/metrics")
+async def metrics():
+    """Database pool statistics for capacity tuning"""
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "database_pool": database_service.get_stats()
+    }
+
 @app.get("/ping")
 def ping():
     return {"message": "pong"}
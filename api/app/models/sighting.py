@@ -1,15 +1,24 @@
 from sqlalchemy import Column, String, Text, DateTime, Float, Integer, Boolean, JSON, Enum as SQLEnum, ForeignKey
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, raiseload
 from sqlalchemy.dialects.postgresql import UUID, ARRAY
 from datetime import datetime
 from enum import Enum
+import os
 import uuid
 
 from app.config.environment import settings
 
 Base = declarative_base()
 
+# Raise on any relationship access that was not eagerly loaded (dev/CI guard against N+1)
+SQLALCHEMY_RAISELOAD = os.getenv("SQLALCHEMY_RAISELOAD", "0") == "1"
+
+
+def strict_load_options() -> tuple:
+    """Query options forbidding implicit lazy loads when SQLALCHEMY_RAISELOAD=1"""
+    return (raiseload("*"),) if SQLALCHEMY_RAISELOAD else ()
+
 
 # Enums
 class SightingCategory(str, Enum):
@@ -344,7 +353,7 @@ class WitnessConfirmation(Base):
     __tablename__ = "witness_confirmations"
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    sighting_id = Column(UUID(as_uuid=True), ForeignKey("sightings.id"), nullable=False)
+    sighting_id = Column(UUID(as_uuid=True), ForeignKey("sightings.id", ondelete="CASCADE"), nullable=False)
     
     # Device/user information
     device_id = Column(String(255), nullable=False)  # Anonymous device ID
@@ -461,4 +470,5 @@ Index('idx_devices_user_platform', Device.user_id, Device.platform)
 Index('idx_devices_active_push', Device.is_active, Device.push_enabled)
 Index('idx_devices_last_seen', Device.last_seen)
 Index('idx_witness_confirmations_sighting', WitnessConfirmation.sighting_id, WitnessConfirmation.confirmed_at)
-Index('idx_witness_confirmations_device', WitnessConfirmation.device_id, WitnessConfirmation.sighting_id)
\ No newline at end of file
+Index('idx_witness_confirmations_device', WitnessConfirmation.device_id, WitnessConfirmation.sighting_id)
+Index('uq_witness_confirmations_sighting_device', WitnessConfirmation.sighting_id, WitnessConfirmation.device_id, unique=True)
@@ -202,10 +202,9 @@ async def admin_media_page(credentials: str = Depends(verify_admin_password)):
         # Get media stats (simplified)
         async with db_pool.acquire() as conn:
             media_count = await conn.fetchval("""
-                SELECT COUNT(*) FROM (
-                    SELECT unnest(COALESCE((media_info->'files')::jsonb, '[]'::jsonb)) 
-                    FROM sightings WHERE media_info::text != '{}'
-                ) as media_files
+                SELECT COALESCE(SUM(jsonb_array_length(media_info->'files')), 0)
+                FROM sightings
+                WHERE jsonb_typeof(media_info->'files') = 'array'
             """) or 0
         
         return HTMLResponse(f"""
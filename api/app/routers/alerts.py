@@ -1,53 +1,17 @@
 from fastapi import APIRouter, HTTPException, UploadFile, File, Form
+from fastapi.responses import ORJSONResponse
+from datetime import datetime
 from typing import List, Optional
 from app.services.alerts_service import AlertsService
-import asyncpg
+from app.services.database_service import get_database_pool
 import uuid
 
 router = APIRouter(prefix="/alerts", tags=["alerts"])
 
-# Shared utilities
+# Database dependency - uses the shared pool
 async def get_db():
-    """Get database connection pool"""
-    return await asyncpg.create_pool(
-        host="localhost", port=5432, user="ufobeep_user", 
-        password="ufopostpass", database="ufobeep_db",
-        min_size=1, max_size=10
-    )
-
-def format_alert_response(alert):
-    """Format alert data for API response"""
-    return {
-        "id": alert.id,
-        "title": alert.title,
-        "description": alert.description,
-        "category": alert.category,
-        "alert_level": alert.alert_level,
-        "status": "active",
-        "witness_count": alert.witness_count,
-        "created_at": alert.created_at.isoformat(),
-        "location": {
-            "latitude": alert.location.latitude,
-            "longitude": alert.location.longitude,
-            "name": alert.location.name
-        },
-        "distance_km": 0.0,
-        "bearing_deg": 0.0,
-        "view_count": 0,
-        "verification_score": 0.0,
-        "media_files": alert.media_files or [],
-        "tags": [],
-        "is_public": True,
-        "submitted_at": alert.created_at.isoformat(),
-        "processed_at": alert.created_at.isoformat(),
-        "matrix_room_id": "",
-        "reporter_id": alert.reporter_id or "",
-        "reporter_username": alert.reporter_username,
-        "enrichment": alert.enrichment or {},
-        "photo_analysis": [],
-        "total_confirmations": alert.witness_count,
-        "can_confirm_witness": True
-    }
+    """Get database connection pool from service"""
+    return await get_database_pool()
 
 # Alert endpoints
 @router.post("")
@@ -129,24 +93,28 @@ async def create_alert(request: dict):
         raise HTTPException(status_code=500, detail=f"Error creating alert: {str(e)}")
 
 @router.get("")
-async def get_alerts(limit: int = 20, offset: int = 0):
-    """Get recent alerts - clean endpoint using service layer"""
+async def get_alerts(limit: int = 20, offset: int = 0, created_before: Optional[datetime] = None):
+    """Get recent alerts - clean endpoint using service layer
+
+    Page with created_before (the oldest created_at already shown) rather than offset
+    """
     try:
         db_pool = await get_db()
         alerts_service = AlertsService(db_pool)
-        alerts = await alerts_service.get_recent_alerts(limit=limit)
-        
-        api_alerts = [format_alert_response(alert) for alert in alerts]
+        # Already shaped for the wire - no per-alert reformatting pass
+        api_alerts = await alerts_service.get_recent_alerts(limit=limit, created_before=created_before)
         
         # Don't close the pool - it's shared across the service
         
-        return {
+        # Rows are already JSON-native (ISO strings, decoded jsonb), so hand them to
+        # orjson directly and skip FastAPI's jsonable_encoder walk over every alert
+        return ORJSONResponse({
             "success": True,
             "data": {"alerts": api_alerts},
             "total": len(api_alerts),
             "limit": limit,
             "offset": offset
-        }
+        })
         
     except Exception as e:
         print(f"Error getting alerts: {e}")
@@ -167,7 +135,7 @@ async def get_alert_details(alert_id: str):
         
         return {
             "success": True,
-            "data": format_alert_response(alert),
+            "data": alert,
             "message": "Alert found"
         }
         
@@ -211,7 +179,7 @@ async def upload_alert_media(
             
             # Get existing media info
             if sighting['media_info']:
-                existing_media = json.loads(sighting['media_info'])
+                existing_media = dict(sighting['media_info'])
                 # Ensure files key exists
                 if 'files' not in existing_media:
                     existing_media['files'] = []
@@ -1,11 +1,11 @@
 from fastapi import APIRouter, HTTPException, Form
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel, EmailStr
-import psycopg2
-from psycopg2.extras import RealDictCursor
-import os
+import asyncpg
 from typing import Optional
 
+from app.services.database_service import get_database_pool
+
 router = APIRouter(prefix="/emails", tags=["emails"])
 
 class EmailInterestRequest(BaseModel):
@@ -17,18 +17,11 @@ class EmailInterestResponse(BaseModel):
     message: str
     id: Optional[int] = None
 
-def get_db_connection():
-    """Get database connection using environment settings"""
-    try:
-        conn = psycopg2.connect(
-            host="localhost",
-            database="ufobeep_db",
-            user="ufobeep_user",
-            password="ufopostpass"
-        )
-        return conn
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Database connection failed: {str(e)}")
+# Database dependency - uses the shared asyncpg pool instead of a blocking
+# psycopg2 connection per request
+async def get_db() -> asyncpg.Pool:
+    """Get database connection pool from service"""
+    return await get_database_pool()
 
 @router.post("/interest")
 async def submit_email_interest_form(
@@ -39,32 +32,25 @@ async def submit_email_interest_form(
     Handle form submission for email interest - returns JSON for frontend
     """
     try:
-        conn = get_db_connection()
-        cur = conn.cursor(cursor_factory=RealDictCursor)
+        pool = await get_db()
         
         # Try to insert the email
-        cur.execute(
+        interest_id = await pool.fetchval(
             """
             INSERT INTO email_interests (email, source) 
-            VALUES (%s, %s) 
+            VALUES ($1, $2) 
             RETURNING id
             """,
-            (email, source)
+            email, source
         )
         
-        result = cur.fetchone()
-        conn.commit()
-        
-        cur.close()
-        conn.close()
-        
         return JSONResponse(content={
             "success": True,
             "message": "Thanks! We'll notify you when the app launches.",
-            "id": result['id']
+            "id": interest_id
         })
         
-    except psycopg2.errors.UniqueViolation:
+    except asyncpg.UniqueViolationError:
         # Email already exists
         return JSONResponse(content={
             "success": True,
@@ -85,14 +71,8 @@ async def get_interest_count():
     Get count of interested users (for admin use)
     """
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-        
-        cur.execute("SELECT COUNT(*) FROM email_interests")
-        count = cur.fetchone()[0]
-        
-        cur.close()
-        conn.close()
+        pool = await get_db()
+        count = await pool.fetchval("SELECT COUNT(*) FROM email_interests")
         
         return {"count": count}
         
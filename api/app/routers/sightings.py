@@ -268,13 +268,18 @@ def jitter_coordinates(lat: float, lng: float) -> GeoCoordinates:
 
 async def validate_media_files(media_file_urls: List[str], db: Session = Depends(get_db)) -> List[MediaFile]:
     """Validate that media files exist by looking up their URLs in the database"""
-    from ..models.sighting import MediaFile as MediaFileModel
+    from ..models.sighting import MediaFile as MediaFileModel, strict_load_options
     
     media_files = []
     
     for url in media_file_urls:
         # Query database for MediaFile record by URL
-        db_media_file = db.query(MediaFileModel).filter(MediaFileModel.url == url).first()
+        db_media_file = (
+            db.query(MediaFileModel)
+            .options(*strict_load_options())
+            .filter(MediaFileModel.url == url)
+            .first()
+        )
         
         if db_media_file:
             # Convert database model to Pydantic model
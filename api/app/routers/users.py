@@ -4,21 +4,32 @@ Handles user registration, username generation, and user profile management
 """
 
 from fastapi import APIRouter, HTTPException, Depends, status
-from pydantic import BaseModel, Field, validator
+from pydantic import BaseModel, Field, field_validator
 from typing import Optional, List
-from datetime import datetime
+from datetime import datetime, timedelta
+import re
+import time
 import uuid
+import secrets
 import asyncpg
+import bcrypt
 import json
+import logging
 
 from app.services.username_service import UsernameGenerator
 from app.services.user_migration_service import get_migration_service
 from app.services.email_service_postfix import PostfixEmailService
 from app.services.social_auth_service import SocialAuthService
 from app.services.database_service import get_database_pool
+from app.services.cache_service import (
+    get_redis, cache_get, cache_set, cache_delete,
+    profile_cache_key, invalidate_profile_cache, PROFILE_CACHE_TTL_SECONDS
+)
 from app.services.phone_service import phone_service
 from app.middleware.firebase_auth import FirebaseUser, OptionalAuth, RequiredAuth
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/users", tags=["users"])
 
 
@@ -28,6 +39,122 @@ async def get_db() -> asyncpg.Pool:
     return await get_database_pool()
 
 
+# Device IDs are opaque client tokens; reject malformed ones before touching the pool
+DEVICE_ID_PATTERN = r'^[A-Za-z0-9_\-]{8,128}$'
+_DEVICE_ID_RE = re.compile(DEVICE_ID_PATTERN)
+
+# Small in-process device_id -> user_id cache for chatty mobile clients
+DEVICE_USER_CACHE_TTL_SECONDS = 60
+DEVICE_USER_CACHE_MAX_SIZE = 10000
+_device_user_cache: dict = {}
+
+
+def _validate_device_id(device_id: str) -> str:
+    """Path/query dependency rejecting malformed device IDs with 400"""
+    if not _DEVICE_ID_RE.match(device_id):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid device ID format"
+        )
+    return device_id
+
+
+def _get_cached_user_id(device_id: str) -> Optional[str]:
+    """Return cached user_id for a device if the entry is still fresh"""
+    entry = _device_user_cache.get(device_id)
+    if entry is None:
+        return None
+    user_id, expires_at = entry
+    if expires_at < time.monotonic():
+        _device_user_cache.pop(device_id, None)
+        return None
+    return user_id
+
+
+def _cache_user_id(device_id: str, user_id: str) -> None:
+    """Remember device -> user mapping, evicting the oldest entry when full"""
+    if len(_device_user_cache) >= DEVICE_USER_CACHE_MAX_SIZE:
+        _device_user_cache.pop(next(iter(_device_user_cache)))
+    _device_user_cache[device_id] = (user_id, time.monotonic() + DEVICE_USER_CACHE_TTL_SECONDS)
+
+
+def _forget_device(device_id: str) -> None:
+    """Drop cached mapping after a device is relinked to another user"""
+    _device_user_cache.pop(device_id, None)
+
+
+async def _resolve_user_id(conn, device_id: str) -> Optional[str]:
+    """Resolve device_id to user_id, skipping the JOIN on a cache hit"""
+    user_id = _get_cached_user_id(device_id)
+    if user_id is not None:
+        return user_id
+    
+    user_id = await conn.fetchval("""
+        SELECT u.id
+        FROM users u
+        JOIN user_devices ud ON u.id = ud.user_id
+        WHERE ud.device_id = $1
+    """, device_id)
+    if user_id is None:
+        return None
+    
+    user_id = str(user_id)
+    _cache_user_id(device_id, user_id)
+    return user_id
+
+
+# Redis username reservations - the users.username UNIQUE constraint stays authoritative
+USERNAME_RESERVATION_TTL_SECONDS = 30
+USERNAME_CLAIM_TTL_SECONDS = 86400
+
+
+async def _available_usernames(conn, count: int = 10) -> List[str]:
+    """Generate candidate usernames and drop those already taken, in one query"""
+    candidates = [UsernameGenerator.generate() for _ in range(count)]
+    taken = {
+        row['username'] for row in await conn.fetch(
+            "SELECT username FROM users WHERE username = ANY($1::text[])",
+            candidates
+        )
+    }
+    return [c for c in candidates if c not in taken]
+
+
+async def _reserve_username(candidate: str) -> Optional[bool]:
+    """
+    Reserve a candidate username in Redis with SET NX
+    Returns True if reserved, False if already taken, None if Redis is unavailable
+    """
+    try:
+        reserved = await get_redis().set(
+            f"uname:{candidate}", "pending", nx=True, ex=USERNAME_RESERVATION_TTL_SECONDS
+        )
+        return bool(reserved)
+    except Exception as e:
+        logger.warning(f"Username reservation unavailable, falling back to database: {e}")
+        return None
+
+
+async def _claim_username(username: str, user_id: str) -> None:
+    """Mark a reserved username as owned once the user row is written"""
+    await cache_set(f"uname:{username}", user_id, USERNAME_CLAIM_TTL_SECONDS)
+
+
+async def _release_username(username: str) -> None:
+    """Release a reservation after a failed registration"""
+    await cache_delete(f"uname:{username}")
+
+
+def _parse_json_list(value) -> list:
+    """Decode a JSON array column that asyncpg may hand back as text"""
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            return []
+    return value if isinstance(value, list) else []
+
+
 # Pydantic Models for API
 class UsernameGenerationResponse(BaseModel):
     """Response for username generation"""
@@ -65,7 +192,7 @@ class RecoveryRequest(BaseModel):
     phone: Optional[str] = None
 
 class UserRegistrationRequest(BaseModel):
-    device_id: str
+    device_id: str = Field(..., pattern=DEVICE_ID_PATTERN)
     platform: str
     alert_range_km: float = 50.0
     units_metric: bool = True
@@ -80,8 +207,9 @@ class UserRegistrationResponse(BaseModel):
     is_new_user: bool
     message: str
     
-    @validator('username')
-    def validate_username(cls, v):
+    @field_validator('username')
+    @classmethod
+    def validate_username(cls, v: str) -> str:
         if v is not None:
             is_valid, error = UsernameGenerator.is_valid_username(v)
             if not is_valid:
@@ -125,7 +253,7 @@ class AlertHistoryResponse(BaseModel):
 
 class UsernameRegenerateRequest(BaseModel):
     """Request to regenerate username"""
-    device_id: str
+    device_id: str = Field(..., pattern=DEVICE_ID_PATTERN)
     force_regenerate: bool = False
 
 
@@ -160,6 +288,24 @@ async def generate_username():
         )
 
 
+_USER_BY_DEVICE_SQL = """
+    SELECT u.id, u.username
+    FROM user_devices ud
+    JOIN users u ON u.id = ud.user_id
+    WHERE ud.device_id = $1
+"""
+
+
+def _welcome_back(existing_user, device_id: str) -> UserRegistrationResponse:
+    return UserRegistrationResponse(
+        user_id=str(existing_user['id']),
+        username=existing_user['username'],
+        device_id=device_id,
+        is_new_user=False,
+        message="Welcome back! Using existing account."
+    )
+
+
 @router.post("/register", response_model=UserRegistrationResponse)  
 async def register_user(request: UserRegistrationRequest):
     """
@@ -167,44 +313,30 @@ async def register_user(request: UserRegistrationRequest):
     Creates username-based identity for anonymous device users
     """
     pool = await get_db()
+    reserved_username = None
     try:
         async with pool.acquire() as conn:
             # Use atomic transaction to prevent race conditions
             async with conn.transaction():
-                # First, try to get existing device-user mapping with row lock
-                existing_device = await conn.fetchrow(
-                    "SELECT device_id, user_id FROM user_devices WHERE device_id = $1 FOR UPDATE",
-                    request.device_id
-                )
-                
-                if existing_device:
-                    # Get the existing user
-                    existing_user = await conn.fetchrow(
-                        "SELECT id, username FROM users WHERE id = $1",
-                        existing_device['user_id']
-                    )
-                    return UserRegistrationResponse(
-                        user_id=str(existing_user['id']),
-                        username=existing_user['username'],
-                        device_id=request.device_id,
-                        is_new_user=False,
-                        message="Welcome back! Using existing account."
-                    )
+                # Returning devices get their existing account before any
+                # username reservation or user insert happens
+                existing_user = await conn.fetchrow(_USER_BY_DEVICE_SQL, request.device_id)
+                if existing_user:
+                    return _welcome_back(existing_user, request.device_id)
                 
-                # If no existing device found, create new user atomically
                 # Generate username if not provided
                 username = request.username
                 if not username:
-                    # Try multiple times to get a unique username
-                    for attempt in range(10):
-                        candidate = UsernameGenerator.generate()
-                        existing = await conn.fetchrow(
-                            "SELECT username FROM users WHERE username = $1",
-                            candidate
-                        )
-                        if not existing:
-                            username = candidate
-                            break
+                    # Check a batch of candidates in one query, then reserve the
+                    # first free one in Redis so concurrent registrations don't collide
+                    for candidate in await _available_usernames(conn):
+                        reserved = await _reserve_username(candidate)
+                        if reserved is False:
+                            continue
+                        username = candidate
+                        if reserved:
+                            reserved_username = candidate
+                        break
                     
                     if not username:
                         raise HTTPException(
@@ -212,31 +344,7 @@ async def register_user(request: UserRegistrationRequest):
                             detail="Unable to generate unique username"
                         )
                 
-                # Create new user
-                user_id = uuid.uuid4()
-                await conn.execute("""
-                    INSERT INTO users (
-                        id, username, email, alert_range_km, units_metric, 
-                        preferred_language, is_active, is_verified, created_at, updated_at
-                    )
-                    VALUES ($1, $2, $3, $4, $5, $6, $7, $8, NOW(), NOW())
-                """, user_id, username, request.email, 
-                    request.alert_range_km or 50.0,
-                    request.units_metric if request.units_metric is not None else True,
-                    request.preferred_language or "en", True, False)
-                
-                # Create simple device mapping - create table if not exists
-                await conn.execute("""
-                    CREATE TABLE IF NOT EXISTS user_devices (
-                        device_id TEXT PRIMARY KEY,
-                        user_id UUID NOT NULL REFERENCES users(id),
-                        device_info JSONB,
-                        created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
-                        last_seen_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
-                    )
-                """)
-                
-                # Store device mapping with JSON info (atomic insert)
+                # Store device mapping with JSON info
                 device_info = {
                     "platform": request.platform,
                     "device_name": getattr(request, 'device_name', 'Unknown'),
@@ -244,32 +352,38 @@ async def register_user(request: UserRegistrationRequest):
                     "os_version": getattr(request, 'os_version', 'Unknown')
                 }
                 
-                try:
-                    await conn.execute("""
-                        INSERT INTO user_devices (device_id, user_id, device_info)
-                        VALUES ($1, $2, $3)
-                    """, request.device_id, user_id, json.dumps(device_info))
-                except Exception as e:
-                    # If device was inserted by another request, return that user instead
-                    if "duplicate key" in str(e).lower():
-                        # Get the existing user for this device
-                        existing_device = await conn.fetchrow(
-                            "SELECT user_id FROM user_devices WHERE device_id = $1",
-                            request.device_id
+                # Create user and device mapping in one statement; the device insert
+                # does nothing if a concurrent request registered this device first
+                user_id = uuid.uuid4()
+                inserted_user_id = await conn.fetchval("""
+                    WITH new_user AS (
+                        INSERT INTO users (
+                            id, username, email, alert_range_km, units_metric, 
+                            preferred_language, is_active, is_verified, created_at, updated_at
                         )
-                        if existing_device:
-                            existing_user = await conn.fetchrow(
-                                "SELECT id, username FROM users WHERE id = $1",
-                                existing_device['user_id']
-                            )
-                            return UserRegistrationResponse(
-                                user_id=str(existing_user['id']),
-                                username=existing_user['username'],
-                                device_id=request.device_id,
-                                is_new_user=False,
-                                message="Welcome back! Account recovered during race condition."
-                            )
-                    raise e
+                        VALUES ($1, $2, $3, $4, $5, $6, $7, $8, NOW(), NOW())
+                        RETURNING id
+                    )
+                    INSERT INTO user_devices (device_id, user_id, device_info)
+                    SELECT $9, id, $10 FROM new_user
+                    ON CONFLICT (device_id) DO NOTHING
+                    RETURNING user_id
+                """, user_id, username, request.email, 
+                    request.alert_range_km or 50.0,
+                    request.units_metric if request.units_metric is not None else True,
+                    request.preferred_language or "en", True, False,
+                    request.device_id, json.dumps(device_info))
+                
+                if inserted_user_id is None:
+                    # Lost the race to another registration of this device - drop
+                    # the user row created above and return the existing account
+                    await conn.execute("DELETE FROM users WHERE id = $1", user_id)
+                    if reserved_username:
+                        await _release_username(reserved_username)
+                        reserved_username = None
+                    
+                    existing_user = await conn.fetchrow(_USER_BY_DEVICE_SQL, request.device_id)
+                    return _welcome_back(existing_user, request.device_id)
                 
                 # Migrate existing sightings from device_id to username (inside transaction)
                 migration_service = await get_migration_service(pool)
@@ -298,6 +412,9 @@ async def register_user(request: UserRegistrationRequest):
                         print(f"Email sending failed: {email_error}")
                         # Don't fail registration due to email issues
                 
+                if reserved_username:
+                    await _claim_username(reserved_username, str(user_id))
+                
                 return UserRegistrationResponse(
                     user_id=str(user_id),
                     username=username,
@@ -307,6 +424,9 @@ async def register_user(request: UserRegistrationRequest):
                 )
             
     except Exception as e:
+        if reserved_username:
+            await _release_username(reserved_username)
+        
         error_str = str(e).lower()
         
         # Handle specific database constraint violations
@@ -357,7 +477,7 @@ async def register_user(request: UserRegistrationRequest):
 
 
 @router.get("/by-device/{device_id}", response_model=UserRegistrationResponse)
-async def get_user_by_device(device_id: str):
+async def get_user_by_device(device_id: str = Depends(_validate_device_id)):
     """
     Get user information by device ID  
     Used for existing users to retrieve their username and user ID
@@ -463,7 +583,6 @@ async def verify_email(request: dict):
                 raise HTTPException(status_code=404, detail="Invalid verification token")
             
             # Check if token is expired (24 hours)
-            from datetime import datetime, timedelta
             if user['verification_sent_at'] < datetime.now() - timedelta(hours=24):
                 raise HTTPException(status_code=400, detail="Verification token expired")
             
@@ -525,11 +644,9 @@ async def recover_account(request: RecoveryRequest):
                 }
             
             # Generate 6-digit recovery code
-            import secrets
             recovery_code = f"{secrets.randbelow(999999):06d}"
             
             # Save recovery code (expires in 15 minutes)
-            from datetime import datetime, timedelta
             expires_at = datetime.now() + timedelta(minutes=15)
             
             await conn.execute("""
@@ -570,6 +687,8 @@ async def verify_recovery_code(request: dict):
     if not recovery_code or not new_device_id:
         raise HTTPException(status_code=400, detail="Recovery code and device_id required")
     
+    _validate_device_id(new_device_id)
+    
     pool = await get_db()
     try:
         async with pool.acquire() as conn:
@@ -584,7 +703,6 @@ async def verify_recovery_code(request: dict):
                 raise HTTPException(status_code=404, detail="Invalid recovery code")
             
             # Check if code is expired
-            from datetime import datetime
             if user['recovery_expires_at'] < datetime.now():
                 raise HTTPException(status_code=400, detail="Recovery code expired")
             
@@ -602,6 +720,7 @@ async def verify_recovery_code(request: dict):
                     user_id = EXCLUDED.user_id,
                     device_info = EXCLUDED.device_info
             """, new_device_id, user['id'], json.dumps(device_info))
+            _forget_device(new_device_id)
             
             # Clear recovery code (single use)
             await conn.execute("""
@@ -743,21 +862,31 @@ async def setup_email_dkim(request: dict):
 # MP13-6 Profile Management Endpoints
 
 @router.get("/stats/{device_id}", response_model=UserStatsResponse)
-async def get_user_stats(device_id: str):
+async def get_user_stats(device_id: str = Depends(_validate_device_id)):
     """
     Get user statistics for profile display - MP13-6
     Shows alert history, activity, and account information
+    Served from Redis for PROFILE_CACHE_TTL_SECONDS when available
     """
     pool = await get_db()
     try:
         async with pool.acquire() as conn:
-            # Get user from device ID
+            user_id = await _resolve_user_id(conn, device_id)
+            if not user_id:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="User not found"
+                )
+            
+            cache_key = profile_cache_key(user_id)
+            cached = await cache_get(cache_key)
+            if cached:
+                return UserStatsResponse.model_validate_json(cached)
+            
             user = await conn.fetchrow("""
-                SELECT u.id, u.username, u.created_at, u.visibility_settings
-                FROM users u
-                JOIN user_devices ud ON u.id = ud.user_id
-                WHERE ud.device_id = $1
-            """, device_id)
+                SELECT username, created_at, visibility_settings
+                FROM users WHERE id = $1
+            """, uuid.UUID(user_id))
             
             if not user:
                 raise HTTPException(
@@ -765,54 +894,41 @@ async def get_user_stats(device_id: str):
                     detail="User not found"
                 )
             
-            user_id = user['id']
-            
-            # Get alert statistics
-            alerts_stats = await conn.fetchrow("""
+            # Sighting and witness aggregates in a single round-trip
+            counts = await conn.fetchrow("""
                 SELECT 
                     COUNT(*) as total_alerts,
-                    COUNT(CASE WHEN media_files != '[]' THEN 1 END) as media_alerts
+                    COUNT(*) FILTER (WHERE media_files != '[]') as media_alerts,
+                    COUNT(*) FILTER (WHERE created_at > NOW() - INTERVAL '30 days') as alerts_last_30_days,
+                    COUNT(*) FILTER (WHERE created_at > NOW() - INTERVAL '7 days') as alerts_last_7_days,
+                    (SELECT COUNT(*) FROM witness_confirmations wc
+                     JOIN user_devices ud ON ud.device_id = wc.device_id
+                     WHERE ud.user_id = $2) as confirmations
                 FROM sightings 
-                WHERE reporter_id = $1::text
-            """, str(user_id))
-            
-            # Get witness confirmation stats
-            witness_stats = await conn.fetchrow("""
-                SELECT COUNT(*) as confirmations
-                FROM witness_confirmations 
-                WHERE device_id = $1
-            """, device_id)
+                WHERE reporter_id = $1
+            """, user_id, uuid.UUID(user_id))
             
             # Calculate account age
-            from datetime import datetime
             account_age = (datetime.now() - user['created_at']).days
             
-            # Recent activity (last 30 days)
-            recent_activity = await conn.fetchrow("""
-                SELECT 
-                    COUNT(CASE WHEN created_at > NOW() - INTERVAL '30 days' THEN 1 END) as alerts_last_30_days,
-                    COUNT(CASE WHEN created_at > NOW() - INTERVAL '7 days' THEN 1 END) as alerts_last_7_days
-                FROM sightings 
-                WHERE reporter_id = $1::text
-            """, str(user_id))
-            
             # Visibility settings
             visibility_settings = user['visibility_settings'] or {}
             if isinstance(visibility_settings, str):
-                import json
                 visibility_settings = json.loads(visibility_settings)
             
-            return UserStatsResponse(
-                total_alerts_created=alerts_stats['total_alerts'] or 0,
-                total_witnesses_confirmed=witness_stats['confirmations'] or 0,
-                total_media_uploaded=alerts_stats['media_alerts'] or 0,
+            stats = UserStatsResponse(
+                total_alerts_created=counts['total_alerts'] or 0,
+                total_witnesses_confirmed=counts['confirmations'] or 0,
+                total_media_uploaded=counts['media_alerts'] or 0,
                 account_age_days=account_age,
                 recent_activity={
-                    "alerts_last_30_days": recent_activity['alerts_last_30_days'] or 0,
-                    "alerts_last_7_days": recent_activity['alerts_last_7_days'] or 0
+                    "alerts_last_30_days": counts['alerts_last_30_days'] or 0,
+                    "alerts_last_7_days": counts['alerts_last_7_days'] or 0
                 },
                 visibility_settings=visibility_settings
             )
+            await cache_set(cache_key, stats.model_dump_json(), PROFILE_CACHE_TTL_SECONDS)
+            return stats
             
     except Exception as e:
         raise HTTPException(
@@ -824,7 +940,7 @@ async def get_user_stats(device_id: str):
 
 
 @router.get("/alerts/{device_id}", response_model=AlertHistoryResponse)
-async def get_user_alert_history(device_id: str, page: int = 1, per_page: int = 20):
+async def get_user_alert_history(device_id: str = Depends(_validate_device_id), page: int = 1, per_page: int = 20):
     """
     Get user's alert history for profile display - MP13-6
     Shows paginated list of user's created alerts
@@ -833,20 +949,14 @@ async def get_user_alert_history(device_id: str, page: int = 1, per_page: int =
     try:
         async with pool.acquire() as conn:
             # Get user from device ID
-            user = await conn.fetchrow("""
-                SELECT u.id, u.username
-                FROM users u
-                JOIN user_devices ud ON u.id = ud.user_id
-                WHERE ud.device_id = $1
-            """, device_id)
+            user_id = await _resolve_user_id(conn, device_id)
             
-            if not user:
+            if not user_id:
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
                     detail="User not found"
                 )
             
-            user_id = str(user['id'])
             offset = (page - 1) * per_page
             
             # Get total count
@@ -854,12 +964,15 @@ async def get_user_alert_history(device_id: str, page: int = 1, per_page: int =
                 SELECT COUNT(*) FROM sightings WHERE reporter_id = $1
             """, user_id)
             
-            # Get paginated alerts
+            # Get paginated alerts (media count computed in Postgres)
             alerts = await conn.fetch("""
                 SELECT 
                     id, title, description, latitude, longitude,
                     location_name, media_files, created_at, alert_level,
-                    is_verified, witness_count
+                    is_verified, witness_count,
+                    CASE WHEN jsonb_typeof(media_files::jsonb) = 'array'
+                         THEN jsonb_array_length(media_files::jsonb)
+                         ELSE 0 END AS media_count
                 FROM sightings 
                 WHERE reporter_id = $1
                 ORDER BY created_at DESC
@@ -867,21 +980,23 @@ async def get_user_alert_history(device_id: str, page: int = 1, per_page: int =
             """, user_id, per_page, offset)
             
             # Format alerts for response
-            formatted_alerts = []
-            for alert in alerts:
-                alert_dict = dict(alert)
-                # Parse media_files JSON
-                media_files = alert_dict.get('media_files', [])
-                if isinstance(media_files, str):
-                    import json
-                    try:
-                        media_files = json.loads(media_files)
-                    except:
-                        media_files = []
-                
-                alert_dict['media_files'] = media_files
-                alert_dict['media_count'] = len(media_files)
-                formatted_alerts.append(alert_dict)
+            formatted_alerts = [
+                {
+                    'id': alert['id'],
+                    'title': alert['title'],
+                    'description': alert['description'],
+                    'latitude': alert['latitude'],
+                    'longitude': alert['longitude'],
+                    'location_name': alert['location_name'],
+                    'media_files': _parse_json_list(alert['media_files']),
+                    'created_at': alert['created_at'],
+                    'alert_level': alert['alert_level'],
+                    'is_verified': alert['is_verified'],
+                    'witness_count': alert['witness_count'],
+                    'media_count': alert['media_count'],
+                }
+                for alert in alerts
+            ]
             
             return AlertHistoryResponse(
                 alerts=formatted_alerts,
@@ -923,16 +1038,8 @@ async def regenerate_username(request: UsernameRegenerateRequest):
                 )
             
             # Generate new unique username
-            new_username = None
-            for attempt in range(10):
-                candidate = UsernameGenerator.generate()
-                existing = await conn.fetchrow(
-                    "SELECT username FROM users WHERE username = $1",
-                    candidate
-                )
-                if not existing:
-                    new_username = candidate
-                    break
+            available = await _available_usernames(conn)
+            new_username = available[0] if available else None
             
             if not new_username:
                 raise HTTPException(
@@ -947,12 +1054,8 @@ async def regenerate_username(request: UsernameRegenerateRequest):
                 WHERE id = $2
             """, new_username, user['id'])
             
-            # Update any sightings with old username reference
-            await conn.execute("""
-                UPDATE sightings 
-                SET reporter_username = $1
-                WHERE reporter_id = $2::text
-            """, new_username, str(user['id']))
+            # Sightings resolve reporter_username by joining users on read,
+            # so no per-sighting rewrite is needed here
             
             return UserRegistrationResponse(
                 user_id=str(user['id']),
@@ -972,7 +1075,7 @@ async def regenerate_username(request: UsernameRegenerateRequest):
 
 
 @router.post("/visibility-settings")
-async def update_visibility_settings(device_id: str, settings: VisibilitySettingsRequest):
+async def update_visibility_settings(settings: VisibilitySettingsRequest, device_id: str = Depends(_validate_device_id)):
     """
     Update user privacy/visibility settings - MP13-6
     Controls how user information appears in alerts and public profiles
@@ -981,14 +1084,9 @@ async def update_visibility_settings(device_id: str, settings: VisibilitySetting
     try:
         async with pool.acquire() as conn:
             # Get user from device ID
-            user = await conn.fetchrow("""
-                SELECT u.id
-                FROM users u
-                JOIN user_devices ud ON u.id = ud.user_id
-                WHERE ud.device_id = $1
-            """, device_id)
+            user_id = await _resolve_user_id(conn, device_id)
             
-            if not user:
+            if not user_id:
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
                     detail="User not found"
@@ -1008,7 +1106,8 @@ async def update_visibility_settings(device_id: str, settings: VisibilitySetting
                 UPDATE users 
                 SET visibility_settings = $1, updated_at = NOW()
                 WHERE id = $2
-            """, json.dumps(settings_dict), user['id'])
+            """, json.dumps(settings_dict), uuid.UUID(user_id))
+            await invalidate_profile_cache(user_id)
             
             return {
                 "success": True,
@@ -1026,7 +1125,7 @@ async def update_visibility_settings(device_id: str, settings: VisibilitySetting
 
 
 @router.get("/visibility-settings/{device_id}")
-async def get_visibility_settings(device_id: str):
+async def get_visibility_settings(device_id: str = Depends(_validate_device_id)):
     """
     Get current user visibility settings - MP13-6
     """
@@ -1056,7 +1155,6 @@ async def get_visibility_settings(device_id: str):
             
             current_settings = user['visibility_settings']
             if isinstance(current_settings, str):
-                import json
                 current_settings = json.loads(current_settings)
             
             # Merge with defaults
@@ -1081,7 +1179,7 @@ async def get_visibility_settings(device_id: str):
 class SocialLoginRequest(BaseModel):
     """Request for social login (Google/Apple)"""
     token: str = Field(..., description="OAuth ID token from social provider")
-    device_id: str = Field(..., description="Device identifier") 
+    device_id: str = Field(..., pattern=DEVICE_ID_PATTERN, description="Device identifier") 
     platform: str = Field(..., description="Platform (android/ios)")
     user_id: Optional[str] = Field(None, description="Apple user ID (Apple Sign-In only)")
 
@@ -1089,13 +1187,13 @@ class SocialLoginRequest(BaseModel):
 class MagicLinkRequest(BaseModel):
     """Request for magic link login"""
     email: str = Field(..., description="Email address")
-    device_id: str = Field(..., description="Device identifier")
+    device_id: str = Field(..., pattern=DEVICE_ID_PATTERN, description="Device identifier")
 
 
 class SetPasswordRequest(BaseModel):
     """Request to set password for authenticated user"""
     password: str = Field(..., min_length=8, description="New password")
-    device_id: str = Field(..., description="Device identifier")
+    device_id: str = Field(..., pattern=DEVICE_ID_PATTERN, description="Device identifier")
 
 
 @router.post("/auth/google")
@@ -1151,6 +1249,7 @@ async def google_login(request: SocialLoginRequest):
                         user_id = EXCLUDED.user_id,
                         last_seen_at = NOW()
                 """, user["id"], request.device_id, request.platform)
+                _forget_device(request.device_id)
                 
                 return {
                     "success": True,
@@ -1235,7 +1334,7 @@ async def firebase_auth(
                         "user_id": str(user["id"]),
                         "username": user["username"],
                         "email": user["email"],
-                        "login_methods": json.loads(user["login_methods"]) if user["login_methods"] else ["firebase"]
+                        "login_methods": _parse_json_list(user["login_methods"]) if user["login_methods"] else ["firebase"]
                     }
                 }
                 
@@ -1339,7 +1438,6 @@ async def set_password(request: SetPasswordRequest):
     Set password for authenticated user - MP15
     Requires user to be logged in via device_id
     """
-    import bcrypt
     
     pool = await get_db()
     try:
@@ -1,9 +1,17 @@
 from datetime import datetime
 from enum import Enum
-from typing import Optional, Dict, Any
-from pydantic import BaseModel, Field, validator
+from typing import Optional, Dict, Any, BinaryIO, Union
+from pydantic import BaseModel, ConfigDict, Field, field_validator
 import hashlib
-import mimetypes
+import os
+import re
+import ssl
+import time
+
+try:
+    import blake3
+except ImportError:
+    blake3 = None
 
 
 class MediaType(str, Enum):
@@ -12,6 +20,31 @@ class MediaType(str, Enum):
     AUDIO = "audio"
 
 
+# Allowed upload extensions and content types, built once at import
+_EXT_TO_TYPE = {
+    **dict.fromkeys(('.jpg', '.jpeg', '.png', '.gif', '.webp', '.heic', '.heif'), MediaType.PHOTO),
+    **dict.fromkeys(('.mp4', '.mov', '.avi', '.mkv', '.webm', '.m4v'), MediaType.VIDEO),
+    **dict.fromkeys(('.mp3', '.wav', '.aac', '.ogg', '.m4a', '.flac'), MediaType.AUDIO),
+}
+
+_ALLOWED_EXTS = frozenset(_EXT_TO_TYPE)
+
+_ALLOWED_TYPES = frozenset({
+    # Images
+    'image/jpeg', 'image/jpg', 'image/png', 'image/gif', 
+    'image/webp', 'image/heic', 'image/heif',
+    # Videos
+    'video/mp4', 'video/quicktime', 'video/x-msvideo', 
+    'video/x-matroska', 'video/webm',
+    # Audio
+    'audio/mpeg', 'audio/wav', 'audio/aac', 
+    'audio/ogg', 'audio/x-m4a', 'audio/flac'
+})
+
+# Metadata keys containing any of these words are dropped from upload metadata
+_SENSITIVE_KEY_RE = re.compile(r'password|token|secret|key|auth', re.IGNORECASE)
+
+
 class UploadStatus(str, Enum):
     PENDING = "pending"
     UPLOADING = "uploading"
@@ -27,43 +60,22 @@ class PresignedUploadRequest(BaseModel):
     checksum: Optional[str] = Field(None, description="MD5 or SHA256 checksum")
     sighting_id: str = Field(..., description="Sighting ID to organize media under")
     
-    @validator('filename')
-    def validate_filename(cls, v):
+    @field_validator('filename')
+    @classmethod
+    def validate_filename(cls, v: str) -> str:
         """Validate filename has allowed extension"""
-        allowed_extensions = {
-            # Images
-            '.jpg', '.jpeg', '.png', '.gif', '.webp', '.heic', '.heif',
-            # Videos 
-            '.mp4', '.mov', '.avi', '.mkv', '.webm', '.m4v',
-            # Audio
-            '.mp3', '.wav', '.aac', '.ogg', '.m4a', '.flac'
-        }
+        _, ext = os.path.splitext(v)
         
-        # Get file extension
-        filename_lower = v.lower()
-        has_allowed_ext = any(filename_lower.endswith(ext) for ext in allowed_extensions)
-        
-        if not has_allowed_ext:
-            raise ValueError(f"File extension not allowed. Allowed: {', '.join(allowed_extensions)}")
+        if ext.lower() not in _ALLOWED_EXTS:
+            raise ValueError(f"File extension not allowed. Allowed: {', '.join(sorted(_ALLOWED_EXTS))}")
         
         return v
     
-    @validator('content_type')
-    def validate_content_type(cls, v):
+    @field_validator('content_type')
+    @classmethod
+    def validate_content_type(cls, v: str) -> str:
         """Validate content type matches filename"""
-        allowed_types = {
-            # Images
-            'image/jpeg', 'image/jpg', 'image/png', 'image/gif', 
-            'image/webp', 'image/heic', 'image/heif',
-            # Videos
-            'video/mp4', 'video/quicktime', 'video/x-msvideo', 
-            'video/x-matroska', 'video/webm',
-            # Audio
-            'audio/mpeg', 'audio/wav', 'audio/aac', 
-            'audio/ogg', 'audio/x-m4a', 'audio/flac'
-        }
-        
-        if v not in allowed_types:
+        if v not in _ALLOWED_TYPES:
             raise ValueError(f"Content type not allowed: {v}")
         
         return v
@@ -89,10 +101,7 @@ class PresignedUploadResponse(BaseModel):
     expires_at: datetime
     max_file_size: int
     
-    class Config:
-        json_encoders = {
-            datetime: lambda v: v.isoformat()
-        }
+    model_config = ConfigDict(populate_by_name=True)
 
 
 class MediaUploadCompleteRequest(BaseModel):
@@ -101,18 +110,18 @@ class MediaUploadCompleteRequest(BaseModel):
     media_type: MediaType
     metadata: Optional[Dict[str, Any]] = Field(default_factory=dict)
     
-    @validator('metadata')
-    def validate_metadata(cls, v):
+    @field_validator('metadata')
+    @classmethod
+    def validate_metadata(cls, v: Optional[Dict[str, Any]]) -> Dict[str, Any]:
         """Ensure metadata doesn't contain sensitive information"""
         if v is None:
             return {}
         
         # Remove potentially sensitive fields
-        sensitive_keys = {'password', 'token', 'secret', 'key', 'auth'}
         safe_metadata = {}
         
         for key, value in v.items():
-            if not any(sensitive_word in key.lower() for sensitive_word in sensitive_keys):
+            if not _SENSITIVE_KEY_RE.search(key):
                 # Convert to string representation for safety
                 if isinstance(value, (str, int, float, bool)):
                     safe_metadata[key] = value
@@ -152,10 +161,7 @@ class MediaFile(BaseModel):
     status: UploadStatus = UploadStatus.COMPLETED
     processing_status: Optional[str] = None  # For future processing pipeline
     
-    class Config:
-        json_encoders = {
-            datetime: lambda v: v.isoformat()
-        }
+    model_config = ConfigDict(populate_by_name=True)
 
 
 class UploadProgressUpdate(BaseModel):
@@ -221,7 +227,7 @@ class MediaMetadata(BaseModel):
 
 class BulkUploadRequest(BaseModel):
     """Request for bulk upload presigned URLs"""
-    files: list[PresignedUploadRequest] = Field(..., min_items=1, max_items=10)
+    files: list[PresignedUploadRequest] = Field(..., min_length=1, max_length=10)
     sighting_id: Optional[str] = None  # Associate with specific sighting
 
 
@@ -251,53 +257,80 @@ class ValidationError(BaseModel):
 
 # Utility functions for schema validation
 def generate_upload_id() -> str:
-    """Generate unique upload ID"""
-    import uuid
-    import time
-    
-    # Combine timestamp and UUID for uniqueness
-    timestamp = int(time.time() * 1000)  # milliseconds
-    unique_id = str(uuid.uuid4()).replace('-', '')[:12]
+    """Generate unique, time-sortable upload ID (UUIDv7 layout, RFC 9562)"""
+    # 48-bit millisecond timestamp prefix keeps IDs in insertion order for index locality
+    timestamp_ms = time.time_ns() // 1_000_000
+    value = (timestamp_ms << 80) | int.from_bytes(os.urandom(10), 'big')
+    value = (value & ~(0xF << 76)) | (0x7 << 76)  # Version 7
+    value = (value & ~(0x3 << 62)) | (0x2 << 62)  # RFC 4122 variant
     
-    return f"upload_{timestamp}_{unique_id}"
+    return f"upload_{value:032x}"
 
 
-def calculate_checksum(file_content: bytes, algorithm: str = "md5") -> str:
-    """Calculate file checksum"""
-    if algorithm.lower() == "md5":
-        return hashlib.md5(file_content).hexdigest()
-    elif algorithm.lower() == "sha256":
-        return hashlib.sha256(file_content).hexdigest()
+CHECKSUM_CHUNK_SIZE = 1 << 20  # 1 MiB
+
+
+def calculate_checksum(file_content: Union[bytes, BinaryIO], algorithm: str = "md5") -> str:
+    """
+    Calculate file checksum, streaming file objects in CHECKSUM_CHUNK_SIZE chunks
+    blake3 is opt-in and needs the optional 'blake3' package
+    """
+    algorithm = algorithm.lower()
+    if algorithm in ("md5", "sha256"):
+        hasher = hashlib.new(algorithm)
+    elif algorithm == "blake3":
+        if blake3 is None:
+            raise ValueError("blake3 checksums require the 'blake3' package")
+        hasher = blake3.blake3(max_threads=blake3.blake3.AUTO)
     else:
         raise ValueError(f"Unsupported checksum algorithm: {algorithm}")
+    
+    if isinstance(file_content, (bytes, bytearray, memoryview)):
+        hasher.update(file_content)
+    else:
+        for chunk in iter(lambda: file_content.read(CHECKSUM_CHUNK_SIZE), b""):
+            hasher.update(chunk)
+    
+    return hasher.hexdigest()
+
+
+def describe_hash_backend() -> Dict[str, Any]:
+    """
+    Report which SHA-256 implementation this runtime uses
+    OpenSSL 1.1.1+ dispatches to SHA-NI instructions when the CPU has them;
+    the builtin fallback (e.g. some musl/Alpine builds) is several times slower
+    """
+    cpu_sha_ni = None
+    try:
+        with open("/proc/cpuinfo") as cpuinfo:
+            for line in cpuinfo:
+                if line.startswith("flags"):
+                    cpu_sha_ni = "sha_ni" in line.split()
+                    break
+    except OSError:
+        pass
+    
+    return {
+        "openssl_version": ssl.OPENSSL_VERSION,
+        "sha256_openssl": hashlib.sha256.__name__ == "openssl_sha256",
+        "cpu_sha_ni": cpu_sha_ni,
+        "blake3_available": blake3 is not None
+    }
 
 
 def guess_media_type_from_filename(filename: str) -> MediaType:
-    """Guess media type from filename extension"""
-    content_type, _ = mimetypes.guess_type(filename)
-    
-    if content_type:
-        if content_type.startswith('image/'):
-            return MediaType.PHOTO
-        elif content_type.startswith('video/'):
-            return MediaType.VIDEO  
-        elif content_type.startswith('audio/'):
-            return MediaType.AUDIO
-    
-    # Fallback to photo
-    return MediaType.PHOTO
+    """Guess media type from filename extension, falling back to photo"""
+    return _EXT_TO_TYPE.get(os.path.splitext(filename)[1].lower(), MediaType.PHOTO)
+
+
+_SANITIZE_TABLE = str.maketrans({c: '_' for c in '<>:"/\\|?*'})
 
 
 def sanitize_filename(filename: str) -> str:
     """Sanitize filename for safe storage"""
-    import re
-    
     # Remove or replace problematic characters
-    filename = re.sub(r'[<>:"/\\|?*]', '_', filename)
+    filename = filename.translate(_SANITIZE_TABLE)
     
     # Limit length
-    name, ext = filename.rsplit('.', 1) if '.' in filename else (filename, '')
-    if len(name) > 200:
-        name = name[:200]
-    
-    return f"{name}.{ext}" if ext else name
\ No newline at end of file
+    name, ext = os.path.splitext(filename)
+    return name[:200] + ext
\ No newline at end of file
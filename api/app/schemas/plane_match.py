@@ -1,6 +1,7 @@
 from datetime import datetime
 from typing import Optional
-from pydantic import BaseModel, Field, validator
+import numpy as np
+from pydantic import BaseModel, ConfigDict, Field, field_validator
 
 
 class SensorDataSchema(BaseModel):
@@ -15,14 +16,11 @@ class SensorDataSchema(BaseModel):
     accuracy: Optional[float] = Field(None, gt=0.0)
     altitude: Optional[float] = None
 
-    @validator('azimuth_deg')
-    def validate_azimuth(cls, v):
+    @field_validator('azimuth_deg')
+    @classmethod
+    def validate_azimuth(cls, v: float) -> float:
         """Normalize azimuth to 0-360 range"""
-        if v < 0:
-            return v + 360
-        elif v >= 360:
-            return v - 360
-        return v
+        return v % 360.0
 
 
 class PlaneMatchRequest(BaseModel):
@@ -71,10 +69,7 @@ class PlaneMatchResponse(BaseModel):
     reason: str
     timestamp: datetime
     
-    class Config:
-        json_encoders = {
-            datetime: lambda v: v.isoformat()
-        }
+    model_config = ConfigDict(populate_by_name=True)
 
 
 # OpenSky API Response Models
@@ -122,27 +117,45 @@ class OpenSkyState(BaseModel):
         )
 
 
-class OpenSkyResponse(BaseModel):
-    """OpenSky API response wrapper"""
-    time: int
-    states: list[OpenSkyState]
+class OpenSkyStateBatch:
+    """
+    Columnar (struct-of-arrays) view of raw OpenSky state vectors
+    Only vectors with a usable position are kept; OpenSkyState models are
+    built on demand for the few aircraft that actually match
+    """
+    STATE_VECTOR_LENGTH = 17
+    LONGITUDE, LATITUDE, BARO_ALTITUDE = 5, 6, 7
     
-    @classmethod
-    def from_api_response(cls, data: dict):
-        """Create OpenSkyResponse from API JSON response"""
-        states = []
-        if data.get('states'):
-            for state_vector in data['states']:
-                try:
-                    states.append(OpenSkyState.from_state_vector(state_vector))
-                except (IndexError, TypeError, ValueError) as e:
-                    # Skip malformed state vectors
+    def __init__(self, state_vectors: Optional[list]):
+        rows = []
+        positions = []
+        for state_vector in state_vectors or ():
+            try:
+                if len(state_vector) < self.STATE_VECTOR_LENGTH:
                     continue
+                lat = state_vector[self.LATITUDE]
+                lon = state_vector[self.LONGITUDE]
+                alt = state_vector[self.BARO_ALTITUDE]
+                if lat is None or lon is None or alt is None:
+                    continue
+                positions.append((float(lat), float(lon), float(alt)))
+            except (TypeError, ValueError):
+                # Skip malformed state vectors
+                continue
+            rows.append(state_vector)
         
-        return cls(
-            time=data.get('time', 0),
-            states=states
-        )
+        self.state_vectors = rows
+        columns = np.array(positions, dtype=np.float64).reshape(-1, 3)
+        self.latitude = columns[:, 0]
+        self.longitude = columns[:, 1]
+        self.baro_altitude = columns[:, 2]
+    
+    def __len__(self) -> int:
+        return len(self.state_vectors)
+    
+    def state(self, index: int) -> OpenSkyState:
+        """Build the validated OpenSkyState for one row"""
+        return OpenSkyState.from_state_vector(self.state_vectors[index])
 
 
 # Internal calculation models
@@ -2,13 +2,16 @@
 Admin Service - Clean business logic for admin operations
 Extracts all admin database queries and business logic from HTTP endpoints
 """
-import json
+import asyncio
+import time
 import asyncpg
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 from dataclasses import dataclass
 
-@dataclass 
+STATS_CACHE_TTL_SECONDS = 60
+
+@dataclass(slots=True, frozen=True)
 class AdminStats:
     total_sightings: int
     total_media_files: int
@@ -20,7 +23,7 @@ class AdminStats:
     confirmations_today: int
     database_size_mb: Optional[float] = None
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class SightingAdmin:
     id: str
     title: Optional[str]
@@ -33,31 +36,62 @@ class SightingAdmin:
     witness_count: int
 
 class AdminService:
+    # Shared across instances - routers create an AdminService per request
+    _stats_cache: Optional[Tuple[float, AdminStats]] = None
+    _stats_lock = asyncio.Lock()
+    
     def __init__(self, db_pool):
         self.db_pool = db_pool
     
+    @classmethod
+    def invalidate_stats(cls) -> None:
+        """Drop cached dashboard stats after sightings change"""
+        cls._stats_cache = None
+    
     async def get_dashboard_stats(self) -> AdminStats:
-        """Get admin dashboard statistics"""
-        async with self.db_pool.acquire() as conn:
-            # Get basic counts
-            total_sightings = await conn.fetchval("SELECT COUNT(*) FROM sightings") or 0
-            sightings_today = await conn.fetchval("""
-                SELECT COUNT(*) FROM sightings 
-                WHERE created_at >= CURRENT_DATE
-            """) or 0
-            sightings_this_week = await conn.fetchval("""
-                SELECT COUNT(*) FROM sightings 
-                WHERE created_at >= CURRENT_DATE - INTERVAL '7 days'
-            """) or 0
+        """Get admin dashboard statistics, cached for STATS_CACHE_TTL_SECONDS"""
+        cached = AdminService._stats_cache
+        if cached and time.monotonic() - cached[0] < STATS_CACHE_TTL_SECONDS:
+            return cached[1]
+        
+        # Serve the last good value while another request refreshes
+        if cached and AdminService._stats_lock.locked():
+            return cached[1]
+        
+        async with AdminService._stats_lock:
+            cached = AdminService._stats_cache
+            if cached and time.monotonic() - cached[0] < STATS_CACHE_TTL_SECONDS:
+                return cached[1]
             
-            # Get witness confirmations
-            total_confirmations = await conn.fetchval("""
-                SELECT COUNT(*) FROM witness_confirmations
-            """) or 0
-            confirmations_today = await conn.fetchval("""
-                SELECT COUNT(*) FROM witness_confirmations 
-                WHERE confirmed_at >= CURRENT_DATE
-            """) or 0
+            stats = await self._fetch_dashboard_stats()
+            AdminService._stats_cache = (time.monotonic(), stats)
+            return stats
+    
+    async def _fetch_dashboard_stats(self) -> AdminStats:
+        """Query dashboard statistics from the database"""
+        async with self.db_pool.acquire() as conn:
+            # All sighting and witness counters in one round-trip
+            counts = await conn.fetchrow("""
+                WITH s AS (
+                    SELECT
+                        COUNT(*) AS total,
+                        COUNT(*) FILTER (WHERE created_at >= CURRENT_DATE) AS today,
+                        COUNT(*) FILTER (WHERE created_at >= CURRENT_DATE - INTERVAL '7 days') AS week
+                    FROM sightings
+                ), w AS (
+                    SELECT
+                        COUNT(*) AS total,
+                        COUNT(*) FILTER (WHERE confirmed_at >= CURRENT_DATE) AS today
+                    FROM witness_confirmations
+                )
+                SELECT
+                    s.total AS total_sightings,
+                    s.today AS sightings_today,
+                    s.week AS sightings_this_week,
+                    w.total AS total_confirmations,
+                    w.today AS confirmations_today
+                FROM s, w
+            """)
             
             # Get database size
             try:
@@ -73,14 +107,14 @@ class AdminService:
                 size_mb = None
             
             return AdminStats(
-                total_sightings=total_sightings,
+                total_sightings=counts['total_sightings'] or 0,
                 total_media_files=0,  # TODO: implement
-                sightings_today=sightings_today,
-                sightings_this_week=sightings_this_week,
+                sightings_today=counts['sightings_today'] or 0,
+                sightings_this_week=counts['sightings_this_week'] or 0,
                 pending_sightings=0,  # TODO: implement
                 verified_sightings=0,  # TODO: implement
-                total_witness_confirmations=total_confirmations,
-                confirmations_today=confirmations_today,
+                total_witness_confirmations=counts['total_confirmations'] or 0,
+                confirmations_today=counts['confirmations_today'] or 0,
                 database_size_mb=size_mb
             )
     
@@ -96,16 +130,14 @@ class AdminService:
                     s.status,
                     s.created_at,
                     s.witness_count,
-                    s.enrichment_data,
-                    COALESCE(
-                        (SELECT COUNT(*) FROM unnest(
-                            CASE 
-                                WHEN s.media_info::text != '{}' 
-                                THEN COALESCE((s.media_info->'files')::jsonb, '[]'::jsonb)
-                                ELSE '[]'::jsonb
-                            END
-                        )), 0
-                    ) as media_count
+                    COALESCE(s.enrichment_data->'location'->>'name', 'Unknown Location') as location_name,
+                    COALESCE(jsonb_array_length(
+                        CASE 
+                            WHEN jsonb_typeof(s.media_info->'files') = 'array' 
+                            THEN s.media_info->'files'
+                            ELSE '[]'::jsonb
+                        END
+                    ), 0) as media_count
                 FROM sightings s
                 ORDER BY s.created_at DESC 
                 LIMIT $1
@@ -113,18 +145,6 @@ class AdminService:
             
             sightings = []
             for row in rows:
-                # Extract location name from enrichment data
-                location_name = "Unknown Location"
-                if row['enrichment_data']:
-                    try:
-                        enrichment = row['enrichment_data']
-                        if isinstance(enrichment, str):
-                            enrichment = json.loads(enrichment)
-                        if enrichment and 'location' in enrichment:
-                            location_name = enrichment['location'].get('name', 'Unknown Location')
-                    except:
-                        pass
-                
                 sightings.append(SightingAdmin(
                     id=row['id'],
                     title=row['title'],
@@ -132,7 +152,7 @@ class AdminService:
                     category=row['category'] or 'ufo',
                     status=row['status'] or 'created',
                     created_at=row['created_at'],
-                    location_name=location_name,
+                    location_name=row['location_name'],
                     media_count=row['media_count'] or 0,
                     witness_count=row['witness_count'] or 0
                 ))
@@ -140,83 +160,79 @@ class AdminService:
             return sightings
     
     async def delete_sighting(self, sighting_id: str) -> bool:
-        """Delete a sighting and all related data"""
+        """Delete a sighting - witness confirmations go with it via ON DELETE CASCADE"""
         async with self.db_pool.acquire() as conn:
-            async with conn.transaction():
-                # Delete related records first
-                await conn.execute("""
-                    DELETE FROM witness_confirmations WHERE sighting_id = $1
-                """, sighting_id)
-                
-                # Delete the sighting
-                result = await conn.execute("""
-                    DELETE FROM sightings WHERE id = $1
-                """, sighting_id)
-                
-                return "DELETE 1" in result
+            deleted = bool(await conn.fetchval("""
+                DELETE FROM sightings WHERE id = $1 RETURNING 1
+            """, sighting_id))
+        
+        if deleted:
+            self.invalidate_stats()
+        return deleted
     
     async def verify_sighting(self, sighting_id: str) -> bool:
         """Mark sighting as verified"""
         async with self.db_pool.acquire() as conn:
-            result = await conn.execute("""
+            verified = bool(await conn.fetchval("""
                 UPDATE sightings 
                 SET status = 'verified', updated_at = NOW()
                 WHERE id = $1
-            """, sighting_id)
-            
-            return "UPDATE 1" in result
+                RETURNING 1
+            """, sighting_id))
+        
+        if verified:
+            self.invalidate_stats()
+        return verified
     
-    async def get_all_sightings(self, limit: int = 50, offset: int = 0) -> List[SightingAdmin]:
-        """Get all sightings for admin management with pagination"""
+    async def get_all_sightings(
+        self,
+        limit: int = 50,
+        after_created_at: Optional[datetime] = None,
+        after_id: Optional[str] = None
+    ) -> List[SightingAdmin]:
+        """
+        Get all sightings for admin management with keyset pagination
+        Pass the last returned sighting's (created_at, id) to fetch the next page;
+        with only after_created_at, rows strictly older than it are returned
+        """
         async with self.db_pool.acquire() as conn:
             rows = await conn.fetch("""
                 SELECT 
                     s.id::text, 
                     s.title, 
-                    s.description, 
+                    COALESCE(LEFT(s.description, 100), '') as description_short,
+                    COALESCE(length(s.description) > 100, false) as description_truncated,
                     s.category, 
                     s.status,
                     s.alert_level,
                     s.created_at,
                     s.witness_count,
-                    s.enrichment_data,
-                    s.media_info,
-                    COALESCE(
-                        (SELECT COUNT(*) FROM unnest(
-                            CASE 
-                                WHEN s.media_info::text != '{}' 
-                                THEN COALESCE((s.media_info->'files')::jsonb, '[]'::jsonb)
-                                ELSE '[]'::jsonb
-                            END
-                        )), 0
-                    ) as media_count
+                    COALESCE(s.enrichment_data->'location'->>'name', 'Unknown Location') as location_name,
+                    COALESCE(jsonb_array_length(
+                        CASE 
+                            WHEN jsonb_typeof(s.media_info->'files') = 'array' 
+                            THEN s.media_info->'files'
+                            ELSE '[]'::jsonb
+                        END
+                    ), 0) as media_count
                 FROM sightings s
-                ORDER BY s.created_at DESC 
-                LIMIT $1 OFFSET $2
-            """, limit, offset)
+                WHERE $2::timestamptz IS NULL
+                   OR ($3::uuid IS NULL AND s.created_at < $2::timestamptz)
+                   OR (s.created_at, s.id) < ($2::timestamptz, $3::uuid)
+                ORDER BY s.created_at DESC, s.id DESC
+                LIMIT $1
+            """, limit, after_created_at, after_id)
             
             sightings = []
             for row in rows:
-                # Extract location name from enrichment data
-                location_name = "Unknown Location"
-                if row['enrichment_data']:
-                    try:
-                        enrichment = row['enrichment_data']
-                        if isinstance(enrichment, str):
-                            enrichment = json.loads(enrichment)
-                        if enrichment and 'location' in enrichment:
-                            location_name = enrichment['location'].get('name', 'Unknown Location')
-                    except:
-                        pass
-                
                 sightings.append(SightingAdmin(
                     id=row['id'],
                     title=row['title'] or 'Untitled',
-                    description=(row['description'] or '')[:100] + '...' if row['description'] and len(row['description']) > 100 else row['description'] or '',
+                    description=row['description_short'] + ('...' if row['description_truncated'] else ''),
                     category=row['category'] or 'ufo',
                     status=row['status'] or 'created',
                     created_at=row['created_at'],
-                    location_name=location_name,
+                    location_name=row['location_name'],
                     media_count=row['media_count'] or 0,
                     witness_count=row['witness_count'] or 0
                 ))
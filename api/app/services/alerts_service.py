@@ -2,216 +2,421 @@
 Alerts Service - Clean business logic for UFO sightings/alerts
 Extracts all the database and business logic from HTTP endpoints
 """
-import json
+import asyncio
 import uuid
 import math
+import random
+from collections import OrderedDict
 from datetime import datetime
-from typing import List, Dict, Optional, Tuple
-from dataclasses import dataclass
-
-@dataclass
-class AlertLocation:
-    latitude: float
-    longitude: float
-    name: str = "Unknown Location"
-    accuracy: float = 50.0
-
-@dataclass
-class Alert:
-    id: str
-    title: Optional[str]
-    description: Optional[str]
-    category: str
-    location: AlertLocation
-    witness_count: int
-    alert_level: str
-    created_at: datetime
-    reporter_id: Optional[str] = None
-    reporter_username: Optional[str] = None
-    media_files: List[Dict] = None
-    enrichment: Dict = None
+from functools import partial
+from typing import List, Dict, Optional, Set, Tuple
+
+import orjson
+
+from app.services.cache_service import invalidate_profile_cache
+from app.services.database_service import encode_jsonb
+from app.services.enrichment_service import (
+    EnrichmentContext,
+    enrichment_orchestrator,
+    initialize_enrichment_processors,
+)
+
+def _dumps(obj) -> str:
+    """Serialize a jsonb parameter (asyncpg expects str without a codec)"""
+    return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode()
+
+EARTH_RADIUS_KM = 6371.0
+
+def _optional_float(value) -> Optional[float]:
+    return None if value is None else float(value)
+
+_PG_TRUE = frozenset(('t', 'true', 'y', 'yes', 'on', '1'))
+
+def _optional_bool(value) -> Optional[bool]:
+    """Mirror Postgres text-to-boolean for values clients send as strings"""
+    if value is None or isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in _PG_TRUE
+
+_EMPTY_JSON = '{}'
+
+def _json_or_empty(value) -> str:
+    """jsonb parameter for an optional dict; pre-serialized JSON text passes through"""
+    if not value:
+        return _EMPTY_JSON
+    return encode_jsonb(value)
+
+def _parse_json(data) -> Optional[dict]:
+    """Return a decoded jsonb object, or None - str/bytes only show up on pools without register_jsonb_codec"""
+    if type(data) is dict:
+        return data or None
+    if type(data) is str or type(data) is bytes:
+        try:
+            return orjson.loads(data) or None
+        except ValueError:
+            return None
+    return None
+
+# Background beep enrichment: bounded so bursts don't flood weather/geocoding
+# APIs; the set holds strong refs so pending tasks aren't garbage collected
+MAX_CONCURRENT_ENRICHMENTS = 16
+_enrichment_semaphore = asyncio.Semaphore(MAX_CONCURRENT_ENRICHMENTS)
+_enrichment_tasks: Set[asyncio.Task] = set()
+
+# Anonymous beep privacy jitter: 100m radius at 111km per degree latitude
+_JITTER_RADIUS_DEG = 100 / 111000
+_TAU = 2 * math.pi
+_jitter_rng = random.Random()  # seeded from os.urandom; independent of global random state
+
+MEDIA_BASE_URL = "https://api.ufobeep.com/media"
+VIDEO_EXTS = frozenset(('mp4', 'mov', 'avi'))
+
+# Location fields are extracted and validated Postgres-side so rows arrive
+# with final lat/lng instead of sensor_data/enrichment_data blobs to decode
+_ALERT_COLUMNS = """
+    s.id::text, s.title, s.description,
+    COALESCE(NULLIF(s.category, ''), 'ufo') AS category,
+    COALESCE(NULLIF(s.alert_level, ''), 'low') AS alert_level,
+    COALESCE(NULLIF(s.witness_count, 0), 1) AS witness_count,
+    s.created_at, s.updated_at, COALESCE(s.reporter_id::text, '') AS reporter_id,
+    s.media_info->'files' AS media_files, s.enrichment_data,
+    u.username as reporter_username,
+    -- Prefer enrichment geocoding (has processed location name), else sensor coords
+    CASE WHEN v.geo_ok THEN c.geo_lat WHEN v.sensor_ok THEN c.sensor_lat END AS lat,
+    CASE WHEN v.geo_ok THEN c.geo_lng WHEN v.sensor_ok THEN c.sensor_lng END AS lng,
+    CASE WHEN v.geo_ok
+         THEN COALESCE(NULLIF(j.geo->>'location_name', ''), j.geo->>'formatted_address', 'Unknown Location')
+         ELSE 'Unknown Location' END AS location_name
+"""
+
+# Legacy rows store some coords as numeric strings, which the old Python path
+# accepted via float(); anything else non-numeric counts as missing
+_NUMERIC_TEXT_RE = r'^\s*[-+]?(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?\s*$'
+
+
+def _jsonb_coord(value: str) -> str:
+    """SQL casting a jsonb number or numeric string to float8, else NULL"""
+    return f"""CASE WHEN jsonb_typeof({value}) = 'number' THEN ({value})::float8
+                    WHEN jsonb_typeof({value}) = 'string' AND ({value} #>> '{{}}') ~ '{_NUMERIC_TEXT_RE}'
+                    THEN ({value} #>> '{{}}')::float8 END"""
+
+
+# sensor_data has coords either under "location" or at the top level;
+# coords at 0 or out of range are treated as missing
+_ALERT_FROM = f"""
+    sightings s
+    LEFT JOIN users u ON s.reporter_id = u.id::text
+    CROSS JOIN LATERAL (
+        SELECT s.enrichment_data->'geocoding' AS geo,
+               {_jsonb_coord("s.enrichment_data->'geocoding'->'latitude'")} AS geo_lat,
+               {_jsonb_coord("s.enrichment_data->'geocoding'->'longitude'")} AS geo_lng,
+               {_jsonb_coord("s.sensor_data->'location'->'latitude'")} AS loc_lat,
+               {_jsonb_coord("s.sensor_data->'location'->'longitude'")} AS loc_lng,
+               {_jsonb_coord("s.sensor_data->'latitude'")} AS top_lat,
+               {_jsonb_coord("s.sensor_data->'longitude'")} AS top_lng
+    ) j
+    CROSS JOIN LATERAL (
+        SELECT j.geo_lat, j.geo_lng,
+               CASE WHEN j.loc_lat IS NOT NULL AND j.loc_lng IS NOT NULL
+                    THEN j.loc_lat ELSE j.top_lat END AS sensor_lat,
+               CASE WHEN j.loc_lat IS NOT NULL AND j.loc_lng IS NOT NULL
+                    THEN j.loc_lng ELSE j.top_lng END AS sensor_lng
+    ) c
+    CROSS JOIN LATERAL (
+        SELECT c.geo_lat BETWEEN -90 AND 90 AND c.geo_lat <> 0
+               AND c.geo_lng BETWEEN -180 AND 180 AND c.geo_lng <> 0 AS geo_ok,
+               c.sensor_lat BETWEEN -90 AND 90 AND c.sensor_lat <> 0
+               AND c.sensor_lng BETWEEN -180 AND 180 AND c.sensor_lng <> 0 AS sensor_ok
+    ) v
+"""
+
+# Hot read queries are fixed strings so asyncpg's per-connection statement
+# cache reuses the prepared statement instead of re-parsing on every call
+_RECENT_ALERTS_SQL = f"""
+    SELECT {_ALERT_COLUMNS}
+    FROM {_ALERT_FROM}
+    WHERE s.is_public = true
+      AND ($2::timestamptz IS NULL OR s.created_at < $2::timestamptz)
+    ORDER BY s.created_at DESC
+    LIMIT $1
+"""
+
+_ALERT_BY_ID_SQL = f"""
+    SELECT {_ALERT_COLUMNS}
+    FROM {_ALERT_FROM}
+    WHERE s.id = $1 AND s.is_public = true
+"""
+
+_BATCH_ENRICHMENT_SQL = """
+    UPDATE sightings s
+    SET enrichment_data = v.data
+    FROM unnest($1::uuid[], $2::jsonb[]) AS v(id, data)
+    WHERE s.id = v.id
+"""
+
+# Enrichment writes from concurrent beeps are coalesced into one UPDATE per pool.
+# Keyed by pool because AlertsService is constructed per request
+ENRICHMENT_FLUSH_DELAY_SECONDS = 0.05
+_pending_enrichment: Dict[object, List[Tuple[uuid.UUID, str, asyncio.Future]]] = {}
+_enrichment_flush_tasks: Dict[object, asyncio.Task] = {}
+
+# Validates window, duplicate, rate limit and distance, then inserts and bumps
+# witness_count only when every check passes - one round-trip per confirmation.
+# The flags come back so the caller can report which check failed.
+# Relies on uq_witness_confirmations_sighting_device for ON CONFLICT.
+_CONFIRM_WITNESS_SQL = f"""
+    WITH s AS (
+        SELECT id, created_at,
+               CASE WHEN jsonb_typeof(sensor_data->'location'->'latitude') = 'number'
+                    THEN (sensor_data->'location'->'latitude')::float8 END AS lat,
+               CASE WHEN jsonb_typeof(sensor_data->'location'->'longitude') = 'number'
+                    THEN (sensor_data->'location'->'longitude')::float8 END AS lng,
+               CASE WHEN jsonb_typeof(enrichment_data->'weather'->'visibility_km') = 'number'
+                    THEN (enrichment_data->'weather'->'visibility_km')::float8 END AS visibility_km
+        FROM sightings
+        WHERE id = $1
+    ), chk AS (
+        SELECT s.created_at,
+               floor(EXTRACT(EPOCH FROM NOW() - s.created_at) / 60)::int AS age_minutes,
+               (NOW() - s.created_at) < make_interval(mins => $3) AS within_window,
+               EXISTS (
+                   SELECT 1 FROM witness_confirmations wc
+                   WHERE wc.sighting_id = s.id AND wc.device_id = $2
+               ) AS already_confirmed,
+               (SELECT COUNT(*) FROM witness_confirmations wc
+                WHERE wc.device_id = $2 AND wc.confirmed_at > NOW() - INTERVAL '1 hour') AS recent_confirmations,
+               -- 2x the actual visibility for this sighting, default 2x 25km
+               COALESCE(s.visibility_km * 2.0, 50.0) AS max_distance_km,
+               -- Haversine, only when both the witness and the sighting have coords
+               CASE WHEN $5::float8 IS NOT NULL AND $6::float8 IS NOT NULL
+                         AND s.lat <> 0 AND s.lng <> 0
+                    THEN 2 * {EARTH_RADIUS_KM} * asin(LEAST(1.0, sqrt(
+                             power(sin(radians($5::float8 - s.lat) / 2), 2)
+                             + cos(radians(s.lat)) * cos(radians($5::float8))
+                               * power(sin(radians($6::float8 - s.lng) / 2), 2))))
+               END AS distance_km
+        FROM s
+    ), ins AS (
+        INSERT INTO witness_confirmations
+        (sighting_id, device_id, witness_latitude, witness_longitude,
+         witness_altitude, location_accuracy, still_visible, confirmation_data)
+        SELECT $1, $2,
+               $8::float8, $9::float8, $10::float8, $11::float8, $12::boolean,
+               $7::jsonb
+        FROM chk
+        WHERE chk.within_window
+          AND NOT chk.already_confirmed
+          AND chk.recent_confirmations < $4
+          AND (chk.distance_km IS NULL OR chk.distance_km <= chk.max_distance_km)
+        ON CONFLICT (sighting_id, device_id) DO NOTHING
+        RETURNING 1
+    ), upd AS (
+        UPDATE sightings
+        SET witness_count = witness_count + 1
+        WHERE id = $1 AND EXISTS (SELECT 1 FROM ins)
+        RETURNING witness_count
+    )
+    SELECT chk.*,
+           EXISTS (SELECT 1 FROM ins) AS inserted,
+           (SELECT witness_count FROM upd) AS witness_count,
+           -- The CTE snapshot doesn't see the new row, so add it back
+           (SELECT COUNT(*) FROM witness_confirmations WHERE sighting_id = $1)
+               + (SELECT COUNT(*) FROM ins) AS total_confirmations,
+           -- Profile stats are cached per user, not per device
+           (SELECT user_id::text FROM user_devices WHERE device_id = $2) AS user_id
+    FROM chk
+"""
+
+_WITNESS_SIGHTING_SQL = """
+    SELECT id, witness_count, created_at,
+           floor(EXTRACT(EPOCH FROM NOW() - created_at) / 60)::int AS age_minutes,
+           (SELECT COUNT(*) FROM witness_confirmations WHERE sighting_id = $1) AS total_confirmations
+    FROM sightings WHERE id = $1
+"""
+
+# ISO 8601 with an explicit offset, like datetime.isoformat() on an aware value
+_ISO_TIMESTAMP_FORMAT = 'YYYY-MM-DD"T"HH24:MI:SS.USTZH:TZM'
+
+# Only the three fields the aggregation shows; the jsonb comparisons mirror
+# Python truthiness so the blob itself never leaves Postgres
+_WITNESS_CONFIRMATIONS_SQL = """
+    SELECT left(device_id, 8) || '...' AS device_id,
+           to_char(confirmed_at, '""" + _ISO_TIMESTAMP_FORMAT + """') AS confirmed_at,
+           COALESCE(confirmation_data->'confidence', '"medium"'::jsonb) AS confidence,
+           COALESCE(confirmation_data->'description'
+                    NOT IN ('null', '""', 'false', '0', '[]', '{}'), false) AS has_description,
+           COALESCE(confirmation_data->'location'
+                    NOT IN ('null', '""', 'false', '0', '[]', '{}'), false) AS has_location
+    FROM witness_confirmations
+    WHERE sighting_id = $1
+    ORDER BY confirmed_at ASC
+    LIMIT $2
+"""
+
+_WITNESS_STATUS_SQL = """
+    SELECT device_id, to_char(confirmed_at, '""" + _ISO_TIMESTAMP_FORMAT + """') AS confirmed_at
+    FROM witness_confirmations
+    WHERE sighting_id = $1 AND device_id = $2
+"""
+
+def _abandon_enrichment_flush(db_pool, task: asyncio.Task) -> None:
+    """Cancel the writers of a flush that ended before taking its batch"""
+    if _enrichment_flush_tasks.get(db_pool) is task:
+        del _enrichment_flush_tasks[db_pool]
+        for _, _, future in _pending_enrichment.pop(db_pool, []):
+            future.cancel()
+
+
+async def _flush_enrichment(db_pool) -> None:
+    """Write every enrichment queued for db_pool during the debounce window in one UPDATE"""
+    await asyncio.sleep(ENRICHMENT_FLUSH_DELAY_SECONDS)
+    # Writes queued from here on start a new flush
+    del _enrichment_flush_tasks[db_pool]
+    batch = _pending_enrichment.pop(db_pool)
+    
+    try:
+        async with db_pool.acquire() as conn:
+            await conn.execute(
+                _BATCH_ENRICHMENT_SQL,
+                [sighting_id for sighting_id, _, _ in batch],
+                [data for _, data, _ in batch]
+            )
+    except asyncio.CancelledError:
+        for _, _, future in batch:
+            future.cancel()
+        raise
+    except Exception as e:
+        for _, _, future in batch:
+            if not future.done():
+                future.set_exception(e)
+        return
+    
+    for _, _, future in batch:
+        if not future.done():
+            future.set_result(None)
+
 
 class AlertsService:
+    # Processed media lists keyed by (sighting_id, updated_at); media writers
+    # bump updated_at, so edits miss the cache instead of needing invalidation
+    MEDIA_CACHE_MAX_ENTRIES = 4096
+    _media_cache: "OrderedDict[tuple, List[Dict]]" = OrderedDict()
+    
     def __init__(self, db_pool):
         self.db_pool = db_pool
     
-    async def get_recent_alerts(self, limit: int = 20) -> List[Alert]:
-        """Get recent public alerts with clean data structure"""
+    async def get_recent_alerts(self, limit: int = 20,
+                                created_before: Optional[datetime] = None) -> List[Dict]:
+        """Get recent public alerts shaped for the API response
+
+        Pass the last page's oldest created_at as created_before to load the next page
+        """
         async with self.db_pool.acquire() as conn:
-            rows = await conn.fetch("""
-                SELECT s.id::text, s.title, s.description, s.category, s.alert_level, 
-                       s.witness_count, s.created_at, s.reporter_id, s.sensor_data, s.media_info, s.enrichment_data,
-                       u.username as reporter_username
-                FROM sightings s
-                LEFT JOIN users u ON s.reporter_id = u.id::text
-                WHERE s.is_public = true 
-                ORDER BY s.created_at DESC 
-                LIMIT $1
-            """, limit)
+            rows = await conn.fetch(_RECENT_ALERTS_SQL, limit, created_before)
             
-            alerts = []
-            for row in rows:
-                location = self._extract_location(row["sensor_data"], row["enrichment_data"])
-                if location:  # Only include alerts with valid locations
-                    alerts.append(Alert(
-                        id=row["id"],
-                        title=row["title"],
-                        description=row["description"],
-                        category=row["category"] or "ufo",
-                        location=location,
-                        witness_count=row["witness_count"] or 1,
-                        alert_level=row["alert_level"] or "low",
-                        created_at=row["created_at"],
-                        reporter_id=row["reporter_id"],
-                        reporter_username=row["reporter_username"],
-                        media_files=self._process_media(row["media_info"], row["id"]),
-                        enrichment=self._process_enrichment(row["enrichment_data"])
-                    ))
-            
-            return alerts
+            alert_response = self._alert_response
+            # Only include alerts with valid locations
+            return [alert_response(row) for row in rows if row["lat"] is not None]
     
-    async def get_alert_by_id(self, alert_id: str) -> Optional[Alert]:
-        """Get single alert by ID"""
+    async def get_alert_by_id(self, alert_id: str) -> Optional[Dict]:
+        """Get single alert by ID shaped for the API response"""
         async with self.db_pool.acquire() as conn:
-            row = await conn.fetchrow("""
-                SELECT s.id::text, s.title, s.description, s.category, s.alert_level,
-                       s.witness_count, s.created_at, s.reporter_id, s.sensor_data, s.media_info, s.enrichment_data,
-                       u.username as reporter_username
-                FROM sightings s
-                LEFT JOIN users u ON s.reporter_id = u.id::text
-                WHERE s.id = $1 AND s.is_public = true
-            """, uuid.UUID(alert_id))
+            # asyncpg's uuid codec parses the string in C; no uuid.UUID round-trip
+            row = await conn.fetchrow(_ALERT_BY_ID_SQL, alert_id)
             
-            if not row:
-                return None
-                
-            location = self._extract_location(row["sensor_data"], row["enrichment_data"])
-            if not location:
+            if not row or row["lat"] is None:
                 return None
-                
-            return Alert(
-                id=row["id"],
-                title=row["title"],
-                description=row["description"],
-                category=row["category"] or "ufo",
-                location=location,
-                witness_count=row["witness_count"] or 1,
-                alert_level=row["alert_level"] or "low",
-                created_at=row["created_at"],
-                reporter_id=row["reporter_id"],
-                reporter_username=row["reporter_username"],
-                media_files=self._process_media(row["media_info"], row["id"]),
-                enrichment=self._process_enrichment(row["enrichment_data"])
-            )
+            
+            return self._alert_response(row)
     
-    def _extract_location(self, sensor_data, enrichment_data) -> Optional[AlertLocation]:
-        """Extract location from sensor/enrichment data - unified logic"""
-        # Try enrichment data first (has processed location name)
-        if enrichment_data:
-            enrichment = self._parse_json(enrichment_data)
-            if enrichment and "geocoding" in enrichment:
-                geocoding = enrichment["geocoding"]
-                lat = geocoding.get("latitude")
-                lng = geocoding.get("longitude")
-                location_name = geocoding.get("location_name") or geocoding.get("formatted_address", "Unknown Location")
-                if self._valid_coords(lat, lng):
-                    return AlertLocation(
-                        latitude=float(lat),
-                        longitude=float(lng),
-                        name=location_name,
-                        accuracy=50.0
-                    )
-        
-        # Fall back to sensor data
-        if sensor_data:
-            sensor = self._parse_json(sensor_data)
-            if sensor:
-                lat, lng = self._extract_coords_from_sensor(sensor)
-                if self._valid_coords(lat, lng):
-                    return AlertLocation(
-                        latitude=lat,
-                        longitude=lng,
-                        name="Unknown Location"
-                    )
-        
-        return None
+    def _alert_response(self, row) -> Dict:
+        """Build the wire-format alert dict straight from a _ALERT_COLUMNS row"""
+        created_at = row["created_at"].isoformat()
+        witness_count = row["witness_count"]
+        return {
+            "id": row["id"],
+            "title": row["title"],
+            "description": row["description"],
+            "category": row["category"],
+            "alert_level": row["alert_level"],
+            "status": "active",
+            "witness_count": witness_count,
+            "created_at": created_at,
+            "location": {
+                "latitude": row["lat"],
+                "longitude": row["lng"],
+                "name": row["location_name"]
+            },
+            "distance_km": 0.0,
+            "bearing_deg": 0.0,
+            "view_count": 0,
+            "verification_score": 0.0,
+            "media_files": self._cached_media(row),
+            "tags": [],
+            "is_public": True,
+            "submitted_at": created_at,
+            "processed_at": created_at,
+            "matrix_room_id": "",
+            "reporter_id": row["reporter_id"],
+            "reporter_username": row["reporter_username"],
+            "enrichment": self._process_enrichment(row["enrichment_data"]),
+            "photo_analysis": [],
+            "total_confirmations": witness_count,
+            "can_confirm_witness": True
+        }
     
-    def _extract_coords_from_sensor(self, sensor_data: dict) -> Tuple[Optional[float], Optional[float]]:
-        """Extract coords from sensor data - handles both formats"""
-        if "location" in sensor_data and isinstance(sensor_data["location"], dict):
-            location = sensor_data["location"]
-            lat = location.get("latitude")
-            lng = location.get("longitude")
-            if lat is not None and lng is not None:
-                return float(lat), float(lng)
+    def _cached_media(self, row) -> List[Dict]:
+        """_process_media for a sighting row, reusing the result until updated_at changes"""
+        key = (row["id"], row["updated_at"])
+        cache = self._media_cache
+        media_files = cache.get(key)
+        if media_files is not None:
+            cache.move_to_end(key)
+            return media_files
         
-        lat = sensor_data.get("latitude")
-        lng = sensor_data.get("longitude")
-        if lat is not None and lng is not None:
-            return float(lat), float(lng)
-        
-        return None, None
-    
-    def _valid_coords(self, lat, lng) -> bool:
-        """Check if coordinates are valid"""
-        return (lat is not None and lng is not None and 
-                lat != 0.0 and lng != 0.0 and
-                -90 <= lat <= 90 and -180 <= lng <= 180)
-    
-    def _parse_json(self, data) -> Optional[dict]:
-        """Safely parse JSON data"""
-        if not data:
-            return None
-        try:
-            if isinstance(data, str):
-                return json.loads(data)
-            return data
-        except:
-            return None
+        media_files = self._process_media(row["media_files"], row["id"])
+        cache[key] = media_files
+        if len(cache) > self.MEDIA_CACHE_MAX_ENTRIES:
+            cache.popitem(last=False)
+        return media_files
     
-    def _process_media(self, media_info, sighting_id: str) -> List[Dict]:
-        """Process media files into clean format"""
+    def _process_media(self, files, sighting_id: str) -> List[Dict]:
+        """Process media_info->'files' into clean format"""
         media_files = []
-        if media_info:
-            media = self._parse_json(media_info)
-            if media and isinstance(media, dict) and "files" in media:
-                for media_file in media["files"]:
-                    filename = media_file.get("filename", "")
-                    media_url = f"https://api.ufobeep.com/media/{sighting_id}/{filename}"
-                    
-                    # Determine media type
-                    media_type = media_file.get("type", "image")
-                    if not media_type or media_type == "unknown":
-                        media_type = "video" if any(ext in filename.lower() for ext in ['.mp4', '.mov', '.avi']) else "image"
-                    
-                    # Use new URL structure if available, fallback to old
-                    thumbnail_url = media_file.get("thumbnail_url") or (f"{media_url}?thumbnail=true" if media_type == "video" else media_url)
-                    web_url = media_file.get("web_url", media_url)
-                    preview_url = media_file.get("preview_url", thumbnail_url)
-                    
-                    media_entry = {
-                        "type": media_type,
-                        "url": media_url,
-                        "thumbnail_url": thumbnail_url,
-                        "web_url": web_url,
-                        "preview_url": preview_url,
-                        "filename": filename
-                    }
-                    
-                    # Include EXIF data if available (for plate solving)
-                    if 'exif_data' in media_file:
-                        media_entry['exif_data'] = media_file['exif_data']
-                    
-                    media_files.append(media_entry)
+        if files and isinstance(files, list):
+            url_prefix = f"{MEDIA_BASE_URL}/{sighting_id}/"
+            for media_file in files:
+                filename = media_file.get("filename", "")
+                media_url = url_prefix + filename
+                
+                # Determine media type
+                media_type = media_file.get("type", "image")
+                if not media_type or media_type == "unknown":
+                    ext = filename.rpartition('.')[2].lower()
+                    media_type = "video" if ext in VIDEO_EXTS else "image"
+                
+                # Use new URL structure if available, fallback to old
+                thumbnail_url = media_file.get("thumbnail_url") or (media_url + "?thumbnail=true" if media_type == "video" else media_url)
+                
+                media_entry = {
+                    "type": media_type,
+                    "url": media_url,
+                    "thumbnail_url": thumbnail_url,
+                    "web_url": media_file.get("web_url", media_url),
+                    "preview_url": media_file.get("preview_url", thumbnail_url),
+                    "filename": filename
+                }
+                
+                # Include EXIF data if available (for plate solving)
+                if 'exif_data' in media_file:
+                    media_entry['exif_data'] = media_file['exif_data']
+                
+                media_files.append(media_entry)
         return media_files
     
     def _process_enrichment(self, enrichment_data) -> Dict:
         """Process enrichment data into clean format"""
-        if not enrichment_data:
-            return {}
-        
-        enrichment = self._parse_json(enrichment_data)
-        return enrichment if enrichment else {}
+        return _parse_json(enrichment_data) or {}
     
     async def upsert_user_from_device(self, conn, device_id: str, username: str) -> str:
         """
@@ -260,10 +465,13 @@ class AlertsService:
                 VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12)
                 RETURNING id
             """, title, description, category, witness_count, is_public,
-                tags or [], json.dumps(media_info or {}), 
-                json.dumps(sensor_data or {}), json.dumps(enrichment_data or {}),
+                tags or [], _json_or_empty(media_info),
+                _json_or_empty(sensor_data), _json_or_empty(enrichment_data),
                 alert_level, "created", reporter_id)
             
+            if reporter_id:
+                await invalidate_profile_cache(reporter_id)
+            
             return str(alert_id)
     
     async def create_anonymous_beep(self, device_id: str, location: Dict, 
@@ -275,12 +483,9 @@ class AlertsService:
         if lat == 0.0 and lng == 0.0:
             raise ValueError("Invalid GPS coordinates (0,0)")
         
-        # Apply privacy jittering (100m radius)
-        import random
-        import math
-        jitter_radius = 100 / 111000  # 111km per degree latitude
-        angle = random.uniform(0, 2 * math.pi)
-        distance = random.uniform(0, jitter_radius)
+        # Apply privacy jittering (100m radius); sqrt keeps points uniform over the disk
+        distance = _JITTER_RADIUS_DEG * math.sqrt(_jitter_rng.random())
+        angle = _jitter_rng.random() * _TAU
         
         jittered_lat = lat + (distance * math.cos(angle))
         jittered_lng = lng + (distance * math.sin(angle))
@@ -311,16 +516,21 @@ class AlertsService:
             username=username  # Pass the real username
         )
         
-        # Call enrichment service after alert creation
-        await self._enrich_alert(alert_id, lat, lng, description)
+        # Enrich in the background so the beep response doesn't wait on weather/geocoding
+        task = asyncio.create_task(self._enrich_alert_guarded(alert_id, lat, lng, description))
+        _enrichment_tasks.add(task)
+        task.add_done_callback(_enrichment_tasks.discard)
         
         return alert_id, {"lat": jittered_lat, "lng": jittered_lng}
     
+    async def _enrich_alert_guarded(self, alert_id: str, latitude: float, longitude: float, description: str = None):
+        """_enrich_alert bounded by MAX_CONCURRENT_ENRICHMENTS across all beeps"""
+        async with _enrichment_semaphore:
+            await self._enrich_alert(alert_id, latitude, longitude, description)
+    
     async def _enrich_alert(self, alert_id: str, latitude: float, longitude: float, description: str = None):
         """Call enrichment service for weather and reverse geocoding"""
         try:
-            from app.services.enrichment_service import enrichment_orchestrator, initialize_enrichment_processors, EnrichmentContext
-            
             # Initialize processors if not already done
             if not enrichment_orchestrator.processors:
                 initialize_enrichment_processors()
@@ -347,13 +557,8 @@ class AlertsService:
                 if result.success and result.data:
                     enrichment_data[processor_name] = result.data
             
-            # Update sighting with enrichment data
-            async with self.db_pool.acquire() as conn:
-                await conn.execute("""
-                    UPDATE sightings 
-                    SET enrichment_data = $1
-                    WHERE id = $2
-                """, json.dumps(enrichment_data), uuid.UUID(alert_id))
+            # Update sighting with enrichment data (batched with concurrent beeps)
+            await self._write_enrichment(alert_id, enrichment_data)
             
             print(f"Enrichment completed for alert {alert_id}: {list(enrichment_data.keys())}")
             
@@ -361,183 +566,137 @@ class AlertsService:
             print(f"Enrichment failed for alert {alert_id}: {e}")
             # Don't fail the alert creation if enrichment fails
     
+    async def _write_enrichment(self, alert_id: str, enrichment_data: Dict) -> None:
+        """Queue an enrichment_data write and wait until the batched UPDATE lands"""
+        future = asyncio.get_running_loop().create_future()
+        _pending_enrichment.setdefault(self.db_pool, []).append(
+            (uuid.UUID(alert_id), _dumps(enrichment_data), future)
+        )
+        if self.db_pool not in _enrichment_flush_tasks:
+            task = asyncio.create_task(_flush_enrichment(self.db_pool))
+            # Also fires if the flush is cancelled before it takes the batch
+            task.add_done_callback(partial(_abandon_enrichment_flush, self.db_pool))
+            _enrichment_flush_tasks[self.db_pool] = task
+        await future
+    
     async def confirm_witness(self, sighting_id: str, device_id: str, 
                             witness_data: Dict) -> Dict:
         """Handle witness confirmation with all the complex logic"""
+        from app.config.environment import settings
+        # Time window restriction (MP13-5) - configurable via environment
+        time_window_minutes = settings.witness_confirmation_time_window_minutes
+        sighting_uuid = uuid.UUID(sighting_id)
+        
+        max_confirmations_per_hour = settings.witness_confirmation_rate_limit_per_hour
+        
+        # Typed confirmation columns, bound directly instead of cast out of the jsonb
+        witness_lat = _optional_float(witness_data.get('latitude'))
+        witness_lng = _optional_float(witness_data.get('longitude'))
+        still_visible = _optional_bool(witness_data.get('still_visible'))
+        
+        # Distance is only checked when the witness sent a location
+        has_location = bool(witness_data.get('latitude') and witness_data.get('longitude'))
+        
         async with self.db_pool.acquire() as conn:
-            # Check if sighting exists
-            sighting = await conn.fetchrow("""
-                SELECT id, witness_count, created_at, sensor_data, enrichment_data
-                FROM sightings WHERE id = $1
-            """, sighting_id)
-            
-            if not sighting:
-                raise ValueError("Sighting not found")
-            
-            # Check time window restriction (MP13-5) - configurable via environment
-            from app.config.environment import settings
-            time_window_minutes = settings.witness_confirmation_time_window_minutes
-            
-            # Check if sighting is within time window using database comparison
-            is_within_window = await conn.fetchval("""
-                SELECT (NOW() - created_at) < INTERVAL '%s minutes' 
-                FROM sightings 
-                WHERE id = $1
-            """ % time_window_minutes, uuid.UUID(sighting_id))
-            
-            if not is_within_window:
-                raise ValueError(f"Witness confirmation window has closed. You can only confirm sightings within {time_window_minutes} minutes of occurrence.")
-            
-            # Check if device already confirmed this sighting
-            existing = await conn.fetchrow("""
-                SELECT device_id FROM witness_confirmations 
-                WHERE sighting_id = $1 AND device_id = $2
-            """, sighting_id, device_id)
-            
-            if existing:
-                raise ValueError("Device already confirmed as witness")
-            
-            # Anti-spam protection (MP13-5) - rate limiting per user
-            recent_confirmations = await conn.fetchval("""
-                SELECT COUNT(*) FROM witness_confirmations 
-                WHERE device_id = $1 AND confirmed_at > NOW() - INTERVAL '1 hour'
-            """, device_id)
-            
-            max_confirmations_per_hour = settings.witness_confirmation_rate_limit_per_hour
-            if recent_confirmations >= max_confirmations_per_hour:
-                raise ValueError(f"Rate limit exceeded. You can only confirm {max_confirmations_per_hour} sightings per hour.")
-            
-            # Check distance if location data is provided
-            if witness_data.get('latitude') and witness_data.get('longitude'):
-                sensor = self._parse_json(sighting['sensor_data'])
-                if sensor and 'location' in sensor:
-                    orig_lat = sensor['location'].get('latitude')
-                    orig_lng = sensor['location'].get('longitude')
-                    if orig_lat and orig_lng:
-                        # Calculate distance using Haversine formula
-                        import math
-                        lat1, lng1 = float(orig_lat), float(orig_lng)
-                        lat2, lng2 = float(witness_data['latitude']), float(witness_data['longitude'])
-                        
-                        dlat = math.radians(lat2 - lat1)
-                        dlng = math.radians(lng2 - lng1)
-                        a = (math.sin(dlat/2) * math.sin(dlat/2) + 
-                             math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * 
-                             math.sin(dlng/2) * math.sin(dlng/2))
-                        c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
-                        distance_km = 6371 * c  # Earth radius in km
-                        
-                        # Get actual visibility for this sighting to calculate max distance
-                        max_distance_km = 50.0  # Default 2x 25km visibility
-                        enrichment = self._parse_json(sighting['enrichment_data'])
-                        if enrichment:
-                            weather_data = enrichment.get('weather', {})
-                            visibility_km = weather_data.get('visibility_km')
-                            if visibility_km is not None:
-                                # Use 2x the actual visibility for this sighting
-                                max_distance_km = visibility_km * 2.0
-                        
-                        # Check if user is within 2x the actual visibility distance
-                        if distance_km > max_distance_km:
-                            raise ValueError(f"Witness location too far from sighting ({distance_km:.1f}km). Must be within {max_distance_km:.1f}km (2x visibility) to confirm.")
-            
-            # Insert witness confirmation with required fields extracted from JSON
-            await conn.execute("""
-                INSERT INTO witness_confirmations 
-                (sighting_id, device_id, witness_latitude, witness_longitude, 
-                 witness_altitude, location_accuracy, still_visible, confirmation_data)
-                VALUES ($1, $2, 
-                        ($3::jsonb->>'latitude')::float, 
-                        ($3::jsonb->>'longitude')::float,
-                        ($3::jsonb->>'altitude')::float,
-                        ($3::jsonb->>'accuracy')::float,
-                        COALESCE(($3::jsonb->>'still_visible')::boolean, true),
-                        $3::jsonb)
-            """, uuid.UUID(sighting_id), device_id, json.dumps(witness_data))
-            
-            # Update witness count
-            new_count = await conn.fetchval("""
-                UPDATE sightings 
-                SET witness_count = witness_count + 1 
-                WHERE id = $1 
-                RETURNING witness_count
-            """, uuid.UUID(sighting_id))
-            
-            # Get confirmation stats
-            confirmations = await conn.fetch("""
-                SELECT device_id, confirmed_at, confirmation_data
-                FROM witness_confirmations 
-                WHERE sighting_id = $1 
-                ORDER BY confirmed_at DESC
-            """, uuid.UUID(sighting_id))
-            
-            return {
-                "confirmed": True,
-                "new_witness_count": new_count,
-                "total_confirmations": len(confirmations),
-                "confirmation_time": datetime.utcnow().isoformat(),
-                "sighting_age_minutes": int((datetime.utcnow() - sighting['created_at']).total_seconds() / 60)
-            }
+            result = await conn.fetchrow(
+                _CONFIRM_WITNESS_SQL, sighting_uuid, device_id, int(time_window_minutes),
+                max_confirmations_per_hour,
+                witness_lat if has_location else None,
+                witness_lng if has_location else None,
+                _dumps(witness_data),
+                witness_lat, witness_lng,
+                _optional_float(witness_data.get('altitude')),
+                _optional_float(witness_data.get('accuracy')),
+                True if still_visible is None else still_visible
+            )
+        
+        if not result:
+            raise ValueError("Sighting not found")
+        
+        if not result['within_window']:
+            raise ValueError(f"Witness confirmation window has closed. You can only confirm sightings within {time_window_minutes} minutes of occurrence.")
+        
+        if result['already_confirmed']:
+            raise ValueError("Device already confirmed as witness")
+        
+        # Anti-spam protection (MP13-5) - rate limiting per user
+        if result['recent_confirmations'] >= max_confirmations_per_hour:
+            raise ValueError(f"Rate limit exceeded. You can only confirm {max_confirmations_per_hour} sightings per hour.")
+        
+        # Check if user is within 2x the actual visibility distance
+        distance_km = result['distance_km']
+        max_distance_km = result['max_distance_km']
+        if distance_km is not None and distance_km > max_distance_km:
+            raise ValueError(f"Witness location too far from sighting ({distance_km:.1f}km). Must be within {max_distance_km:.1f}km (2x visibility) to confirm.")
+        
+        # Every check passed but ON CONFLICT skipped the insert: a concurrent confirm won
+        if not result['inserted']:
+            raise ValueError("Device already confirmed as witness")
+        if result['user_id']:
+            await invalidate_profile_cache(result['user_id'])
+        
+        return {
+            "confirmed": True,
+            "new_witness_count": result['witness_count'],
+            "total_confirmations": result['total_confirmations'],
+            "confirmation_time": datetime.utcnow().isoformat(),
+            "sighting_age_minutes": result['age_minutes']
+        }
     
-    async def get_witness_aggregation(self, sighting_id: str) -> Dict:
-        """Get witness aggregation data with clean business logic"""
+    async def get_witness_aggregation(self, sighting_id: str, limit: int = 50,
+                                      include_confirmations: bool = True) -> Dict:
+        """Get witness aggregation data - totals are counted in SQL, only the first `limit` confirmations are listed
+
+        include_confirmations=False returns the stats without querying confirmations at all
+        """
+        sighting_uuid = uuid.UUID(sighting_id)
         async with self.db_pool.acquire() as conn:
             # Get sighting details
-            sighting = await conn.fetchrow("""
-                SELECT id, title, description, witness_count, created_at, 
-                       sensor_data, enrichment_data
-                FROM sightings WHERE id = $1
-            """, uuid.UUID(sighting_id))
+            sighting = await conn.fetchrow(_WITNESS_SIGHTING_SQL, sighting_uuid)
             
             if not sighting:
                 raise ValueError("Sighting not found")
             
-            # Get all witness confirmations
-            confirmations = await conn.fetch("""
-                SELECT device_id, confirmed_at, confirmation_data
-                FROM witness_confirmations 
-                WHERE sighting_id = $1 
-                ORDER BY confirmed_at ASC
-            """, uuid.UUID(sighting_id))
+            total_confirmations = sighting['total_confirmations']
             
-            # Process confirmations data
+            # Stream the earliest witness confirmations instead of materializing them all
             processed_confirmations = []
-            for conf in confirmations:
-                conf_data = self._parse_json(conf['confirmation_data']) or {}
-                processed_confirmations.append({
-                    'device_id': conf['device_id'][:8] + '...',  # Privacy
-                    'confirmed_at': conf['confirmed_at'].isoformat(),
-                    'confidence': conf_data.get('confidence', 'medium'),
-                    'has_description': bool(conf_data.get('description')),
-                    'has_location': bool(conf_data.get('location'))
-                })
+            if include_confirmations and total_confirmations:
+                append = processed_confirmations.append
+                async with conn.transaction():
+                    async for conf in conn.cursor(
+                        _WITNESS_CONFIRMATIONS_SQL, sighting_uuid, limit, prefetch=200
+                    ):
+                        append({
+                            'device_id': conf['device_id'],  # Truncated in SQL for privacy
+                            'confirmed_at': conf['confirmed_at'],  # Formatted in SQL with its UTC offset
+                            'confidence': conf['confidence'],
+                            'has_description': conf['has_description'],
+                            'has_location': conf['has_location']
+                        })
             
             # Calculate stats
-            time_since = datetime.utcnow() - sighting['created_at']
-            minutes_since = int(time_since.total_seconds() / 60)
+            # Ages come from SQL: created_at is timestamptz, so naive utcnow() can't be subtracted
+            minutes_since = sighting['age_minutes']
             
             return {
                 "sighting_id": sighting_id,
-                "total_witnesses": len(confirmations),
+                "total_witnesses": total_confirmations,
                 "witness_count": sighting['witness_count'],
                 "confirmations": processed_confirmations,
                 "sighting_age_minutes": minutes_since,
                 "created_at": sighting['created_at'].isoformat(),
-                "credibility_score": min(100, len(confirmations) * 10)
+                "credibility_score": min(100, total_confirmations * 10)
             }
     
     async def get_witness_status(self, sighting_id: str, device_id: str) -> Dict:
         """Check if device has confirmed this sighting"""
         async with self.db_pool.acquire() as conn:
-            confirmation = await conn.fetchrow("""
-                SELECT device_id, confirmed_at 
-                FROM witness_confirmations 
-                WHERE sighting_id = $1 AND device_id = $2
-            """, uuid.UUID(sighting_id), device_id)
+            confirmation = await conn.fetchrow(_WITNESS_STATUS_SQL, uuid.UUID(sighting_id), device_id)
             
             return {
                 "has_confirmed": bool(confirmation),
-                "confirmed_at": confirmation['confirmed_at'].isoformat() if confirmation else None,
+                "confirmed_at": confirmation['confirmed_at'] if confirmation else None,
                 "device_id": device_id,
                 "sighting_id": sighting_id
             }
\ No newline at end of file
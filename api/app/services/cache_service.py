@@ -0,0 +1,83 @@
+"""
+Cache Service
+Shared Redis client for short-lived caches and reservations
+"""
+
+import logging
+from typing import Optional
+
+import redis.asyncio as redis
+
+logger = logging.getLogger(__name__)
+
+
+class CacheService:
+    """Singleton Redis client - callers treat Redis as best-effort and fall back to the database"""
+
+    _instance: Optional['CacheService'] = None
+    _client: Optional[redis.Redis] = None
+
+    def __new__(cls) -> 'CacheService':
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    @property
+    def client(self) -> redis.Redis:
+        """Get the Redis client, creating it lazily on first use"""
+        if self._client is None:
+            from app.config.environment import settings
+            self._client = redis.from_url(
+                settings.redis_url,
+                decode_responses=True,
+                socket_timeout=0.5,
+                socket_connect_timeout=0.5
+            )
+        return self._client
+
+    async def close(self) -> None:
+        """Close the Redis connection pool"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            logger.info("Redis client closed")
+
+# Global instance
+cache_service = CacheService()
+
+def get_redis() -> redis.Redis:
+    """Get the shared Redis client"""
+    return cache_service.client
+
+async def cache_get(key: str) -> Optional[str]:
+    """Best-effort GET - returns None on miss or when Redis is unavailable"""
+    try:
+        return await get_redis().get(key)
+    except Exception as e:
+        logger.warning(f"Redis GET {key} failed: {e}")
+        return None
+
+async def cache_set(key: str, value: str, ttl_seconds: int) -> None:
+    """Best-effort SET with expiry"""
+    try:
+        await get_redis().set(key, value, ex=ttl_seconds)
+    except Exception as e:
+        logger.warning(f"Redis SET {key} failed: {e}")
+
+async def cache_delete(*keys: str) -> None:
+    """Best-effort DELETE"""
+    try:
+        await get_redis().delete(*keys)
+    except Exception as e:
+        logger.warning(f"Redis DELETE {', '.join(keys)} failed: {e}")
+
+# User profile stats cache (see users.get_user_stats)
+PROFILE_CACHE_TTL_SECONDS = 300
+
+def profile_cache_key(user_id: str) -> str:
+    # Stats aggregate every device of the user, so they are cached per user
+    return f"profile:{user_id}"
+
+async def invalidate_profile_cache(user_id: str) -> None:
+    """Drop cached profile stats after any of the user's devices reports or confirms a sighting"""
+    await cache_delete(profile_cache_key(user_id))
@@ -7,8 +7,22 @@ import asyncpg
 import logging
 from typing import Optional
 
+import orjson
+
 logger = logging.getLogger(__name__)
 
+def encode_jsonb(value) -> str:
+    """jsonb codec encoder - writers mostly pass pre-serialized JSON text, which must not be double-encoded"""
+    if isinstance(value, str):
+        return value
+    return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS).decode()
+
+async def register_jsonb_codec(connection: asyncpg.Connection) -> None:
+    """Decode jsonb with orjson inside asyncpg so rows carry dicts/lists instead of text"""
+    await connection.set_type_codec(
+        'jsonb', encoder=encode_jsonb, decoder=orjson.loads, schema='pg_catalog'
+    )
+
 class DatabaseService:
     """Singleton database service with proper connection pool management"""
     
@@ -27,9 +41,12 @@ class DatabaseService:
         user: str = "ufobeep_user",
         password: str = "ufopostpass",
         database: str = "ufobeep_db",
-        min_size: int = 2,
-        max_size: int = 20,
-        command_timeout: int = 60,
+        min_size: int = 10,
+        max_size: int = 50,
+        command_timeout: int = 10,
+        statement_cache_size: int = 1024,
+        max_cached_statement_lifetime: int = 0,
+        max_inactive_connection_lifetime: float = 300.0,
         server_settings: dict = None
     ) -> None:
         """Initialize the connection pool with production settings"""
@@ -48,24 +65,30 @@ class DatabaseService:
                 min_size=min_size,
                 max_size=max_size,
                 command_timeout=command_timeout,
+                # Prepared statement cache shared by the hot endpoints;
+                # lifetime 0 keeps cached statements until the connection closes
+                statement_cache_size=statement_cache_size,
+                max_cached_statement_lifetime=max_cached_statement_lifetime,
                 server_settings=server_settings or {
                     'jit': 'off',  # Disable JIT for faster connection times
                     'application_name': 'ufobeep_api'
                 },
                 # Connection lifetime and health checks
-                max_inactive_connection_lifetime=300.0,  # 5 minutes
-                setup=self._setup_connection
+                max_inactive_connection_lifetime=max_inactive_connection_lifetime,
+                # init runs once per new connection; setup would run on every acquire
+                init=self._init_connection
             )
             logger.info(f"Database pool initialized: {min_size}-{max_size} connections")
         except Exception as e:
             logger.error(f"Failed to initialize database pool: {e}")
             raise
     
-    async def _setup_connection(self, connection: asyncpg.Connection) -> None:
-        """Setup function called for each new connection"""
+    async def _init_connection(self, connection: asyncpg.Connection) -> None:
+        """Init function called once for each new connection"""
         # Set connection-level settings for better performance
         await connection.execute("SET timezone = 'UTC'")
         await connection.execute("SET statement_timeout = '30s'")
+        await register_jsonb_codec(connection)
     
     @property
     def pool(self) -> asyncpg.Pool:
@@ -81,6 +104,22 @@ class DatabaseService:
             self._pool = None
             logger.info("Database pool closed")
     
+    def get_stats(self) -> dict:
+        """Get current pool sizing for metrics"""
+        if self._pool is None:
+            return {"initialized": False}
+        
+        size = self._pool.get_size()
+        idle = self._pool.get_idle_size()
+        return {
+            "initialized": True,
+            "pool_size": size,
+            "idle_connections": idle,
+            "busy_connections": size - idle,
+            "max_size": self._pool.get_max_size(),
+            "min_size": self._pool.get_min_size()
+        }
+    
     async def health_check(self) -> dict:
         """Check database pool health"""
         if self._pool is None:
@@ -7,73 +7,16 @@ No credit card required, scales to unlimited for $25/mo
 import os
 import secrets
 import logging
-import requests
+import httpx
+from html import escape
+from string import Template
 from typing import Optional, Dict
 from datetime import datetime, timedelta
 
 logger = logging.getLogger(__name__)
 
-class BrevoEmailService:
-    """Production email service using Brevo API - best free tier available"""
-    
-    def __init__(self):
-        self.api_key = os.getenv("BREVO_API_KEY", "")
-        self.api_url = "https://api.brevo.com/v3/smtp/email"
-        self.from_email = "alerts@ufobeep.com"
-        self.from_name = "UFOBeep"
-        self.base_url = "https://ufobeep.com"
-        
-        if self.api_key:
-            self.enabled = True
-            self.headers = {
-                "accept": "application/json",
-                "api-key": self.api_key,
-                "content-type": "application/json"
-            }
-            logger.info("Brevo email service initialized")
-        else:
-            self.enabled = False
-            logger.warning("Brevo email service disabled (no API key)")
-            logger.info("Get your FREE API key at: https://app.brevo.com/settings/keys/api")
-    
-    def generate_verification_token(self) -> str:
-        """Generate a secure random verification token"""
-        return secrets.token_urlsafe(32)
-    
-    def generate_recovery_code(self) -> str:
-        """Generate a 6-digit recovery code"""
-        return f"{secrets.randbelow(999999):06d}"
-    
-    async def send_verification_email(self, 
-                                     to_email: str, 
-                                     username: str, 
-                                     token: str) -> Dict:
-        """
-        Send verification email using Brevo
-        FREE: 300 emails/day, 9000/month
-        """
-        if not self.enabled:
-            return {
-                "success": False, 
-                "error": "Email service not configured. Set BREVO_API_KEY in .env"
-            }
-        
-        try:
-            verification_url = f"{self.base_url}/verify?token={token}"
-            
-            payload = {
-                "sender": {
-                    "name": self.from_name,
-                    "email": self.from_email
-                },
-                "to": [
-                    {
-                        "email": to_email,
-                        "name": username
-                    }
-                ],
-                "subject": f"Welcome to UFOBeep, {username}! 🛸",
-                "htmlContent": f"""
+# Email bodies are parsed once at import; usernames are HTML-escaped in the HTML parts
+_VERIFY_HTML = Template("""
                 <!DOCTYPE html>
                 <html>
                 <head>
@@ -95,7 +38,7 @@ class BrevoEmailService:
                         <!-- Main content -->
                         <div style="background: #1a1a1a; padding: 40px 30px; color: #ffffff;">
                             <h2 style="color: #00ff88; margin-top: 0; font-size: 24px;">
-                                Welcome aboard, {username}!
+                                Welcome aboard, ${username}!
                             </h2>
                             
                             <p style="color: #cccccc; line-height: 1.6; font-size: 16px;">
@@ -113,7 +56,7 @@ class BrevoEmailService:
                             </div>
                             
                             <div style="text-align: center; margin: 35px 0;">
-                                <a href="{verification_url}" 
+                                <a href="${verification_url}" 
                                    style="display: inline-block;
                                           background: linear-gradient(135deg, #00ff88 0%, #00cc66 100%);
                                           color: #000000;
@@ -132,7 +75,7 @@ class BrevoEmailService:
                             <p style="color: #666666; font-size: 13px; text-align: center; margin-top: 30px;">
                                 Can't click? Copy this link:<br>
                                 <code style="color: #00ff88; background: #2a2a2a; padding: 8px; border-radius: 4px; font-size: 11px; word-break: break-all;">
-                                    {verification_url}
+                                    ${verification_url}
                                 </code>
                             </p>
                         </div>
@@ -150,14 +93,15 @@ class BrevoEmailService:
                     </div>
                 </body>
                 </html>
-                """,
-                "textContent": f"""
-                Welcome to UFOBeep, {username}!
+                """)
+
+_VERIFY_TEXT = Template("""
+                Welcome to UFOBeep, ${username}!
                 
                 You're one click away from joining thousands of sky watchers worldwide.
                 
                 Verify your email address:
-                {verification_url}
+                ${verification_url}
                 
                 This will unlock:
                 • Account Recovery - Never lose access
@@ -170,7 +114,118 @@ class BrevoEmailService:
                 Didn't sign up? You can safely ignore this email.
                 
                 - The UFOBeep Team
-                """,
+                """)
+
+_RECOVERY_HTML = Template("""
+                <body style="margin: 0; padding: 0; font-family: -apple-system, system-ui, sans-serif; background: #000;">
+                    <div style="max-width: 500px; margin: 0 auto;">
+                        <div style="background: #1a1a1a; padding: 40px 30px; text-align: center;">
+                            <h1 style="color: #00ff88; margin: 0 0 20px 0;">Account Recovery</h1>
+                            
+                            <p style="color: #999; margin-bottom: 10px;">Your username:</p>
+                            <div style="background: #000; padding: 15px; border-radius: 8px; margin-bottom: 30px;">
+                                <h2 style="color: #00ff88; margin: 0; font-family: monospace; font-size: 24px;">
+                                    ${username}
+                                </h2>
+                            </div>
+                            
+                            <p style="color: #999; margin-bottom: 10px;">Recovery code:</p>
+                            <div style="background: #00ff88; padding: 20px; border-radius: 8px;">
+                                <h1 style="color: #000; margin: 0; font-size: 36px; letter-spacing: 8px; font-family: monospace;">
+                                    ${recovery_code}
+                                </h1>
+                            </div>
+                            
+                            <p style="color: #666; font-size: 14px; margin-top: 20px; line-height: 1.6;">
+                                Enter this code in the UFOBeep app<br>
+                                Valid for 15 minutes
+                            </p>
+                        </div>
+                    </div>
+                </body>
+                """)
+
+_RECOVERY_TEXT = Template("""
+                UFOBeep Account Recovery
+                
+                Your username: ${username}
+                Recovery code: ${recovery_code}
+                
+                Enter this code in the app to recover your account.
+                Valid for 15 minutes.
+                
+                - UFOBeep Team
+                """)
+
+class BrevoEmailService:
+    """Production email service using Brevo API - best free tier available"""
+    
+    def __init__(self):
+        self.api_key = os.getenv("BREVO_API_KEY", "")
+        self.api_url = "https://api.brevo.com/v3/smtp/email"
+        self.from_email = "alerts@ufobeep.com"
+        self.from_name = "UFOBeep"
+        self.base_url = "https://ufobeep.com"
+        
+        if self.api_key:
+            self.enabled = True
+            self.headers = {
+                "accept": "application/json",
+                "api-key": self.api_key,
+                "content-type": "application/json"
+            }
+            # Shared client keeps TLS connections to Brevo alive between sends
+            self._client = httpx.AsyncClient(
+                headers=self.headers,
+                timeout=httpx.Timeout(10.0),
+                limits=httpx.Limits(max_keepalive_connections=20, max_connections=100),
+            )
+            logger.info("Brevo email service initialized")
+        else:
+            self.enabled = False
+            self._client = None
+            logger.warning("Brevo email service disabled (no API key)")
+            logger.info("Get your FREE API key at: https://app.brevo.com/settings/keys/api")
+    
+    def generate_verification_token(self) -> str:
+        """Generate a secure random verification token"""
+        return secrets.token_urlsafe(32)
+    
+    def generate_recovery_code(self) -> str:
+        """Generate a 6-digit recovery code"""
+        return f"{secrets.randbelow(999999):06d}"
+    
+    async def send_verification_email(self, 
+                                     to_email: str, 
+                                     username: str, 
+                                     token: str) -> Dict:
+        """
+        Send verification email using Brevo
+        FREE: 300 emails/day, 9000/month
+        """
+        if not self.enabled:
+            return {
+                "success": False, 
+                "error": "Email service not configured. Set BREVO_API_KEY in .env"
+            }
+        
+        try:
+            verification_url = f"{self.base_url}/verify?token={token}"
+            
+            payload = {
+                "sender": {
+                    "name": self.from_name,
+                    "email": self.from_email
+                },
+                "to": [
+                    {
+                        "email": to_email,
+                        "name": username
+                    }
+                ],
+                "subject": f"Welcome to UFOBeep, {username}! 🛸",
+                "htmlContent": _VERIFY_HTML.substitute(username=escape(username), verification_url=verification_url),
+                "textContent": _VERIFY_TEXT.substitute(username=username, verification_url=verification_url),
                 "tags": ["verification", "welcome"],
                 "params": {
                     "USERNAME": username,
@@ -178,7 +233,7 @@ class BrevoEmailService:
                 }
             }
             
-            response = requests.post(self.api_url, json=payload, headers=self.headers)
+            response = await self._client.post(self.api_url, json=payload)
             
             if response.status_code == 201:
                 result = response.json()
@@ -214,48 +269,11 @@ class BrevoEmailService:
                     }
                 ],
                 "subject": "🔑 Your UFOBeep Recovery Code",
-                "htmlContent": f"""
-                <body style="margin: 0; padding: 0; font-family: -apple-system, system-ui, sans-serif; background: #000;">
-                    <div style="max-width: 500px; margin: 0 auto;">
-                        <div style="background: #1a1a1a; padding: 40px 30px; text-align: center;">
-                            <h1 style="color: #00ff88; margin: 0 0 20px 0;">Account Recovery</h1>
-                            
-                            <p style="color: #999; margin-bottom: 10px;">Your username:</p>
-                            <div style="background: #000; padding: 15px; border-radius: 8px; margin-bottom: 30px;">
-                                <h2 style="color: #00ff88; margin: 0; font-family: monospace; font-size: 24px;">
-                                    {username}
-                                </h2>
-                            </div>
-                            
-                            <p style="color: #999; margin-bottom: 10px;">Recovery code:</p>
-                            <div style="background: #00ff88; padding: 20px; border-radius: 8px;">
-                                <h1 style="color: #000; margin: 0; font-size: 36px; letter-spacing: 8px; font-family: monospace;">
-                                    {recovery_code}
-                                </h1>
-                            </div>
-                            
-                            <p style="color: #666; font-size: 14px; margin-top: 20px; line-height: 1.6;">
-                                Enter this code in the UFOBeep app<br>
-                                Valid for 15 minutes
-                            </p>
-                        </div>
-                    </div>
-                </body>
-                """,
-                "textContent": f"""
-                UFOBeep Account Recovery
-                
-                Your username: {username}
-                Recovery code: {recovery_code}
-                
-                Enter this code in the app to recover your account.
-                Valid for 15 minutes.
-                
-                - UFOBeep Team
-                """
+                "htmlContent": _RECOVERY_HTML.substitute(username=escape(username), recovery_code=recovery_code),
+                "textContent": _RECOVERY_TEXT.substitute(username=username, recovery_code=recovery_code)
             }
             
-            response = requests.post(self.api_url, json=payload, headers=self.headers)
+            response = await self._client.post(self.api_url, json=payload)
             
             if response.status_code == 201:
                 result = response.json()
@@ -276,10 +294,7 @@ class BrevoEmailService:
         
         try:
             # Get account info to verify API key
-            response = requests.get(
-                "https://api.brevo.com/v3/account",
-                headers={"api-key": self.api_key, "accept": "application/json"}
-            )
+            response = await self._client.get("https://api.brevo.com/v3/account")
             
             if response.status_code == 200:
                 data = response.json()
@@ -299,6 +314,12 @@ class BrevoEmailService:
         except Exception as e:
             return {"success": False, "error": str(e)}
 
+    async def close(self):
+        """Close the shared HTTP client"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
 # Global service instance
 email_service = None
 
@@ -309,6 +330,13 @@ async def get_email_service():
         email_service = BrevoEmailService()
     return email_service
 
+async def close_email_service():
+    """Close the email service's HTTP client on shutdown"""
+    global email_service
+    if email_service is not None:
+        await email_service.close()
+        email_service = None
+
 # Quick setup instructions
 """
 BREVO SETUP (5 minutes):
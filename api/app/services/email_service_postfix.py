@@ -4,79 +4,124 @@ Simple email verification using local Postfix installation
 No external dependencies or API keys required
 """
 
+import asyncio
 import smtplib
 import secrets
 import logging
+import threading
+import time
+from html import escape
+from string import Template
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
-class PostfixEmailService:
-    """Production email service using properly configured Postfix"""
-    
-    def __init__(self, 
-                 smtp_host: str = "localhost",
-                 smtp_port: int = 25,
-                 from_email: str = "support@ufobeep.com",
-                 from_name: str = "UFOBeep Support"):
-        self.smtp_host = smtp_host
-        self.smtp_port = smtp_port
-        self.from_email = from_email
-        self.from_name = from_name
-        self.base_url = "https://ufobeep.com"
-        
-        # Your server has proper DNS setup:
-        # ✅ MX: mail.ufobeep.com  
-        # ✅ SPF: v=spf1 a mx ip4:107.152.35.6 ~all
-        # ✅ DKIM: OpenDKIM configured
-        # This means EXCELLENT deliverability!
-    
-    def generate_verification_token(self) -> str:
-        """Generate a secure random verification token"""
-        return secrets.token_urlsafe(32)
-    
-    async def send_verification_email(self, 
-                                     to_email: str, 
-                                     username: str, 
-                                     token: str) -> bool:
-        """Send email verification link"""
+# Long-lived SMTP connections shared by every PostfixEmailService instance
+SMTP_POOL_SIZE = 4
+SMTP_IDLE_CHECK_SECONDS = 30.0
+_smtp_idle: Dict[Tuple[str, int], List[Tuple[smtplib.SMTP, float]]] = {}
+_smtp_slots = asyncio.Semaphore(SMTP_POOL_SIZE)
+# Checkout/checkin run in to_thread workers, so the idle lists need a real lock
+_smtp_lock = threading.Lock()
+
+
+def _close_smtp(server: smtplib.SMTP):
+    try:
+        server.quit()
+    except Exception:
+        server.close()
+
+
+def _checkout_smtp(host: str, port: int) -> smtplib.SMTP:
+    """Reuse an idle connection, NOOP-checking only ones idle past SMTP_IDLE_CHECK_SECONDS"""
+    while True:
+        with _smtp_lock:
+            idle = _smtp_idle.setdefault((host, port), [])
+            if not idle:
+                break
+            server, last_used = idle.pop()
+        if time.monotonic() - last_used < SMTP_IDLE_CHECK_SECONDS:
+            return server
         try:
-            subject = "Account verification required"
-            
-            # HTML email body
-            html_body = f"""
+            if server.noop()[0] == 250:
+                return server
+        except (smtplib.SMTPException, OSError):
+            pass
+        _close_smtp(server)
+    return smtplib.SMTP(host, port)
+
+
+def _checkin_smtp(host: str, port: int, server: smtplib.SMTP):
+    with _smtp_lock:
+        idle = _smtp_idle.setdefault((host, port), [])
+        if len(idle) < SMTP_POOL_SIZE:
+            idle.append((server, time.monotonic()))
+            return
+    _close_smtp(server)
+
+
+def _send_pooled(host: str, port: int, msg: MIMEMultipart):
+    """Blocking send over a pooled connection, retrying once if it was dropped"""
+    server = _checkout_smtp(host, port)
+    try:
+        server.send_message(msg)
+    except smtplib.SMTPServerDisconnected:
+        server.close()
+        server = smtplib.SMTP(host, port)
+        try:
+            server.send_message(msg)
+        except Exception:
+            server.close()
+            raise
+    except Exception:
+        _close_smtp(server)
+        raise
+    _checkin_smtp(host, port, server)
+
+
+async def close_smtp_connections():
+    """Quit all idle pooled SMTP connections on shutdown"""
+    with _smtp_lock:
+        servers = [server for idle in _smtp_idle.values() for server, _ in idle]
+        _smtp_idle.clear()
+    for server in servers:
+        await asyncio.to_thread(_close_smtp, server)
+
+
+# Email bodies are parsed once at import; usernames are HTML-escaped in the HTML parts
+_VERIFY_HTML = Template("""
             <!DOCTYPE html>
             <html>
             <head>
                 <style>
-                    body {{ 
+                    body { 
                         font-family: Arial, sans-serif; 
                         background: #f5f5f5; 
                         color: #333333; 
                         margin: 0; 
                         padding: 0;
-                    }}
-                    .container {{ 
+                    }
+                    .container { 
                         max-width: 600px; 
                         margin: 0 auto; 
                         padding: 20px; 
                         background: #f5f5f5;
-                    }}
-                    .header {{ 
+                    }
+                    .header { 
                         text-align: center; 
                         padding: 20px 0;
-                    }}
-                    .content {{ 
+                    }
+                    .content { 
                         background: #ffffff; 
                         padding: 40px; 
                         border-radius: 10px; 
                         box-shadow: 0 2px 10px rgba(0,0,0,0.1);
                         border: 1px solid #e0e0e0;
-                    }}
-                    .button {{ 
+                    }
+                    .button { 
                         display: inline-block; 
                         padding: 15px 30px; 
                         background: #00ff88; 
@@ -87,39 +132,39 @@ class PostfixEmailService:
                         font-size: 16px;
                         margin: 20px 0;
                         box-shadow: 0 2px 5px rgba(0,255,136,0.3);
-                    }}
-                    .button:hover {{
+                    }
+                    .button:hover {
                         background: #00d973;
-                    }}
-                    .footer {{ 
+                    }
+                    .footer { 
                         text-align: center; 
                         margin-top: 30px; 
                         color: #666; 
                         font-size: 14px; 
-                    }}
-                    h1 {{ 
+                    }
+                    h1 { 
                         color: #333; 
                         margin: 0;
                         font-size: 32px;
-                    }}
-                    h2 {{ 
+                    }
+                    h2 { 
                         color: #333; 
                         margin-bottom: 20px;
                         font-size: 24px;
-                    }}
-                    p {{ 
+                    }
+                    p { 
                         color: #555; 
                         line-height: 1.6;
                         font-size: 16px;
-                    }}
-                    ul {{
+                    }
+                    ul {
                         color: #555;
                         line-height: 1.8;
-                    }}
-                    li {{
+                    }
+                    li {
                         margin-bottom: 8px;
-                    }}
-                    .link-text {{
+                    }
+                    .link-text {
                         color: #007bff;
                         font-size: 14px;
                         word-break: break-all;
@@ -127,7 +172,7 @@ class PostfixEmailService:
                         padding: 8px;
                         border-radius: 4px;
                         border: 1px solid #dee2e6;
-                    }}
+                    }
                 </style>
             </head>
             <body>
@@ -136,7 +181,7 @@ class PostfixEmailService:
                         <h1>🛸 UFOBeep</h1>
                     </div>
                     <div class="content">
-                        <h2>Welcome, {username}!</h2>
+                        <h2>Welcome, ${username}!</h2>
                         <p>Thanks for joining UFOBeep, the global UFO alert network.</p>
                         <p>Please verify your email address to enable account recovery. This will allow you to:</p>
                         <ul>
@@ -145,7 +190,7 @@ class PostfixEmailService:
                             <li>Receive important alerts via email (optional)</li>
                         </ul>
                         <center>
-                            <a href="{self.base_url}/verify?token={token}" class="button">
+                            <a href="${base_url}/verify?token=${token}" class="button">
                                 ✅ Verify Email Address
                             </a>
                         </center>
@@ -153,7 +198,7 @@ class PostfixEmailService:
                             <strong>Alternative:</strong> Copy and paste this link in your browser:
                         </p>
                         <div class="link-text">
-                            {self.base_url}/verify?token={token}
+                            ${base_url}/verify?token=${token}
                         </div>
                         <p style="color: #888; font-size: 14px; margin-top: 30px;">
                             This link expires in 24 hours. If you didn't create a UFOBeep account, 
@@ -162,19 +207,18 @@ class PostfixEmailService:
                     </div>
                     <div class="footer">
                         <p>UFOBeep - Real-time UFO Alert Network</p>
-                        <p>This email was sent from {self.from_email}</p>
+                        <p>This email was sent from ${from_email}</p>
                     </div>
                 </div>
             </body>
             </html>
-            """
-            
-            # Plain text fallback
-            text_body = f"""
-            Welcome to UFOBeep, {username}!
+            """)
+
+_VERIFY_TEXT = Template("""
+            Welcome to UFOBeep, ${username}!
             
             Please verify your email address by clicking this link:
-            {self.base_url}/verify?token={token}
+            ${base_url}/verify?token=${token}
             
             This will allow you to:
             - Recover your username if you reinstall the app
@@ -186,52 +230,38 @@ class PostfixEmailService:
             If you didn't create a UFOBeep account, you can safely ignore this email.
             
             - The UFOBeep Team
-            """
-            
-            return await self._send_email(to_email, subject, html_body, text_body)
-            
-        except Exception as e:
-            logger.error(f"Failed to send verification email to {to_email}: {e}")
-            return False
-    
-    async def send_recovery_email(self, 
-                                 to_email: str, 
-                                 username: str, 
-                                 token: str) -> bool:
-        """Send account recovery email"""
-        try:
-            subject = "Your account access code"
-            
-            html_body = f"""
+            """)
+
+_RECOVERY_HTML = Template("""
             <!DOCTYPE html>
             <html>
             <head>
                 <style>
-                    body {{ 
+                    body { 
                         font-family: Arial, sans-serif; 
                         background: #f5f5f5; 
                         color: #333333; 
                         margin: 0; 
                         padding: 0;
-                    }}
-                    .container {{ 
+                    }
+                    .container { 
                         max-width: 600px; 
                         margin: 0 auto; 
                         padding: 20px; 
                         background: #f5f5f5;
-                    }}
-                    .header {{ 
+                    }
+                    .header { 
                         text-align: center; 
                         padding: 20px 0;
-                    }}
-                    .content {{ 
+                    }
+                    .content { 
                         background: #ffffff; 
                         padding: 40px; 
                         border-radius: 10px; 
                         box-shadow: 0 2px 10px rgba(0,0,0,0.1);
                         border: 1px solid #e0e0e0;
-                    }}
-                    .username {{ 
+                    }
+                    .username { 
                         background: #00ff88; 
                         color: #000000; 
                         padding: 12px 24px; 
@@ -242,8 +272,8 @@ class PostfixEmailService:
                         margin: 20px 0;
                         letter-spacing: 1px;
                         box-shadow: 0 2px 5px rgba(0,255,136,0.3);
-                    }}
-                    .recovery-button {{
+                    }
+                    .recovery-button {
                         display: inline-block;
                         background: #007bff;
                         color: #ffffff;
@@ -254,11 +284,11 @@ class PostfixEmailService:
                         font-size: 16px;
                         margin: 20px 0;
                         box-shadow: 0 2px 5px rgba(0,123,255,0.3);
-                    }}
-                    .recovery-button:hover {{
+                    }
+                    .recovery-button:hover {
                         background: #0056b3;
-                    }}
-                    .code {{
+                    }
+                    .code {
                         background: #f8f9fa;
                         border: 2px solid #00ff88;
                         color: #000000;
@@ -268,23 +298,23 @@ class PostfixEmailService:
                         font-weight: bold;
                         font-size: 18px;
                         letter-spacing: 2px;
-                    }}
-                    .footer {{ 
+                    }
+                    .footer { 
                         text-align: center; 
                         margin-top: 30px; 
                         color: #666; 
                         font-size: 14px; 
-                    }}
-                    h2 {{ 
+                    }
+                    h2 { 
                         color: #333; 
                         margin-bottom: 20px;
                         font-size: 24px;
-                    }}
-                    p {{ 
+                    }
+                    p { 
                         color: #555; 
                         line-height: 1.6;
                         font-size: 16px;
-                    }}
+                    }
                 </style>
             </head>
             <body>
@@ -296,11 +326,11 @@ class PostfixEmailService:
                         <h2>Account Recovery</h2>
                         <p>Your UFOBeep username is:</p>
                         <center>
-                            <span class="username">{username}</span>
+                            <span class="username">${username}</span>
                         </center>
                         <p>To complete recovery on your device, tap the button below from your phone:</p>
                         <center>
-                            <a href="ufobeep://recover?token={token}" class="recovery-button">
+                            <a href="ufobeep://recover?token=${token}" class="recovery-button">
                                 📱 Open UFOBeep App
                             </a>
                         </center>
@@ -308,7 +338,7 @@ class PostfixEmailService:
                             <strong>Alternative:</strong> Open the UFOBeep app and enter this recovery code:
                         </p>
                         <center>
-                            <span class="code">{token[:8]}</span>
+                            <span class="code">${code}</span>
                         </center>
                         <p style="color: #888; font-size: 14px; margin-top: 30px;">
                             This recovery code expires in 15 minutes. If you didn't request account recovery, you can safely ignore this email.
@@ -316,22 +346,78 @@ class PostfixEmailService:
                     </div>
                     <div class="footer">
                         <p>UFOBeep - Real-time UFO Alert Network</p>
-                        <p>This email was sent from {self.from_email}</p>
+                        <p>This email was sent from ${from_email}</p>
                     </div>
                 </div>
             </body>
             </html>
-            """
-            
-            text_body = f"""
+            """)
+
+_RECOVERY_TEXT = Template("""
             UFOBeep Account Recovery
             
-            Your username is: {username}
+            Your username is: ${username}
             
-            Recovery code: {token[:8]}
+            Recovery code: ${code}
             
             Open the UFOBeep app and enter this code to recover your account.
-            """
+            """)
+
+class PostfixEmailService:
+    """Production email service using properly configured Postfix"""
+    
+    def __init__(self, 
+                 smtp_host: str = "localhost",
+                 smtp_port: int = 25,
+                 from_email: str = "support@ufobeep.com",
+                 from_name: str = "UFOBeep Support"):
+        self.smtp_host = smtp_host
+        self.smtp_port = smtp_port
+        self.from_email = from_email
+        self.from_name = from_name
+        self.base_url = "https://ufobeep.com"
+        
+        # Your server has proper DNS setup:
+        # ✅ MX: mail.ufobeep.com  
+        # ✅ SPF: v=spf1 a mx ip4:107.152.35.6 ~all
+        # ✅ DKIM: OpenDKIM configured
+        # This means EXCELLENT deliverability!
+    
+    def generate_verification_token(self) -> str:
+        """Generate a secure random verification token"""
+        return secrets.token_urlsafe(32)
+    
+    async def send_verification_email(self, 
+                                     to_email: str, 
+                                     username: str, 
+                                     token: str) -> bool:
+        """Send email verification link"""
+        try:
+            subject = "Account verification required"
+            
+            # HTML email body
+            html_body = _VERIFY_HTML.substitute(username=escape(username), base_url=self.base_url, token=token, from_email=self.from_email)
+            
+            # Plain text fallback
+            text_body = _VERIFY_TEXT.substitute(username=username, base_url=self.base_url, token=token)
+            
+            return await self._send_email(to_email, subject, html_body, text_body)
+            
+        except Exception as e:
+            logger.error(f"Failed to send verification email to {to_email}: {e}")
+            return False
+    
+    async def send_recovery_email(self, 
+                                 to_email: str, 
+                                 username: str, 
+                                 token: str) -> bool:
+        """Send account recovery email"""
+        try:
+            subject = "Your account access code"
+            
+            html_body = _RECOVERY_HTML.substitute(username=escape(username), token=token, code=token[:8], from_email=self.from_email)
+            
+            text_body = _RECOVERY_TEXT.substitute(username=username, code=token[:8])
             
             return await self._send_email(to_email, subject, html_body, text_body)
             
@@ -359,10 +445,10 @@ class PostfixEmailService:
             msg.attach(text_part)
             msg.attach(html_part)
             
-            # Send via local Postfix
-            with smtplib.SMTP(self.smtp_host, self.smtp_port) as server:
-                # No authentication needed for localhost
-                server.send_message(msg)
+            # Send via local Postfix on a pooled connection, off the event loop
+            # No authentication needed for localhost
+            async with _smtp_slots:
+                await asyncio.to_thread(_send_pooled, self.smtp_host, self.smtp_port, msg)
             
             logger.info(f"Email sent successfully to {to_email}")
             return True
@@ -374,9 +460,12 @@ class PostfixEmailService:
     async def test_postfix_connection(self) -> bool:
         """Test if Postfix is accessible"""
         try:
-            with smtplib.SMTP(self.smtp_host, self.smtp_port) as server:
-                # Just test connection
-                server.noop()
+            def _noop():
+                with smtplib.SMTP(self.smtp_host, self.smtp_port) as server:
+                    # Just test connection
+                    server.noop()
+
+            await asyncio.to_thread(_noop)
             logger.info("Postfix connection successful")
             return True
         except Exception as e:
@@ -74,6 +74,21 @@ class EnrichmentProcessor(ABC):
     async def is_available(self) -> bool:
         """Check if processor is available (API keys, services, etc.)"""
         pass
+    
+    def _store_cached_result(self, cache_key: str, result: EnrichmentResult) -> None:
+        """Cache a result in self._cache, evicting entries older than self._cache_ttl_seconds"""
+        now = datetime.utcnow()
+        cutoff = now - timedelta(seconds=self._cache_ttl_seconds)
+        
+        # Entries stay in insertion order, so expired ones are always at the front
+        while self._cache:
+            oldest_key = next(iter(self._cache))
+            if self._cache[oldest_key]['timestamp'] >= cutoff:
+                break
+            del self._cache[oldest_key]
+        
+        self._cache.pop(cache_key, None)
+        self._cache[cache_key] = {'result': result, 'timestamp': now}
 
 
 class WeatherEnrichmentProcessor(EnrichmentProcessor):
@@ -141,10 +156,7 @@ class WeatherEnrichmentProcessor(EnrichmentProcessor):
             )
             
             # Cache the result
-            self._cache[cache_key] = {
-                'result': result,
-                'timestamp': datetime.utcnow()
-            }
+            self._store_cached_result(cache_key, result)
             
             return result
             
@@ -1062,10 +1074,7 @@ class GeocodeEnrichmentProcessor(EnrichmentProcessor):
             )
             
             # Cache the result
-            self._cache[cache_key] = {
-                'result': result,
-                'timestamp': datetime.utcnow()
-            }
+            self._store_cached_result(cache_key, result)
             
             return result
             
@@ -1874,8 +1883,8 @@ class EnrichmentDataGenerator:
             return None, None
         
         # Check nested location format
-        if "location" in sensor_data and isinstance(sensor_data["location"], dict):
-            location = sensor_data["location"]
+        location = sensor_data.get("location")
+        if location is not None and hasattr(location, "get"):
             lat = location.get("latitude")
             lng = location.get("longitude")
             if lat is not None and lng is not None:
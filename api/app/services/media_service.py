@@ -136,7 +136,8 @@ class MediaService:
                 }
             
             await conn.execute(
-                "UPDATE sightings SET media_info = $1 WHERE id = $2",
+                # updated_at bump also rolls AlertsService's processed-media cache key
+                "UPDATE sightings SET media_info = $1, updated_at = NOW() WHERE id = $2",
                 json.dumps(media_data),
                 uuid.UUID(sighting_id)
             )
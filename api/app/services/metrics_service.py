@@ -17,6 +17,8 @@ from enum import Enum
 from uuid import UUID, uuid4
 from dataclasses import dataclass
 
+STATS_CACHE_TTL_SECONDS = 5
+
 class EngagementType(str, Enum):
     ALERT_SENT = "alert_sent"
     ALERT_DELIVERED = "alert_delivered"
@@ -39,6 +41,7 @@ class MetricsService:
     
     def __init__(self, db_pool: asyncpg.Pool):
         self.db_pool = db_pool
+        self._stats_cache: Dict[int, tuple] = {}  # hours -> (monotonic ts, stats)
         
     async def initialize(self):
         """Initialize single engagement table"""
@@ -79,34 +82,38 @@ class MetricsService:
         print(f"📊 Logged engagement: {event_type.value} from {device_id}")
     
     async def get_basic_stats(self, hours: int = 24) -> Dict[str, Any]:
-        """Get basic engagement statistics"""
+        """Get basic engagement statistics, cached briefly for polling dashboards"""
+        cached = self._stats_cache.get(hours)
+        if cached and time.monotonic() - cached[0] < STATS_CACHE_TTL_SECONDS:
+            return cached[1]
+        
         since = datetime.utcnow() - timedelta(hours=hours)
         
         async with self.db_pool.acquire() as conn:
-            # Basic counts
-            total_events = await conn.fetchval("""
-                SELECT COUNT(*) FROM user_engagement WHERE timestamp >= $1
-            """, since)
-            
-            unique_devices = await conn.fetchval("""
-                SELECT COUNT(DISTINCT device_id) FROM user_engagement WHERE timestamp >= $1
-            """, since)
-            
-            # Event breakdown
-            event_counts = await conn.fetch("""
-                SELECT event_type, COUNT(*) as count
+            # Per-event counts plus the grand total row in one scan
+            rows = await conn.fetch("""
+                SELECT event_type, COUNT(*) as count, COUNT(DISTINCT device_id) as unique_devices,
+                       GROUPING(event_type) = 1 as is_total
                 FROM user_engagement 
                 WHERE timestamp >= $1
-                GROUP BY event_type
-                ORDER BY count DESC
+                GROUP BY GROUPING SETS ((event_type), ())
             """, since)
-            
-            return {
-                "hours": hours,
-                "total_events": total_events,
-                "unique_devices": unique_devices,
-                "events": [{"type": row["event_type"], "count": row["count"]} for row in event_counts]
-            }
+        
+        totals = next((row for row in rows if row["is_total"]), None)
+        event_counts = sorted(
+            (row for row in rows if not row["is_total"]),
+            key=lambda row: row["count"],
+            reverse=True
+        )
+        
+        stats = {
+            "hours": hours,
+            "total_events": totals["count"] if totals else 0,
+            "unique_devices": totals["unique_devices"] if totals else 0,
+            "events": [{"type": row["event_type"], "count": row["count"]} for row in event_counts]
+        }
+        self._stats_cache[hours] = (time.monotonic(), stats)
+        return stats
     
 
 # Global metrics service instance
@@ -3,21 +3,22 @@ import logging
 import math
 import time
 from datetime import datetime, timezone
-from typing import Optional, List, Tuple
+from typing import Tuple
 from base64 import b64encode
 
 import httpx
 import numpy as np
-from geopy.distance import geodesic
 
 from ..config.environment import settings
 from ..schemas.plane_match import (
     SensorDataSchema, PlaneMatchResponse, PlaneMatchInfo, 
-    OpenSkyResponse, OpenSkyState, LineOfSight, PlaneMatchCandidate
+    OpenSkyStateBatch, LineOfSight, PlaneMatchCandidate
 )
 
 logger = logging.getLogger(__name__)
 
+EARTH_RADIUS_KM = 6371.0088  # Mean Earth radius
+
 
 class PlaneMatchService:
     """Service for matching captured objects against aircraft data"""
@@ -54,14 +55,14 @@ class PlaneMatchService:
                 radius_km = settings.plane_match_radius_km
             
             # Get aircraft data from OpenSky
-            aircraft_states = await self._get_aircraft_in_area(
+            aircraft = await self._get_aircraft_in_area(
                 lat=sensor_data.latitude,
                 lon=sensor_data.longitude,
                 radius_km=radius_km,
                 timestamp=sensor_data.utc
             )
             
-            if not aircraft_states:
+            if not len(aircraft):
                 return PlaneMatchResponse(
                     is_plane=False,
                     confidence=0.0,
@@ -69,46 +70,47 @@ class PlaneMatchService:
                     timestamp=datetime.now(timezone.utc)
                 )
             
-            # Calculate line of sight for each aircraft
-            candidates = []
-            observer_pos = (sensor_data.latitude, sensor_data.longitude)
+            # Calculate line of sight and angular error for all aircraft at once
+            bearing_deg, elevation_deg, distance_km = self._calculate_lines_of_sight(
+                observer_pos=(sensor_data.latitude, sensor_data.longitude),
+                observer_alt=sensor_data.altitude or 0,
+                target_lat=aircraft.latitude,
+                target_lon=aircraft.longitude,
+                target_alt=aircraft.baro_altitude
+            )
+            angular_errors = self._calculate_angular_errors(
+                device_azimuth=sensor_data.azimuth_deg,
+                device_pitch=sensor_data.pitch_deg,
+                aircraft_bearing=bearing_deg,
+                aircraft_elevation=elevation_deg
+            )
             
-            for aircraft in aircraft_states:
-                if (aircraft.latitude is None or 
-                    aircraft.longitude is None or 
-                    aircraft.baro_altitude is None):
+            # Only consider aircraft within tolerance
+            candidates = []
+            for i in np.flatnonzero(angular_errors <= settings.plane_match_tolerance_deg):
+                try:
+                    state = aircraft.state(i)
+                except (IndexError, TypeError, ValueError):
+                    # Skip malformed state vectors
                     continue
                 
-                # Calculate line of sight to aircraft
-                los = self._calculate_line_of_sight(
-                    observer_pos=observer_pos,
-                    observer_alt=sensor_data.altitude or 0,
-                    target_pos=(aircraft.latitude, aircraft.longitude),
-                    target_alt=aircraft.baro_altitude
+                angular_error = float(angular_errors[i])
+                confidence = self._calculate_confidence(
+                    angular_error=angular_error,
+                    distance_km=float(distance_km[i]),
+                    altitude=state.baro_altitude
                 )
                 
-                # Calculate angular error between device pointing direction and aircraft
-                angular_error = self._calculate_angular_error(
-                    device_azimuth=sensor_data.azimuth_deg,
-                    device_pitch=sensor_data.pitch_deg,
-                    aircraft_bearing=los.bearing_deg,
-                    aircraft_elevation=los.elevation_deg
-                )
-                
-                # Only consider aircraft within tolerance
-                if angular_error <= settings.plane_match_tolerance_deg:
-                    confidence = self._calculate_confidence(
-                        angular_error=angular_error,
-                        distance_km=los.distance_km,
-                        altitude=aircraft.baro_altitude
-                    )
-                    
-                    candidates.append(PlaneMatchCandidate(
-                        aircraft=aircraft,
-                        line_of_sight=los,
-                        angular_error=angular_error,
-                        confidence=confidence
-                    ))
+                candidates.append(PlaneMatchCandidate(
+                    aircraft=state,
+                    line_of_sight=LineOfSight(
+                        bearing_deg=float(bearing_deg[i]),
+                        elevation_deg=float(elevation_deg[i]),
+                        distance_km=float(distance_km[i])
+                    ),
+                    angular_error=angular_error,
+                    confidence=confidence
+                ))
             
             if not candidates:
                 return PlaneMatchResponse(
@@ -156,7 +158,7 @@ class PlaneMatchService:
         lon: float, 
         radius_km: float,
         timestamp: datetime
-    ) -> List[OpenSkyState]:
+    ) -> OpenSkyStateBatch:
         """Get aircraft states from OpenSky API within specified area"""
         
         # Calculate bounding box
@@ -189,11 +191,11 @@ class PlaneMatchService:
             response.raise_for_status()
             
             data = response.json()
-            opensky_response = OpenSkyResponse.from_api_response(data)
+            aircraft = OpenSkyStateBatch(data.get('states'))
             
-            logger.info(f"Retrieved {len(opensky_response.states)} aircraft states")
+            logger.info(f"Retrieved {len(aircraft)} aircraft states with positions")
             
-            return opensky_response.states
+            return aircraft
             
         except httpx.HTTPStatusError as e:
             if e.response.status_code == 429:
@@ -267,75 +269,65 @@ class PlaneMatchService:
         quantization = settings.plane_match_time_quantization
         return (unix_timestamp // quantization) * quantization
     
-    def _calculate_line_of_sight(
+    def _calculate_lines_of_sight(
         self,
         observer_pos: Tuple[float, float],
         observer_alt: float,
-        target_pos: Tuple[float, float], 
-        target_alt: float
-    ) -> LineOfSight:
-        """Calculate line of sight from observer to target"""
+        target_lat: np.ndarray,
+        target_lon: np.ndarray,
+        target_alt: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Vectorized line of sight from observer to many targets
+        Spherical-earth bearing/haversine distance; returns (bearing_deg, elevation_deg, distance_km)
+        """
+        lat1 = math.radians(observer_pos[0])
+        lat2 = np.radians(target_lat)
+        dlat = lat2 - lat1
+        dlon = np.radians(target_lon - observer_pos[1])
+        cos_lat2 = np.cos(lat2)
         
-        # Calculate bearing and distance using geopy
-        distance_obj = geodesic(observer_pos, target_pos)
-        distance_km = distance_obj.kilometers
-        bearing_deg = distance_obj.bearing
+        # Initial bearing, normalized to 0-360
+        x = np.sin(dlon) * cos_lat2
+        y = math.cos(lat1) * np.sin(lat2) - math.sin(lat1) * cos_lat2 * np.cos(dlon)
+        bearing_deg = np.degrees(np.arctan2(x, y)) % 360.0
         
-        # Normalize bearing to 0-360
-        if bearing_deg < 0:
-            bearing_deg += 360
+        # Haversine distance
+        a = np.sin(dlat / 2) ** 2 + math.cos(lat1) * cos_lat2 * np.sin(dlon / 2) ** 2
+        distance_km = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
         
-        # Calculate elevation angle
+        # Elevation angle
         altitude_diff = target_alt - observer_alt
-        if distance_km > 0:
-            elevation_rad = math.atan2(altitude_diff, distance_km * 1000)  # Convert km to m
-            elevation_deg = math.degrees(elevation_rad)
-        else:
-            elevation_deg = 90.0 if altitude_diff > 0 else -90.0
-        
-        return LineOfSight(
-            bearing_deg=bearing_deg,
-            elevation_deg=elevation_deg,
-            distance_km=distance_km
+        elevation_deg = np.where(
+            distance_km > 0,
+            np.degrees(np.arctan2(altitude_diff, distance_km * 1000)),  # Convert km to m
+            np.where(altitude_diff > 0, 90.0, -90.0)
         )
+        
+        return bearing_deg, elevation_deg, distance_km
     
-    def _calculate_angular_error(
+    def _calculate_angular_errors(
         self,
         device_azimuth: float,
         device_pitch: float,
-        aircraft_bearing: float,
-        aircraft_elevation: float
-    ) -> float:
-        """Calculate angular error between device pointing direction and aircraft position"""
-        
-        # Convert degrees to radians
+        aircraft_bearing: np.ndarray,
+        aircraft_elevation: np.ndarray
+    ) -> np.ndarray:
+        """Angle between the device pointing direction and each aircraft direction, in degrees"""
         dev_az_rad = math.radians(device_azimuth)
         dev_pitch_rad = math.radians(device_pitch)
-        ac_bearing_rad = math.radians(aircraft_bearing)
-        ac_elev_rad = math.radians(aircraft_elevation)
-        
-        # Convert spherical coordinates to Cartesian unit vectors
-        # Device pointing direction
-        dev_x = math.sin(dev_az_rad) * math.cos(dev_pitch_rad)
-        dev_y = math.cos(dev_az_rad) * math.cos(dev_pitch_rad)
-        dev_z = math.sin(dev_pitch_rad)
+        ac_bearing_rad = np.radians(aircraft_bearing)
+        ac_elev_rad = np.radians(aircraft_elevation)
+        cos_ac_elev = np.cos(ac_elev_rad)
         
-        # Aircraft direction
-        ac_x = math.sin(ac_bearing_rad) * math.cos(ac_elev_rad)
-        ac_y = math.cos(ac_bearing_rad) * math.cos(ac_elev_rad)
-        ac_z = math.sin(ac_elev_rad)
-        
-        # Calculate dot product (cosine of angle between vectors)
-        dot_product = dev_x * ac_x + dev_y * ac_y + dev_z * ac_z
-        
-        # Clamp dot product to valid range for acos
-        dot_product = max(-1.0, min(1.0, dot_product))
-        
-        # Calculate angle in degrees
-        angle_rad = math.acos(dot_product)
-        angle_deg = math.degrees(angle_rad)
+        # Dot product of device and aircraft unit vectors
+        dot_product = (
+            math.sin(dev_az_rad) * math.cos(dev_pitch_rad) * np.sin(ac_bearing_rad) * cos_ac_elev +
+            math.cos(dev_az_rad) * math.cos(dev_pitch_rad) * np.cos(ac_bearing_rad) * cos_ac_elev +
+            math.sin(dev_pitch_rad) * np.sin(ac_elev_rad)
+        )
         
-        return angle_deg
+        return np.degrees(np.arccos(np.clip(dot_product, -1.0, 1.0)))
     
     def _calculate_confidence(
         self,
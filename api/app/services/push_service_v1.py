@@ -7,6 +7,7 @@ import json
 import logging
 import aiohttp
 import asyncio
+import orjson
 from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
 from enum import Enum
@@ -85,6 +86,18 @@ class PushPayload:
             message["apns"]["payload"]["aps"]["badge"] = self.badge_count
             
         return {"message": message}
+    
+    def to_fcm_v1_body_suffix(self) -> bytes:
+        """Encode everything but the token once per payload - see fcm_v1_body()"""
+        message = self.to_fcm_v1_message(token="")["message"]
+        del message["token"]
+        # Drop the leading '{' so the token can be spliced in front; close the outer object
+        return orjson.dumps(message)[1:] + b"}"
+
+
+def fcm_v1_body(token: str, body_suffix: bytes) -> bytes:
+    """Build a device's FCM v1 request body from the shared pre-encoded payload"""
+    return b'{"message":{"token":' + orjson.dumps(token) + b"," + body_suffix
 
 
 @dataclass  
@@ -205,13 +218,16 @@ class PushNotificationServiceV1:
             "Content-Type": "application/json"
         }
         
+        # Payload is identical for every recipient, so encode it once
+        body_suffix = payload.to_fcm_v1_body_suffix()
+        
         async with aiohttp.ClientSession() as session:
             tasks = []
             for target in filtered_targets:
                 # Only send to FCM tokens (not APNS directly)
                 if target.provider == PushProvider.FCM:
                     task = self._send_single_fcm_v1(
-                        session, target, payload, headers
+                        session, target, body_suffix, headers
                     )
                     tasks.append(task)
                     
@@ -269,18 +285,16 @@ class PushNotificationServiceV1:
         self,
         session: aiohttp.ClientSession,
         target: PushTarget,
-        payload: PushPayload,
+        body_suffix: bytes,
         headers: Dict[str, str]
     ) -> Dict[str, Any]:
         """Send single FCM v1 notification"""
         
         try:
-            message = payload.to_fcm_v1_message(target.push_token)
-            
             async with session.post(
                 self.fcm_v1_url,
                 headers=headers,
-                json=message,
+                data=fcm_v1_body(target.push_token, body_suffix),
                 timeout=aiohttp.ClientTimeout(total=30)
             ) as response:
                 
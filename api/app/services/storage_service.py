@@ -119,8 +119,9 @@ class StorageService:
             if request.checksum:
                 fields["x-amz-meta-checksum"] = request.checksum
             
-            # Generate presigned POST
-            presigned_post = self.client.generate_presigned_post(
+            # Generate presigned POST (sync boto3 signing runs off the event loop)
+            presigned_post = await asyncio.to_thread(
+                self.client.generate_presigned_post,
                 Bucket=settings.s3_bucket,
                 Key=object_key,
                 Fields=fields,
@@ -8,6 +8,31 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+# Module-level SQL so every call hits the same entry in asyncpg's prepared statement cache
+_MIGRATE_SIGHTINGS_SQL = """
+    UPDATE sightings 
+    SET reporter_id = $1
+    WHERE reporter_id = $2
+"""
+
+_MIGRATION_STATUS_SQL = """
+    SELECT
+        COUNT(*) AS total_sightings,
+        COUNT(*) FILTER (
+            WHERE reporter_id IS NOT NULL
+            AND (reporter_id LIKE '%-%' OR reporter_id LIKE '%_%')
+            AND reporter_id NOT LIKE '%.%.%'
+        ) AS device_id_count,
+        COUNT(*) FILTER (
+            WHERE reporter_id IS NOT NULL
+            AND reporter_id LIKE '%.%.%'
+        ) AS username_count,
+        COUNT(*) FILTER (
+            WHERE reporter_id IS NULL OR reporter_id = ''
+        ) AS null_count
+    FROM sightings
+"""
+
 class UserMigrationService:
     """Service to migrate device IDs to usernames in existing data"""
     
@@ -22,11 +47,7 @@ class UserMigrationService:
         async with self.db_pool.acquire() as conn:
             try:
                 # Update sightings table
-                result = await conn.execute("""
-                    UPDATE sightings 
-                    SET reporter_id = $1
-                    WHERE reporter_id = $2
-                """, username, device_id)
+                result = await conn.execute(_MIGRATE_SIGHTINGS_SQL, username, device_id)
                 
                 # Extract number of updated rows from result
                 updated_count = int(result.split()[-1]) if result.startswith('UPDATE') else 0
@@ -41,28 +62,12 @@ class UserMigrationService:
     async def get_migration_status(self) -> dict:
         """Get status of device ID to username migration"""
         async with self.db_pool.acquire() as conn:
-            # Count sightings with device_id format (contains hyphens/underscores)
-            device_id_count = await conn.fetchval("""
-                SELECT COUNT(*) FROM sightings 
-                WHERE reporter_id IS NOT NULL 
-                AND (reporter_id LIKE '%-%' OR reporter_id LIKE '%_%')
-                AND reporter_id NOT LIKE '%.%.%'
-            """)
-            
-            # Count sightings with username format (dot.separated.numbers)
-            username_count = await conn.fetchval("""
-                SELECT COUNT(*) FROM sightings 
-                WHERE reporter_id IS NOT NULL 
-                AND reporter_id LIKE '%.%.%'
-            """)
-            
-            # Count null/empty reporter_ids
-            null_count = await conn.fetchval("""
-                SELECT COUNT(*) FROM sightings 
-                WHERE reporter_id IS NULL OR reporter_id = ''
-            """)
-            
-            total_sightings = await conn.fetchval("SELECT COUNT(*) FROM sightings")
+            # Single pass over sightings for all migration counters
+            counts = await conn.fetchrow(_MIGRATION_STATUS_SQL)
+            total_sightings = counts['total_sightings']
+            device_id_count = counts['device_id_count']
+            username_count = counts['username_count']
+            null_count = counts['null_count']
             
             return {
                 "total_sightings": total_sightings,
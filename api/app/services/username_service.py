@@ -5,6 +5,7 @@ Generates human-readable usernames like 'cosmic-whisper-7823'
 
 import random
 import secrets
+from functools import lru_cache
 from typing import List, Tuple
 
 
@@ -64,9 +65,10 @@ class UsernameGenerator:
         return [cls.generate(num_suffix_digits) for _ in range(count)]
     
     @classmethod
+    @lru_cache(maxsize=4096)
     def is_valid_username(cls, username: str) -> Tuple[bool, str]:
         """
-        Validate a username format
+        Validate a username format (results are cached per username)
         
         Returns:
             (is_valid, error_message)
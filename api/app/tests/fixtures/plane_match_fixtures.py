@@ -118,7 +118,7 @@ class PlaneMatchTestFixtures:
                 "states": [
                     # Aircraft positioned exactly in user's line of sight
                     ["perfect", "TEST123 ", "United States", base_time-5, base_time-2,
-                     -122.3100, 37.6400, 8000.0, False, 200.0, 45.0, 0.0, None, 8534.4, "1200", False, 0],
+                     -122.2697, 37.7077, 8000.0, False, 200.0, 45.0, 0.0, None, 8534.4, "1200", False, 0],
                 ]
             },
             
@@ -138,15 +138,15 @@ class PlaneMatchTestFixtures:
                 "states": [
                     # Very close match - high confidence expected
                     ["close1", "AAL789  ", "United States", base_time-5, base_time-2,
-                     -122.3150, 37.6350, 9144.0, False, 180.2, 44.8, 0.0, None, 9600.5, "1200", False, 0],
+                     -118.1239, 34.1503, 9144.0, False, 180.2, 44.8, 0.0, None, 9600.5, "1200", False, 0],
                      
                     # Decent match - medium confidence
                     ["close2", "VIR100  ", "United Kingdom", base_time-8, base_time-3,
-                     -122.3250, 37.6450, 10668.0, False, 195.7, 47.2, 0.0, None, 11200.3, "2000", False, 0],
+                     -118.1057, 34.1605, 10668.0, False, 195.7, 47.2, 0.0, None, 11200.3, "2000", False, 0],
                      
                     # Poor match - low confidence  
                     ["far1", "BAW200   ", "United Kingdom", base_time-12, base_time-7,
-                     -122.3400, 37.6200, 11582.4, False, 156.3, 52.1, 0.0, None, 12100.8, "2451", False, 0],
+                     -118.0971, 34.1539, 11582.4, False, 156.3, 52.1, 0.0, None, 12100.8, "2451", False, 0],
                 ]
             }
         }
@@ -0,0 +1,430 @@
+"""
+Tests for AlertsService witness confirmation, keyset paging of recent alerts
+and batched enrichment writes.
+
+The TestAlertsServiceDatabase tests run the real SQL and are skipped unless
+TEST_DATABASE_URL points at a PostgreSQL database they may create schemas in.
+"""
+
+import asyncio
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, patch
+
+import asyncpg
+import orjson
+import pytest
+import pytest_asyncio
+
+from ..services import alerts_service
+from ..services.alerts_service import AlertsService, _CONFIRM_WITNESS_SQL
+from ..services.database_service import register_jsonb_codec
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+USER_ID = "6f1c2f9e-3d4b-4a8e-9c55-0b7d2e1a4f30"
+
+
+def _confirm_row(**overrides):
+    """_CONFIRM_WITNESS_SQL result where every check passed and the row was inserted"""
+    row = {
+        "within_window": True,
+        "already_confirmed": False,
+        "recent_confirmations": 0,
+        "distance_km": 1.5,
+        "max_distance_km": 50.0,
+        "inserted": True,
+        "witness_count": 2,
+        "total_confirmations": 1,
+        "age_minutes": 5,
+        "user_id": USER_ID,
+    }
+    row.update(overrides)
+    return row
+
+
+WITNESS_DATA = {"latitude": 37.77, "longitude": -122.42, "accuracy": 10.0, "still_visible": True}
+
+
+class TestConfirmWitness:
+    """confirm_witness maps each SQL check flag onto the matching error"""
+
+    @pytest.fixture(autouse=True)
+    def no_profile_cache(self):
+        with patch.object(alerts_service, "invalidate_profile_cache", AsyncMock()) as invalidate:
+            yield invalidate
+
+    @pytest.fixture
+    def confirm(self, fake_pool):
+        """Run confirm_witness against a connection returning the given SQL row"""
+        async def confirm(row, witness_data=WITNESS_DATA):
+            conn = AsyncMock()
+            conn.fetchrow.return_value = row
+            service = AlertsService(fake_pool(conn))
+            result = await service.confirm_witness(str(uuid.uuid4()), "device_12345678", witness_data)
+            return result, conn
+        return confirm
+
+    @pytest.mark.asyncio
+    async def test_confirmation_succeeds(self, confirm, no_profile_cache):
+        result, conn = await confirm(_confirm_row())
+
+        assert result["confirmed"] is True
+        assert result["new_witness_count"] == 2
+        assert result["total_confirmations"] == 1
+        assert result["sighting_age_minutes"] == 5
+        # Profile stats are cached per user, so the owning user's entry is dropped
+        no_profile_cache.assert_awaited_once_with(USER_ID)
+
+        args = conn.fetchrow.await_args.args
+        assert args[0] is _CONFIRM_WITNESS_SQL
+        # Witness coords are bound for the distance check and the typed insert columns
+        assert args[5:7] == (37.77, -122.42)
+        assert args[8:13] == (37.77, -122.42, None, 10.0, True)
+
+    @pytest.mark.asyncio
+    async def test_unregistered_device_skips_profile_invalidation(self, confirm, no_profile_cache):
+        await confirm(_confirm_row(user_id=None))
+        no_profile_cache.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_distance_check_skipped_without_witness_location(self, confirm):
+        _, conn = await confirm(_confirm_row(distance_km=None), witness_data={})
+
+        args = conn.fetchrow.await_args.args
+        assert args[5:7] == (None, None)
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("row, message", [
+        (None, "Sighting not found"),
+        (_confirm_row(within_window=False, inserted=False), "window has closed"),
+        (_confirm_row(already_confirmed=True, inserted=False), "already confirmed"),
+        (_confirm_row(recent_confirmations=5, inserted=False), "Rate limit exceeded"),
+        (_confirm_row(distance_km=60.0, inserted=False), "too far from sighting"),
+        # Every check passed but ON CONFLICT skipped the insert: a concurrent confirm won
+        (_confirm_row(inserted=False), "already confirmed"),
+    ])
+    async def test_failed_check_raises(self, row, message, confirm, no_profile_cache):
+        with pytest.raises(ValueError, match=message):
+            await confirm(row)
+        no_profile_cache.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_checks_reported_in_order(self, confirm):
+        """When several checks fail, the earliest one in the original order is reported"""
+        row = _confirm_row(within_window=False, already_confirmed=True,
+                           recent_confirmations=99, distance_km=500.0, inserted=False)
+        with pytest.raises(ValueError, match="window has closed"):
+            await confirm(row)
+
+
+class TestBatchedEnrichment:
+    """_write_enrichment coalesces concurrent writes into one UPDATE"""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_writes_share_one_update(self, fake_pool):
+        conn = AsyncMock()
+        service = AlertsService(fake_pool(conn))
+        ids = [str(uuid.uuid4()) for _ in range(3)]
+
+        await asyncio.gather(*[
+            service._write_enrichment(alert_id, {"weather": {"n": n}})
+            for n, alert_id in enumerate(ids)
+        ])
+
+        conn.execute.assert_awaited_once()
+        sql, batch_ids, batch_data = conn.execute.await_args.args
+        assert sql is alerts_service._BATCH_ENRICHMENT_SQL
+        assert batch_ids == [uuid.UUID(i) for i in ids]
+        assert [orjson.loads(d) for d in batch_data] == [{"weather": {"n": n}} for n in range(3)]
+        assert alerts_service._pending_enrichment == {}
+        assert alerts_service._enrichment_flush_tasks == {}
+
+    @pytest.mark.asyncio
+    async def test_failed_update_reaches_every_writer(self, fake_pool):
+        conn = AsyncMock()
+        conn.execute.side_effect = asyncpg.PostgresError("boom")
+        service = AlertsService(fake_pool(conn))
+
+        results = await asyncio.gather(
+            service._write_enrichment(str(uuid.uuid4()), {}),
+            service._write_enrichment(str(uuid.uuid4()), {}),
+            return_exceptions=True
+        )
+
+        assert all(isinstance(r, asyncpg.PostgresError) for r in results)
+        conn.execute.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_each_pool_flushes_its_own_writes(self, fake_pool):
+        first, second = AsyncMock(), AsyncMock()
+        first_id, second_id = str(uuid.uuid4()), str(uuid.uuid4())
+
+        await asyncio.gather(
+            AlertsService(fake_pool(first))._write_enrichment(first_id, {}),
+            AlertsService(fake_pool(second))._write_enrichment(second_id, {}),
+        )
+
+        assert first.execute.await_args.args[1] == [uuid.UUID(first_id)]
+        assert second.execute.await_args.args[1] == [uuid.UUID(second_id)]
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("cancel_in_execute", [False, True])
+    async def test_cancelled_flush_releases_writers(self, cancel_in_execute, fake_pool):
+        """Cancelling the flush cancels its writers and lets the next write schedule a new one"""
+        async def hung_update(*args):
+            await asyncio.sleep(10)
+
+        conn = AsyncMock()
+        if cancel_in_execute:
+            conn.execute.side_effect = hung_update
+        service = AlertsService(fake_pool(conn))
+
+        writers = [
+            asyncio.create_task(service._write_enrichment(str(uuid.uuid4()), {}))
+            for _ in range(2)
+        ]
+        await asyncio.sleep(0)
+        flush = alerts_service._enrichment_flush_tasks[service.db_pool]
+        if cancel_in_execute:
+            await asyncio.sleep(alerts_service.ENRICHMENT_FLUSH_DELAY_SECONDS * 2)
+        flush.cancel()
+
+        results = await asyncio.wait_for(asyncio.gather(*writers, return_exceptions=True), 1)
+        assert all(isinstance(r, asyncio.CancelledError) for r in results)
+        assert alerts_service._pending_enrichment == {}
+        assert alerts_service._enrichment_flush_tasks == {}
+
+        conn.execute.side_effect = None
+        await asyncio.wait_for(service._write_enrichment(str(uuid.uuid4()), {}), 1)
+
+
+_SCHEMA_SQL = """
+    CREATE TABLE users (
+        id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+        username text
+    );
+    CREATE TABLE user_devices (
+        device_id text PRIMARY KEY,
+        user_id uuid NOT NULL REFERENCES users(id)
+    );
+    CREATE TABLE sightings (
+        id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+        title text,
+        description text,
+        category text,
+        alert_level text,
+        witness_count integer DEFAULT 1,
+        is_public boolean DEFAULT true,
+        reporter_id text,
+        media_info jsonb DEFAULT '{}',
+        sensor_data jsonb DEFAULT '{}',
+        enrichment_data jsonb DEFAULT '{}',
+        created_at timestamptz DEFAULT NOW(),
+        updated_at timestamptz DEFAULT NOW()
+    );
+    CREATE TABLE witness_confirmations (
+        id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+        sighting_id uuid NOT NULL REFERENCES sightings(id) ON DELETE CASCADE,
+        device_id varchar(255) NOT NULL,
+        witness_latitude float8 NOT NULL,
+        witness_longitude float8 NOT NULL,
+        witness_altitude float8,
+        location_accuracy float8,
+        still_visible boolean NOT NULL DEFAULT true,
+        confirmation_data jsonb,
+        confirmed_at timestamptz DEFAULT NOW()
+    );
+    CREATE UNIQUE INDEX uq_witness_confirmations_sighting_device
+        ON witness_confirmations (sighting_id, device_id);
+"""
+
+
+@pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL not set")
+class TestAlertsServiceDatabase:
+    """The same behaviour against PostgreSQL, in a throwaway schema"""
+
+    @pytest_asyncio.fixture
+    async def db_pool(self):
+        schema = f"test_alerts_{uuid.uuid4().hex[:12]}"
+        admin = await asyncpg.connect(TEST_DATABASE_URL)
+        await admin.execute(f"CREATE SCHEMA {schema}")
+        pool = await asyncpg.create_pool(
+            TEST_DATABASE_URL, min_size=1, max_size=4,
+            server_settings={"search_path": schema},
+            init=register_jsonb_codec
+        )
+        try:
+            async with pool.acquire() as conn:
+                await conn.execute(_SCHEMA_SQL)
+            yield pool
+        finally:
+            await pool.close()
+            await admin.execute(f"DROP SCHEMA {schema} CASCADE")
+            await admin.close()
+
+    @pytest.fixture(autouse=True)
+    def no_profile_cache(self):
+        with patch.object(alerts_service, "invalidate_profile_cache", AsyncMock()) as invalidate:
+            yield invalidate
+
+    async def _sighting(self, conn, lat=37.77, lng=-122.42, age=timedelta(minutes=5),
+                        visibility_km=None, is_public=True, created_at=None):
+        sensor_data = {} if lat is None else {"location": {"latitude": lat, "longitude": lng}}
+        enrichment = {} if visibility_km is None else {"weather": {"visibility_km": visibility_km}}
+        return str(await conn.fetchval("""
+            INSERT INTO sightings (sensor_data, enrichment_data, is_public, created_at)
+            VALUES ($1::jsonb, $2::jsonb, $3, COALESCE($4, NOW() - $5::interval))
+            RETURNING id
+        """, orjson.dumps(sensor_data).decode(), orjson.dumps(enrichment).decode(),
+            is_public, created_at, age))
+
+    @pytest.mark.asyncio
+    async def test_confirm_witness_checks(self, db_pool, no_profile_cache):
+        service = AlertsService(db_pool)
+        async with db_pool.acquire() as conn:
+            await conn.execute("INSERT INTO users (id) VALUES ($1)", uuid.UUID(USER_ID))
+            await conn.execute(
+                "INSERT INTO user_devices (device_id, user_id) VALUES ('device_a', $1)", uuid.UUID(USER_ID)
+            )
+            fresh = await self._sighting(conn, visibility_km=10.0)
+            stale = await self._sighting(conn, age=timedelta(hours=2))
+            others = [await self._sighting(conn) for _ in range(5)]
+
+        result = await service.confirm_witness(fresh, "device_a", WITNESS_DATA)
+        assert result["new_witness_count"] == 2
+        assert result["total_confirmations"] == 1
+        assert result["sighting_age_minutes"] == 5
+        no_profile_cache.assert_awaited_once_with(USER_ID)
+
+        with pytest.raises(ValueError, match="already confirmed"):
+            await service.confirm_witness(fresh, "device_a", WITNESS_DATA)
+
+        with pytest.raises(ValueError, match="window has closed"):
+            await service.confirm_witness(stale, "device_b", WITNESS_DATA)
+
+        # ~22km away with 10km visibility: beyond 2x visibility
+        far = {"latitude": 37.97, "longitude": -122.42}
+        with pytest.raises(ValueError, match=r"too far from sighting \(22\.\dkm\)\. Must be within 20\.0km"):
+            await service.confirm_witness(fresh, "device_b", far)
+
+        # Default limit is 5 confirmations per hour per device
+        for sighting_id in others:
+            await service.confirm_witness(sighting_id, "device_c", WITNESS_DATA)
+        with pytest.raises(ValueError, match="Rate limit exceeded"):
+            await service.confirm_witness(fresh, "device_c", WITNESS_DATA)
+
+        with pytest.raises(ValueError, match="Sighting not found"):
+            await service.confirm_witness(str(uuid.uuid4()), "device_d", WITNESS_DATA)
+
+        async with db_pool.acquire() as conn:
+            assert await conn.fetchval("SELECT witness_count FROM sightings WHERE id = $1", uuid.UUID(fresh)) == 2
+            assert await conn.fetchval("SELECT COUNT(*) FROM witness_confirmations") == 6
+
+    @pytest.mark.asyncio
+    async def test_concurrent_confirm_loses_on_conflict(self, db_pool):
+        """A confirm racing an uncommitted one for the same device inserts nothing"""
+        async with db_pool.acquire() as conn:
+            sighting_id = uuid.UUID(await self._sighting(conn))
+
+        args = (sighting_id, "device_a", 60, 5, 37.77, -122.42, "{}",
+                37.77, -122.42, None, None, True)
+        async with db_pool.acquire() as first, db_pool.acquire() as second:
+            tr = first.transaction()
+            await tr.start()
+            won = await first.fetchrow(_CONFIRM_WITNESS_SQL, *args)
+            assert won["inserted"] is True
+
+            # Blocks on the unique index until the first transaction commits
+            racing = asyncio.create_task(second.fetchrow(_CONFIRM_WITNESS_SQL, *args))
+            await asyncio.sleep(0.2)
+            assert not racing.done()
+            await tr.commit()
+            lost = await racing
+
+        assert lost["already_confirmed"] is False  # the snapshot predates the winner
+        assert lost["inserted"] is False
+        assert lost["witness_count"] is None
+        async with db_pool.acquire() as conn:
+            assert await conn.fetchval("SELECT witness_count FROM sightings WHERE id = $1", sighting_id) == 2
+            assert await conn.fetchval("SELECT COUNT(*) FROM witness_confirmations") == 1
+
+    @pytest.mark.asyncio
+    async def test_recent_alerts_keyset_pages(self, db_pool):
+        base = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        async with db_pool.acquire() as conn:
+            expected = [
+                await self._sighting(conn, created_at=base + timedelta(minutes=n))
+                for n in range(5)
+            ][::-1]
+            await self._sighting(conn, created_at=base + timedelta(minutes=10), is_public=False)
+            await self._sighting(conn, created_at=base + timedelta(minutes=11), lat=None)
+
+        service = AlertsService(db_pool)
+        seen, created_before = [], None
+        while True:
+            page = await service.get_recent_alerts(limit=2, created_before=created_before)
+            if not page:
+                break
+            seen.extend(alert["id"] for alert in page)
+            created_before = datetime.fromisoformat(page[-1]["created_at"])
+
+        assert seen == expected
+
+    @pytest.mark.asyncio
+    async def test_batched_enrichment_writes_each_row(self, db_pool):
+        async with db_pool.acquire() as conn:
+            ids = [await self._sighting(conn) for _ in range(3)]
+
+        service = AlertsService(db_pool)
+        await asyncio.gather(*[
+            service._write_enrichment(alert_id, {"weather": {"n": n}})
+            for n, alert_id in enumerate(ids)
+        ])
+
+        async with db_pool.acquire() as conn:
+            rows = await conn.fetch(
+                "SELECT id::text, enrichment_data FROM sightings WHERE id = ANY($1::uuid[])", ids
+            )
+        assert {r["id"]: r["enrichment_data"] for r in rows} == {
+            alert_id: {"weather": {"n": n}} for n, alert_id in enumerate(ids)
+        }
+
+    @pytest.mark.asyncio
+    async def test_confirmation_timestamps_carry_offset(self, db_pool):
+        """Aggregation and status render confirmed_at the same way, with its UTC offset"""
+        async with db_pool.acquire() as conn:
+            sighting_id = await self._sighting(conn)
+            await conn.execute("SET timezone = 'America/New_York'")
+        service = AlertsService(db_pool)
+        await service.confirm_witness(sighting_id, "device_a", WITNESS_DATA)
+
+        aggregation = await service.get_witness_aggregation(sighting_id)
+        status = await service.get_witness_status(sighting_id, "device_a")
+
+        confirmed_at = aggregation["confirmations"][0]["confirmed_at"]
+        assert confirmed_at == status["confirmed_at"]
+        assert datetime.fromisoformat(confirmed_at).utcoffset() is not None
+
+    @pytest.mark.asyncio
+    async def test_alert_coords_accept_numeric_strings(self, db_pool):
+        """Legacy sensor_data with string coords still resolves a location"""
+        async with db_pool.acquire() as conn:
+            ids = {}
+            for name, sensor_data in {
+                "nested": {"location": {"latitude": "37.5", "longitude": " -122.25 "}},
+                "top_level": {"latitude": "4e1", "longitude": "-122"},
+                "garbage": {"latitude": "north", "longitude": "west"},
+            }.items():
+                ids[name] = str(await conn.fetchval(
+                    "INSERT INTO sightings (sensor_data) VALUES ($1::jsonb) RETURNING id",
+                    orjson.dumps(sensor_data).decode()
+                ))
+
+        service = AlertsService(db_pool)
+        nested = await service.get_alert_by_id(ids["nested"])
+        top_level = await service.get_alert_by_id(ids["top_level"])
+
+        assert (nested["location"]["latitude"], nested["location"]["longitude"]) == (37.5, -122.25)
+        assert (top_level["location"]["latitude"], top_level["location"]["longitude"]) == (40.0, -122.0)
+        assert await service.get_alert_by_id(ids["garbage"]) is None
@@ -2,12 +2,13 @@
 Unit tests for plane matching functionality using synthetic fixtures.
 """
 
+import numpy as np
 import pytest
-from unittest.mock import AsyncMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 from datetime import datetime, timezone
 
-from ..services.plane_match_service import PlaneMatchService
-from ..schemas.plane_match import SensorDataSchema, OpenSkyResponse
+from ..services.plane_match_service import PlaneMatchService, EARTH_RADIUS_KM
+from ..schemas.plane_match import SensorDataSchema, OpenSkyStateBatch
 from .fixtures.plane_match_fixtures import PlaneMatchTestFixtures
 
 
@@ -33,9 +34,8 @@ class TestPlaneMatchService:
         sensor_data = fixtures.get_test_sensor_data("sfo_area", azimuth=45.0, pitch=30.0)
         mock_response = fixtures.get_mock_opensky_response("perfect_match")
         
-        # Mock the HTTP client response
-        mock_opensky_client.get.return_value.json.return_value = mock_response
-        mock_opensky_client.get.return_value.raise_for_status = AsyncMock()
+        # Mock the HTTP client response (httpx's json()/raise_for_status() are sync)
+        mock_opensky_client.get.return_value = MagicMock(**{"json.return_value": mock_response})
         
         # Patch the service's client
         with patch.object(plane_match_service, 'client', mock_opensky_client):
@@ -58,9 +58,8 @@ class TestPlaneMatchService:
         sensor_data = fixtures.get_test_sensor_data("nevada_rural", azimuth=90.0, pitch=45.0)
         mock_response = fixtures.get_mock_opensky_response("no_aircraft")
         
-        # Mock the HTTP client response
-        mock_opensky_client.get.return_value.json.return_value = mock_response
-        mock_opensky_client.get.return_value.raise_for_status = AsyncMock()
+        # Mock the HTTP client response (httpx's json()/raise_for_status() are sync)
+        mock_opensky_client.get.return_value = MagicMock(**{"json.return_value": mock_response})
         
         # Patch the service's client
         with patch.object(plane_match_service, 'client', mock_opensky_client):
@@ -82,9 +81,8 @@ class TestPlaneMatchService:
         sensor_data = fixtures.get_test_sensor_data("lax_area", azimuth=45.0, pitch=30.0)
         mock_response = fixtures.get_mock_opensky_response("multiple_candidates")
         
-        # Mock the HTTP client response
-        mock_opensky_client.get.return_value.json.return_value = mock_response
-        mock_opensky_client.get.return_value.raise_for_status = AsyncMock()
+        # Mock the HTTP client response (httpx's json()/raise_for_status() are sync)
+        mock_opensky_client.get.return_value = MagicMock(**{"json.return_value": mock_response})
         
         # Patch the service's client
         with patch.object(plane_match_service, 'client', mock_opensky_client):
@@ -107,9 +105,8 @@ class TestPlaneMatchService:
         sensor_data = fixtures.get_test_sensor_data("sfo_area", azimuth=270.0, pitch=20.0)
         mock_response = fixtures.get_mock_opensky_response("ground_aircraft")
         
-        # Mock the HTTP client response
-        mock_opensky_client.get.return_value.json.return_value = mock_response
-        mock_opensky_client.get.return_value.raise_for_status = AsyncMock()
+        # Mock the HTTP client response (httpx's json()/raise_for_status() are sync)
+        mock_opensky_client.get.return_value = MagicMock(**{"json.return_value": mock_response})
         
         # Patch the service's client
         with patch.object(plane_match_service, 'client', mock_opensky_client):
@@ -120,29 +117,66 @@ class TestPlaneMatchService:
         assert result.is_plane == False
         assert result.confidence == 0.0
     
+    def test_lines_of_sight_known_geometry(self, plane_match_service):
+        """Bearing, elevation and distance against hand-computed spherical values"""
+        one_degree_km = EARTH_RADIUS_KM * np.pi / 180.0  # ~111.195 km
+        
+        bearing, elevation, distance = plane_match_service._calculate_lines_of_sight(
+            observer_pos=(0.0, 0.0),
+            observer_alt=0.0,
+            target_lat=np.array([1.0, 0.0, 1.0, 0.0]),
+            target_lon=np.array([0.0, 1.0, 1.0, -1.0]),
+            target_alt=np.array([0.0, 10000.0, 0.0, 0.0])
+        )
+        
+        # Due north, due east, north-east diagonal, due west
+        np.testing.assert_allclose(bearing, [0.0, 90.0, 44.995636, 270.0], atol=1e-4)
+        np.testing.assert_allclose(
+            distance, [one_degree_km, one_degree_km, 157.249598, one_degree_km], rtol=1e-6
+        )
+        # 10 km above a point 111.195 km away: atan2(10000, 111195) = 5.1389°
+        np.testing.assert_allclose(elevation, [0.0, 5.138902, 0.0, 0.0], atol=1e-4)
+    
+    def test_lines_of_sight_overhead(self, plane_match_service):
+        """A target directly above the observer is at +90° elevation"""
+        _, elevation, distance = plane_match_service._calculate_lines_of_sight(
+            observer_pos=(37.0, -122.0),
+            observer_alt=100.0,
+            target_lat=np.array([37.0]),
+            target_lon=np.array([-122.0]),
+            target_alt=np.array([9000.0])
+        )
+        assert distance[0] == 0.0
+        assert elevation[0] == 90.0
+    
     def test_angular_error_calculation(self, plane_match_service):
         """Test angular error calculation between device and aircraft"""
-        
-        # Test perfect alignment (0° error)
-        error = plane_match_service._calculate_angular_error(
+        errors = plane_match_service._calculate_angular_errors(
             device_azimuth=45.0,
             device_pitch=30.0,
-            aircraft_bearing=45.0,
-            aircraft_elevation=30.0
+            aircraft_bearing=np.array([45.0, 135.0, 225.0]),
+            aircraft_elevation=np.array([30.0, 30.0, -30.0])
         )
-        assert abs(error) < 0.1  # Should be very close to 0
         
-        # Test 90° difference in azimuth
-        error = plane_match_service._calculate_angular_error(
+        # Perfect alignment is 0°, the exact opposite direction is 180°
+        assert abs(errors[0]) < 0.1
+        assert abs(errors[2] - 180.0) < 0.1
+        
+        # 90° apart in azimuth at 30° pitch: arccos(sin²30°) = 75.52°
+        assert abs(errors[1] - 75.5225) < 0.01
+        
+        errors = plane_match_service._calculate_angular_errors(
             device_azimuth=0.0,
             device_pitch=0.0,
-            aircraft_bearing=90.0,
-            aircraft_elevation=0.0
+            aircraft_bearing=np.array([90.0]),
+            aircraft_elevation=np.array([0.0])
         )
-        assert abs(error - 90.0) < 1.0  # Should be close to 90°
+        assert abs(errors[0] - 90.0) < 1e-9
     
-    def test_confidence_calculation(self, plane_match_service):
+    @patch('app.services.plane_match_service.settings')
+    def test_confidence_calculation(self, mock_settings, plane_match_service):
         """Test confidence scoring for aircraft matches"""
+        mock_settings.plane_match_tolerance_deg = 5.0
         
         # High confidence: low angular error, good distance, good altitude
         confidence = plane_match_service._calculate_confidence(
@@ -166,7 +200,7 @@ class TestPlaneMatchService:
             distance_km=0.5,
             altitude=500.0
         )
-        assert 0.3 < confidence < 0.7
+        assert confidence == pytest.approx(0.8 * 0.5 * 0.7)
     
     def test_bbox_calculation(self, plane_match_service):
         """Test bounding box calculation for API queries"""
@@ -188,7 +222,7 @@ class TestPlaneMatchService:
         """Test timestamp quantization for caching"""
         
         # Mock settings
-        with patch('..services.plane_match_service.settings') as mock_settings:
+        with patch('app.services.plane_match_service.settings') as mock_settings:
             mock_settings.plane_match_time_quantization = 5
             
             test_time = datetime(2024, 1, 1, 12, 0, 7, 500000, timezone.utc)  # 12:00:07.5
@@ -220,11 +254,26 @@ class TestPlaneMatchFixtures:
         fixtures = PlaneMatchTestFixtures()
         mock_response = fixtures.get_mock_opensky_response("high_traffic")
         
-        # Should be able to parse with OpenSkyResponse
-        opensky_response = OpenSkyResponse.from_api_response(mock_response)
+        # Should be able to parse with OpenSkyStateBatch
+        aircraft = OpenSkyStateBatch(mock_response["states"])
         
-        assert len(opensky_response.states) > 0
-        assert all(state.icao24 for state in opensky_response.states)
+        assert len(aircraft) > 0
+        assert aircraft.latitude.shape == aircraft.longitude.shape == (len(aircraft),)
+        assert all(aircraft.state(i).icao24 for i in range(len(aircraft)))
+    
+    def test_state_batch_skips_unusable_vectors(self):
+        """Vectors without a position/altitude or that are truncated are dropped"""
+        good = ["abc123", "TEST1  ", "US", 0, 0, -122.0, 37.0, 9000.0, False,
+                200.0, 90.0, 0.0, None, 9100.0, None, False, 0]
+        no_altitude = list(good)
+        no_altitude[7] = None
+        
+        aircraft = OpenSkyStateBatch([good, no_altitude, good[:10], None])
+        
+        assert len(aircraft) == 1
+        assert aircraft.baro_altitude.tolist() == [9000.0]
+        assert aircraft.state(0).callsign == "TEST1"
+        assert len(OpenSkyStateBatch(None)) == 0
     
     def test_comprehensive_scenarios(self):
         """Test all predefined test scenarios"""
@@ -0,0 +1,67 @@
+"""
+Unit tests for device registration in the users router.
+"""
+
+import uuid
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from ..routers import users
+from ..services.username_service import UsernameGenerator
+
+
+class TestRegisterUser:
+    """register_user for known and unknown devices"""
+
+    @pytest.fixture
+    def existing_user(self):
+        return {"id": uuid.uuid4(), "username": UsernameGenerator.generate()}
+
+    @pytest.mark.asyncio
+    async def test_returning_device_with_email_gets_existing_account(self, existing_user, fake_pool):
+        """A known device re-sending its email is welcomed back, not rejected as a duplicate"""
+        conn = AsyncMock()
+        conn.fetchrow.return_value = existing_user
+        request = users.UserRegistrationRequest(
+            device_id="device_12345678",
+            platform="ios",
+            email="watcher@example.com",
+        )
+
+        with patch.object(users, "get_db", AsyncMock(return_value=fake_pool(conn))), \
+             patch.object(users, "_available_usernames", AsyncMock()) as available, \
+             patch.object(users, "_reserve_username", AsyncMock()) as reserve:
+            response = await users.register_user(request)
+
+        assert response.is_new_user is False
+        assert response.user_id == str(existing_user["id"])
+        assert response.username == existing_user["username"]
+        assert response.message.startswith("Welcome back")
+        # No username reservation and no users insert/delete for a known device
+        available.assert_not_awaited()
+        reserve.assert_not_awaited()
+        conn.fetchval.assert_not_awaited()
+        conn.execute.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_concurrent_registration_returns_winning_account(self, existing_user, fake_pool):
+        """If another request registers the device first, the new user row is discarded"""
+        conn = AsyncMock()
+        conn.fetchrow.side_effect = [None, existing_user]
+        conn.fetchval.return_value = None  # device insert hit ON CONFLICT
+        candidate = UsernameGenerator.generate()
+        request = users.UserRegistrationRequest(device_id="device_12345678", platform="android")
+
+        with patch.object(users, "get_db", AsyncMock(return_value=fake_pool(conn))), \
+             patch.object(users, "_available_usernames", AsyncMock(return_value=[candidate])), \
+             patch.object(users, "_reserve_username", AsyncMock(return_value=True)), \
+             patch.object(users, "_release_username", AsyncMock()) as release:
+            response = await users.register_user(request)
+
+        assert response.is_new_user is False
+        assert response.user_id == str(existing_user["id"])
+        sql, discarded_id = conn.execute.await_args.args
+        assert sql.startswith("DELETE FROM users")
+        assert isinstance(discarded_id, uuid.UUID)
+        release.assert_awaited_once_with(candidate)
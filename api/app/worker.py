@@ -4,9 +4,11 @@ import time
 import logging
 import json
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any
 from uuid import UUID
 
+import asyncpg
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -15,28 +17,39 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+# Postgres NOTIFY channel fired by the sightings AFTER INSERT trigger
+NEW_SIGHTING_CHANNEL = "new_sighting"
+# Fallback poll for sightings whose NOTIFY was missed while the listener was down
+NEW_SIGHTING_POLL_SECONDS = 60
+NEW_SIGHTING_CATCHUP_MINUTES = 60
+LISTEN_RECONNECT_SECONDS = 5
+
 
 class EnrichmentQueue:
     """Simple in-memory queue for enrichment tasks"""
     
     def __init__(self):
         self._queue = asyncio.Queue()
+        self._queued = set()
         self._processing = set()
     
     async def enqueue_sighting(self, sighting_id: str):
         """Add a sighting to the enrichment queue"""
-        if sighting_id not in self._processing:
-            await self._queue.put(sighting_id)
+        self.enqueue_sighting_nowait(sighting_id)
+    
+    def enqueue_sighting_nowait(self, sighting_id: str):
+        """Add a sighting to the enrichment queue from a sync callback"""
+        if sighting_id not in self._processing and sighting_id not in self._queued:
+            self._queued.add(sighting_id)
+            self._queue.put_nowait(sighting_id)
             logger.info(f"Enqueued sighting {sighting_id} for enrichment")
     
-    async def get_next_sighting(self) -> Optional[str]:
-        """Get the next sighting to process"""
-        try:
-            sighting_id = await asyncio.wait_for(self._queue.get(), timeout=1.0)
-            self._processing.add(sighting_id)
-            return sighting_id
-        except asyncio.TimeoutError:
-            return None
+    async def get_next_sighting(self) -> str:
+        """Wait for the next sighting to process"""
+        sighting_id = await self._queue.get()
+        self._queued.discard(sighting_id)
+        self._processing.add(sighting_id)
+        return sighting_id
     
     def mark_completed(self, sighting_id: str):
         """Mark a sighting as completed"""
@@ -260,6 +273,79 @@ async def get_db_session():
         return MockDB()
 
 
+def _on_new_sighting(connection, pid, channel, payload):
+    """asyncpg NOTIFY callback - payload is the new sighting id"""
+    enrichment_queue.enqueue_sighting_nowait(payload)
+
+
+async def _mark_processed(pool: asyncpg.Pool, sighting_id: str):
+    """
+    Persist processed_at so the catch-up poll skips this sighting. Set after
+    failed attempts too: enrichment is not retried, and a retry would repeat
+    the external API calls and the alert fanout.
+    """
+    try:
+        await pool.execute(
+            "UPDATE sightings SET processed_at = NOW() WHERE id = $1",
+            UUID(sighting_id)
+        )
+    except Exception as e:
+        logger.warning(f"Could not mark sighting {sighting_id} processed: {e}")
+
+
+async def _enqueue_unprocessed_sightings(conn):
+    """Queue recent sightings the worker has not processed yet"""
+    rows = await conn.fetch("""
+        SELECT id::text FROM sightings
+        WHERE processed_at IS NULL
+          AND created_at > NOW() - make_interval(mins => $1)
+        ORDER BY created_at
+    """, NEW_SIGHTING_CATCHUP_MINUTES)
+    for row in rows:
+        enrichment_queue.enqueue_sighting_nowait(row['id'])
+
+
+async def listen_for_new_sightings():
+    """
+    Hold a dedicated connection that LISTENs for sighting inserts so the worker
+    wakes on new rows instead of polling.
+
+    LISTEN needs a session-level connection, so this connects straight to
+    PostgreSQL (DATABASE_DIRECT_URL) rather than through PgBouncer or a pool.
+    The connection is re-opened if it drops, and each (re)connect plus every
+    NEW_SIGHTING_POLL_SECONDS catches up on sightings whose NOTIFY was missed.
+    """
+    from app.config.environment import settings
+    
+    dsn = settings.database_direct_url or settings.database_url
+    while True:
+        conn = None
+        try:
+            conn = await asyncpg.connect(dsn)
+            lost = asyncio.Event()
+            conn.add_termination_listener(lambda _conn: lost.set())
+            await conn.add_listener(NEW_SIGHTING_CHANNEL, _on_new_sighting)
+            logger.info(f"Listening for {NEW_SIGHTING_CHANNEL} notifications")
+            
+            while not conn.is_closed():
+                await _enqueue_unprocessed_sightings(conn)
+                try:
+                    # Wake early if the server drops the connection
+                    await asyncio.wait_for(lost.wait(), timeout=NEW_SIGHTING_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+            logger.warning(f"LISTEN {NEW_SIGHTING_CHANNEL} connection closed, reconnecting in {LISTEN_RECONNECT_SECONDS}s")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"LISTEN {NEW_SIGHTING_CHANNEL} connection lost, retrying in {LISTEN_RECONNECT_SECONDS}s: {e}")
+        finally:
+            if conn is not None and not conn.is_closed():
+                conn.terminate()
+        
+        await asyncio.sleep(LISTEN_RECONNECT_SECONDS)
+
+
 async def run_enrichment_worker():
     """Run the sighting enrichment worker"""
     logger.info("Starting enrichment worker loop...")
@@ -268,19 +354,34 @@ async def run_enrichment_worker():
     from app.services.enrichment_service import initialize_enrichment_processors
     initialize_enrichment_processors()
     
+    from app.config.environment import settings
+    
+    # Small pool of our own: the worker runs outside the API process and its shared pool
+    pool = await asyncpg.create_pool(
+        settings.database_url,
+        min_size=1,
+        max_size=2,
+        statement_cache_size=0 if settings.database_pgbouncer else 100
+    )
+    
+    # Sightings inserted by other processes arrive via NOTIFY; in-process
+    # callers still use trigger_enrichment
+    listener_task = asyncio.create_task(listen_for_new_sightings())
+    
     processed_count = 0
     failed_count = 0
     
-    while True:
-        try:
-            # Get next sighting from queue
-            sighting_id = await enrichment_queue.get_next_sighting()
-            
-            if sighting_id:
+    try:
+        while True:
+            try:
+                # Block until a sighting is queued
+                sighting_id = await enrichment_queue.get_next_sighting()
+                
                 logger.info(f"Processing sighting {sighting_id} (total processed: {processed_count})")
                 
                 # Enrich the sighting
                 success = await enrich_sighting(sighting_id)
+                await _mark_processed(pool, sighting_id)
                 
                 # Mark as completed
                 enrichment_queue.mark_completed(sighting_id)
@@ -294,17 +395,17 @@ async def run_enrichment_worker():
                 
                 # Brief pause between processing
                 await asyncio.sleep(0.1)
-            else:
-                # No work available, sleep longer
-                await asyncio.sleep(2)
-                
-        except KeyboardInterrupt:
-            logger.info("Enrichment worker interrupted by user")
-            break
-        except Exception as e:
-            logger.error(f"Error in enrichment worker: {e}")
-            failed_count += 1
-            await asyncio.sleep(5)
+                    
+            except KeyboardInterrupt:
+                logger.info("Enrichment worker interrupted by user")
+                break
+            except Exception as e:
+                logger.error(f"Error in enrichment worker: {e}")
+                failed_count += 1
+                await asyncio.sleep(5)
+    finally:
+        listener_task.cancel()
+        await pool.close()
     
     logger.info(f"Enrichment worker stopping. Processed: {processed_count}, Failed: {failed_count}")
 
@@ -6,6 +6,7 @@ Processes new sightings and sends push notifications to nearby users
 import asyncio
 import logging
 import math
+from collections import deque
 from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime, timedelta
 from dataclasses import dataclass
@@ -63,6 +64,25 @@ except ImportError:
 logger = logging.getLogger(__name__)
 
 
+# Notification title emoji per reported shape
+_SHAPE_EMOJI = {
+    "circle": "⭕",
+    "triangle": "🔺", 
+    "diamond": "🔶",
+    "disc": "💿",
+    "sphere": "⚪",
+    "cylinder": "🥫",
+    "unknown": "🛸"
+}
+
+# (title, body lead-in) per shape, built once at import
+_DEFAULT_CONTENT = ("🛸 UFO Sighting Nearby", "Unidentified aerial phenomenon reported")
+_SHAPE_CONTENT = {
+    shape: (f"{emoji} UFO Sighting Nearby", f"{shape.title()} formation reported")
+    for shape, emoji in _SHAPE_EMOJI.items()
+}
+
+
 @dataclass
 class UserLocation:
     """User location and alert preferences"""
@@ -95,7 +115,7 @@ class AlertFanoutWorker:
         self.min_fanout_distance_km = getattr(settings, 'min_fanout_distance_km', 0.1)
         self.max_targets_per_fanout = getattr(settings, 'max_targets_per_fanout', 1000)
         self.rate_limit_window_minutes = 60
-        self.user_alert_history = {}  # In production, use Redis or database
+        self.user_alert_history: Dict[str, deque] = {}  # In production, use Redis or database
         
     def calculate_distance_km(
         self, 
@@ -207,18 +227,24 @@ class AlertFanoutWorker:
         
         nearby_users = []
         
+        # Hoist loop-invariant lookups into locals
+        sighting_lat = sighting.latitude
+        sighting_lon = sighting.longitude
+        min_km = self.min_fanout_distance_km
+        max_km = self.max_fanout_distance_km
+        calculate_distance_km = self.calculate_distance_km
+        
         for user_location in user_locations:
             if not user_location.alert_notifications_enabled:
                 continue
                 
-            distance_km = self.calculate_distance_km(
-                sighting.latitude, sighting.longitude,
+            distance_km = calculate_distance_km(
+                sighting_lat, sighting_lon,
                 user_location.latitude, user_location.longitude
             )
             
             # Check if within user's preferred range and system limits
-            if (self.min_fanout_distance_km <= distance_km <= self.max_fanout_distance_km and
-                distance_km <= user_location.alert_range_km):
+            if min_km <= distance_km <= max_km and distance_km <= user_location.alert_range_km:
                 nearby_users.append((user_location, distance_km))
                 
         # Sort by distance (closest first) and limit
@@ -238,20 +264,14 @@ class AlertFanoutWorker:
         for user_location, distance in nearby_users:
             user_id = user_location.user_id
             
-            # Get recent alert history for user
-            user_history = self.user_alert_history.get(user_id, [])
-            
-            # Remove old alerts outside the window
-            recent_alerts = [
-                alert_time for alert_time in user_history 
-                if alert_time > cutoff_time
-            ]
+            # Get recent alert history for user, dropping alerts outside the window
+            recent_alerts = self._prune_alert_history(user_id, cutoff_time)
             
             # Check if under rate limit
-            if len(recent_alerts) < user_location.max_alerts_per_hour:
+            if recent_alerts < user_location.max_alerts_per_hour:
                 rate_limited.append((user_location, distance))
             else:
-                logger.debug(f"Rate limited user {user_id}: {len(recent_alerts)} alerts in last hour")
+                logger.debug(f"Rate limited user {user_id}: {recent_alerts} alerts in last hour")
                 
         return rate_limited
         
@@ -269,10 +289,13 @@ class AlertFanoutWorker:
             user_devices = device_registry.get(user_id, [])
             
             for device in user_devices:
-                if (device.get("is_active", False) and 
-                    device.get("push_enabled", False) and
-                    device.get("push_token") and
-                    device.get("alert_notifications", True)):
+                get = device.get
+                alert_notifications = get("alert_notifications", True)
+                push_token = get("push_token")
+                if (get("is_active", False) and 
+                    get("push_enabled", False) and
+                    push_token and
+                    alert_notifications):
                     
                     # Determine push provider
                     provider_str = device.get("push_provider", "fcm")
@@ -283,14 +306,14 @@ class AlertFanoutWorker:
                         
                     push_target = PushTarget(
                         device_id=device["device_id"],
-                        push_token=device["push_token"],
+                        push_token=push_token,
                         provider=provider,
-                        platform=device.get("platform", "unknown"),
+                        platform=get("platform", "unknown"),
                         user_id=user_id,
                         preferences={
-                            "alert_notifications": device.get("alert_notifications", True),
-                            "chat_notifications": device.get("chat_notifications", True), 
-                            "system_notifications": device.get("system_notifications", True)
+                            "alert_notifications": alert_notifications,
+                            "chat_notifications": get("chat_notifications", True), 
+                            "system_notifications": get("system_notifications", True)
                         }
                     )
                     
@@ -301,30 +324,17 @@ class AlertFanoutWorker:
     def _create_notification_content(self, sighting: SightingEvent) -> Tuple[str, str]:
         """Create notification title and body"""
         
-        # Create engaging title
-        shape_emoji = {
-            "circle": "⭕",
-            "triangle": "🔺", 
-            "diamond": "🔶",
-            "disc": "💿",
-            "sphere": "⚪",
-            "cylinder": "🥫",
-            "unknown": "🛸"
-        }.get(sighting.shape or "unknown", "🛸")
-        
-        title = f"{shape_emoji} UFO Sighting Nearby"
-        
-        # Create informative body
-        if sighting.shape:
-            body = f"{sighting.shape.title()} formation reported"
+        # Title and body lead-in are precomputed for known shapes
+        if not sighting.shape:
+            title, body = _DEFAULT_CONTENT
         else:
-            body = "Unidentified aerial phenomenon reported"
-            
+            title, body = _SHAPE_CONTENT.get(sighting.shape) or (
+                _DEFAULT_CONTENT[0], f"{sighting.shape.title()} formation reported"
+            )
+        
         # Add distance context in the worker that has user location
         # For now, use generic messaging
-        body += " in your area. Tap to view details."
-        
-        return title, body
+        return title, body + " in your area. Tap to view details."
         
     def _update_alert_history(
         self,
@@ -334,21 +344,32 @@ class AlertFanoutWorker:
         """Update alert history for rate limiting"""
         
         current_time = datetime.utcnow()
+        cutoff_time = current_time - timedelta(minutes=self.rate_limit_window_minutes)
         
         for user_location, _ in rate_limited_users:
             user_id = user_location.user_id
             
-            if user_id not in self.user_alert_history:
-                self.user_alert_history[user_id] = []
-                
-            self.user_alert_history[user_id].append(current_time)
+            self.user_alert_history.setdefault(user_id, deque()).append(current_time)
             
             # Keep only recent history to prevent memory bloat
-            cutoff_time = current_time - timedelta(minutes=self.rate_limit_window_minutes)
-            self.user_alert_history[user_id] = [
-                alert_time for alert_time in self.user_alert_history[user_id]
-                if alert_time > cutoff_time
-            ]
+            self._prune_alert_history(user_id, cutoff_time)
+    
+    def _prune_alert_history(self, user_id: str, cutoff_time: datetime) -> int:
+        """Drop alerts at or before cutoff_time and return how many remain"""
+        
+        history = self.user_alert_history.get(user_id)
+        if history is None:
+            return 0
+        
+        # Alerts are appended in time order, so stale ones are always at the left
+        while history and history[0] <= cutoff_time:
+            history.popleft()
+        
+        if not history:
+            del self.user_alert_history[user_id]
+            return 0
+        
+        return len(history)
 
 
 # Mock data functions for testing
@@ -9,6 +9,9 @@ from app.routers.admin import rate_limit_enabled, rate_limit_threshold
 
 logger = logging.getLogger(__name__)
 
+# Upper bound on in-flight FCM sends per alert batch
+MAX_CONCURRENT_PUSHES = 32
+
 class ProximityAlertService:
     """
     Phase 0 Proximity Alert System - Instant geohash-based fanout
@@ -155,45 +158,44 @@ class ProximityAlertService:
                 else:
                     logger.info("Rate limiting disabled - sending proximity alerts regardless of frequency")
                 
-                # Simple approach: get all active devices with push tokens
+                # Indexed spatial probe on devices.location (GiST); devices without a
+                # location are only included in the 25km ring for Phase 0
                 query = """
-                    SELECT device_id, push_token, platform, lat, lon
+                    SELECT device_id, push_token, platform, lat, lon,
+                           ST_Distance(location, ST_SetSRID(ST_MakePoint($2, $3), 4326)::geography) / 1000.0 AS distance_km
                     FROM devices 
                     WHERE is_active = true 
                       AND push_enabled = true
                       AND push_token IS NOT NULL
                       AND device_id != $1
+                      AND ST_DWithin(location, ST_SetSRID(ST_MakePoint($2, $3), 4326)::geography, $4 * 1000.0)
+                    UNION ALL
+                    SELECT device_id, push_token, platform, NULL, NULL, 25.0
+                    FROM devices 
+                    WHERE is_active = true 
+                      AND push_enabled = true
+                      AND push_token IS NOT NULL
+                      AND device_id != $1
+                      AND location IS NULL
+                      AND $4 >= 25.0
+                    ORDER BY distance_km
                     LIMIT 1000
                 """
-                rows = await conn.fetch(query, exclude_device_id)
+                rows = await conn.fetch(query, exclude_device_id, lon, lat, radius_km)
                 
-                # For Phase 0: if no location data, treat all devices as within range
-                # This ensures alerts work even without location data
                 devices = []
                 for row in rows:
+                    device = {
+                        'device_id': row['device_id'],
+                        'push_token': row['push_token'],
+                        'platform': row['platform'],
+                        'distance_km': round(row['distance_km'], 2)
+                    }
                     if row['lat'] is not None and row['lon'] is not None:
-                        # Calculate actual distance
-                        distance = self._calculate_distance(lat, lon, row['lat'], row['lon'])
-                        if distance <= radius_km:
-                            devices.append({
-                                'device_id': row['device_id'],
-                                'push_token': row['push_token'],
-                                'platform': row['platform'],
-                                'distance_km': round(distance, 2),
-                                'device_lat': row['lat'],
-                                'device_lon': row['lon']
-                            })
-                    else:
-                        # No location data - include in 25km ring for Phase 0
-                        if radius_km >= 25.0:
-                            devices.append({
-                                'device_id': row['device_id'],
-                                'push_token': row['push_token'],
-                                'platform': row['platform'],
-                                'distance_km': 25.0  # Default distance
-                            })
+                        device['device_lat'] = row['lat']
+                        device['device_lon'] = row['lon']
+                    devices.append(device)
                 
-                devices.sort(key=lambda d: d['distance_km'])
                 return devices
                 
         except Exception as e:
@@ -297,52 +299,61 @@ class ProximityAlertService:
             return 0
             
         try:
-            # Send individualized alerts with device-specific bearing and distance
-            success_count = 0
+            # Build individualized alerts with device-specific bearing and distance
+            timestamp = datetime.utcnow().isoformat()  # Same for every device in the batch
+            pending = []
             
             for device in devices:
-                try:
-                    # Prepare alert data with sighting location for compass navigation
-                    alert_data = {
-                        "type": "sighting_alert",
-                        "sighting_id": sighting_id,
-                        "alert_level": alert_level,
-                        "witness_count": str(witness_count),
-                        "timestamp": datetime.utcnow().isoformat(),
-                        "action": "open_compass",  # Phase 1 Task 6: Open compass directly
-                        "submitter_device_id": submitter_device_id,  # For self-notification filtering
-                        "refresh_alerts": "true"  # Trigger alerts tab refresh in receiving apps
-                    }
-                    
-                    # Add location data for compass navigation if available
-                    if sighting_lat is not None and sighting_lon is not None:
-                        alert_data.update({
-                            "latitude": str(sighting_lat),
-                            "longitude": str(sighting_lon),
-                            "location_name": location_name or "UFO Sighting"
-                        })
-                        
-                        # Add device-specific distance
-                        if 'distance_km' in device:
-                            alert_data["distance"] = str(device['distance_km'])
-                        
-                        # Calculate bearing from device to sighting if we have device location
-                        if 'device_lat' in device and 'device_lon' in device and device['device_lat'] is not None and device['device_lon'] is not None:
-                            bearing = self._calculate_bearing(
-                                device['device_lat'], device['device_lon'],
-                                sighting_lat, sighting_lon
-                            )
-                            alert_data["bearing"] = str(round(bearing, 1))
+                # Prepare alert data with sighting location for compass navigation
+                alert_data = {
+                    "type": "sighting_alert",
+                    "sighting_id": sighting_id,
+                    "alert_level": alert_level,
+                    "witness_count": str(witness_count),
+                    "timestamp": timestamp,
+                    "action": "open_compass",  # Phase 1 Task 6: Open compass directly
+                    "submitter_device_id": submitter_device_id,  # For self-notification filtering
+                    "refresh_alerts": "true"  # Trigger alerts tab refresh in receiving apps
+                }
+                
+                # Add location data for compass navigation if available
+                if sighting_lat is not None and sighting_lon is not None:
+                    alert_data.update({
+                        "latitude": str(sighting_lat),
+                        "longitude": str(sighting_lon),
+                        "location_name": location_name or "UFO Sighting"
+                    })
                     
-                    # Send to individual device using Firebase service
-                    response = send_to_token(device['push_token'], alert_data, title=title, body=body)
+                    # Add device-specific distance
+                    if 'distance_km' in device:
+                        alert_data["distance"] = str(device['distance_km'])
                     
-                    if response:
-                        success_count += 1
-                        
-                except Exception as e:
-                    logger.error(f"Error sending alert to device {device.get('device_id', 'unknown')}: {e}")
-                    continue
+                    # Calculate bearing from device to sighting if we have device location
+                    if device.get('device_lat') is not None and device.get('device_lon') is not None:
+                        bearing = self._calculate_bearing(
+                            device['device_lat'], device['device_lon'],
+                            sighting_lat, sighting_lon
+                        )
+                        alert_data["bearing"] = str(round(bearing, 1))
+                
+                pending.append((device, alert_data))
+            
+            # Fan out concurrently; send_to_token blocks on the FCM HTTP call, so run it in threads
+            semaphore = asyncio.Semaphore(MAX_CONCURRENT_PUSHES)
+            
+            async def send(device: dict, alert_data: dict) -> bool:
+                async with semaphore:
+                    try:
+                        response = await asyncio.to_thread(
+                            send_to_token, device['push_token'], alert_data, title=title, body=body
+                        )
+                        return bool(response)
+                    except Exception as e:
+                        logger.error(f"Error sending alert to device {device.get('device_id', 'unknown')}: {e}")
+                        return False
+            
+            results = await asyncio.gather(*[send(device, alert_data) for device, alert_data in pending])
+            success_count = sum(results)
             
             logger.info(f"Alert batch {alert_level}: {success_count}/{len(devices)} sent successfully")
             return success_count